@@ -0,0 +1,247 @@
+import argparse
+import json
+import os.path
+import platform
+import ssl
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from benchmarks.stub_server import CERT_PATH, StubServerProcess
+from rosreestr_api.clients.http import (
+    CACERT_PATH,
+    BaseHTTPClient,
+    CustomSession,
+    HTTPSAdapter,
+    create_ssl_context,
+)
+from rosreestr_api.clients.regions import RegionsSnapshot
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+from rosreestr_api.clients.transport import Urllib3Transport
+
+
+# Offline benchmarks of the clients against the local stub server, e.g.
+# python -m benchmarks.run --requests 1000 --concurrency 1 8 32 --latency 0.02 --output results.json
+ROSREESTR_URL = 'https://rosreestr.gov.ru'
+PKK_URL = 'https://pkk.rosreestr.ru'
+WORKLOADS = ('fir_object', 'pkk_parcel')
+
+
+_stub_ssl_context = None
+_stub_ssl_context_lock = threading.Lock()
+
+
+def get_stub_ssl_context() -> ssl.SSLContext:
+    # The stub certificate is trusted in addition to cacert.pem. It is a separate context,
+    # the shared one of production clients must never trust the stub key from the repo.
+    global _stub_ssl_context
+    if _stub_ssl_context is None:
+        with _stub_ssl_context_lock:
+            if _stub_ssl_context is None:
+                ssl_context = create_ssl_context(cafile=CACERT_PATH)
+                ssl_context.load_verify_locations(cafile=CERT_PATH)
+                _stub_ssl_context = ssl_context
+    return _stub_ssl_context
+
+
+class StubHTTPSAdapter(HTTPSAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = get_stub_ssl_context()
+        return HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+
+
+class StubSession(CustomSession):
+    ADAPTER_CLS = StubHTTPSAdapter
+
+
+class StubUrllib3Transport(Urllib3Transport):
+
+    def __init__(self, **kwargs):
+        super().__init__(ssl_context=get_stub_ssl_context(), **kwargs)
+
+
+def get_stub_client_cls(client_cls, base_url: str):
+    # the client with urls of the stub server instead of rosreestr ones,
+    # its sessions trust the stub certificate
+    attrs = {}
+    for name in dir(client_cls):
+        value = getattr(client_cls, name)
+        if name.isupper() and isinstance(value, str):
+            attrs[name] = value.replace(ROSREESTR_URL, base_url).replace(PKK_URL, base_url)
+
+    def __init__(self, *args, **kwargs):
+        client_cls.__init__(self, *args, **kwargs)
+        self._http_client.SESSION_CLS = StubSession
+        self._http_client.URLLIB3_TRANSPORT_CLS = StubUrllib3Transport
+
+    attrs['__init__'] = __init__
+    return type(client_cls.__name__, (client_cls,), attrs)
+
+
+def measure(call: Callable[[Any], Any], items: List[Any], concurrency: int,
+            trace_memory: bool = False) -> dict:
+    def timed_call(item) -> Tuple[float, bool]:
+        # (latency, is_error), results are collected by the caller thread
+        start_time = time.perf_counter()
+        try:
+            call(item)
+        except Exception:
+            return time.perf_counter() - start_time, True
+        return time.perf_counter() - start_time, False
+
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_call, items))
+    duration = time.perf_counter() - start_time
+    latencies = [latency for latency, _ in results]
+    errors = sum(is_error for _, is_error in results)
+    result = {
+        'requests': len(items),
+        'errors': errors,
+        'duration': duration,
+        'throughput': len(items) / duration,
+        'latency_mean': sum(latencies) / len(latencies),
+        'latency_p50': get_percentile(latencies, 0.5),
+        'latency_p99': get_percentile(latencies, 0.99),
+    }
+    if trace_memory:
+        result['memory_peak'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def get_percentile(values: Iterable[float], percentile: float) -> Optional[float]:
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(percentile * len(values)))]
+
+
+def run_workload(workload: str, base_url: str, keep_alive: bool, concurrency: int,
+                 requests_number: int, trace_memory: bool, transport: str = 'requests') -> dict:
+    if workload == 'fir_object':
+        client = get_stub_client_cls(RosreestrAPIClient, base_url)(
+            keep_alive=keep_alive, transport=transport)
+        items = [f'177_{i}' for i in range(requests_number)]
+        call = client.get_object
+    else:
+        client = get_stub_client_cls(PKKRosreestrAPIClient, base_url)(
+            keep_alive=keep_alive, transport=transport)
+        items = [(55 + i / 10000, 37.5) for i in range(requests_number)]
+
+        def call(item):
+            return client.get_parcel_by_coordinates(lat=item[0], long=item[1])
+    try:
+        result = measure(call, items, concurrency)
+        if trace_memory:
+            # a separate run, tracemalloc slows down the client several times
+            result['memory_peak'] = measure(
+                call, items, concurrency, trace_memory=True)['memory_peak']
+    finally:
+        client.close()
+    return {'scenario': 'requests', 'workload': workload, 'transport': transport,
+            'keep_alive': keep_alive, 'concurrency': concurrency, **result}
+
+
+def run_directory_loads(base_url: str, repeats: int, trace_memory: bool) -> List[dict]:
+    client_cls = get_stub_client_cls(RosreestrAPIClient, base_url)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, 'regions.json')
+        # cold loads download the directories, warm loads read the snapshot saved by them
+        for scenario in ('directory_cold', 'directory_warm'):
+            def call(_):
+                if scenario == 'directory_cold' and os.path.exists(snapshot_path):
+                    os.remove(snapshot_path)
+                client = client_cls(regions_snapshot=RegionsSnapshot(snapshot_path))
+                try:
+                    return client.macro_regions_to_regions
+                finally:
+                    client.close()
+
+            if scenario == 'directory_warm':
+                # the snapshot is saved by the first successful load, errors of the stub
+                # may fail some of them
+                for _ in range(10):
+                    try:
+                        call(None)
+                        break
+                    except Exception:
+                        pass
+            result = measure(call, list(range(repeats)), concurrency=1)
+            if trace_memory:
+                result['memory_peak'] = measure(
+                    call, list(range(repeats)), concurrency=1, trace_memory=True)['memory_peak']
+            results.append({'scenario': scenario, 'concurrency': 1, **result})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks of rosreestr_api clients')
+    parser.add_argument('--requests', type=int, default=500, help='requests per run')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--transports', nargs='+', choices=BaseHTTPClient.TRANSPORTS,
+                        default=list(BaseHTTPClient.TRANSPORTS))
+    parser.add_argument('--directory-repeats', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='stub latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random stub latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 503 responses')
+    parser.add_argument('--no-memory', action='store_true', help="don't measure memory")
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    trace_memory = not args.no_memory
+    results = []
+    with StubServerProcess(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate) as server:
+        for workload in args.workloads:
+            for transport in args.transports:
+                for keep_alive in (False, True):
+                    for concurrency in args.concurrency:
+                        result = run_workload(
+                            workload, server.base_url, keep_alive, concurrency, args.requests,
+                            trace_memory, transport=transport)
+                        results.append(result)
+                        print(_format_result(result))
+        for result in run_directory_loads(server.base_url, args.directory_repeats, trace_memory):
+            results.append(result)
+            print(_format_result(result))
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results were saved to {args.output}')
+    return report
+
+
+def _format_result(result: dict) -> str:
+    name = result['scenario']
+    if 'workload' in result:
+        name = (f"{result['workload']} transport={result['transport']} "
+                f"keep_alive={result['keep_alive']}")
+    line = (f"{name} concurrency={result['concurrency']}: "
+            f"{result['throughput']:.1f} req/s, p50 {result['latency_p50'] * 1000:.1f} ms, "
+            f"p99 {result['latency_p99'] * 1000:.1f} ms, errors {result['errors']}")
+    if 'memory_peak' in result:
+        line += f", memory peak {result['memory_peak'] / 1024:.0f} KiB"
+    return line
+
+
+if __name__ == '__main__':
+    main()
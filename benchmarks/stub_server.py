@@ -0,0 +1,154 @@
+import argparse
+import multiprocessing
+import os.path
+import random
+import re
+import ssl
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rosreestr_api.clients import endpoints
+from tests import pkk_client_fixtures, rosreestr_client_fixtures
+
+
+CERT_PATH = os.path.join(os.path.dirname(__file__), 'stub_cert.pem')
+KEY_PATH = os.path.join(os.path.dirname(__file__), 'stub_key.pem')
+
+_REGIONS_ID_RE = re.compile(r'/regions/(\d+)/')
+REGIONS = {
+    str(rosreestr_client_fixtures.MACRO_REGION_ID_1):
+        rosreestr_client_fixtures.MACRO_REGION_TO_REGION_1_RESPONSE,
+    str(rosreestr_client_fixtures.MACRO_REGION_ID_2):
+        rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE,
+}
+PAYLOADS = {
+    endpoints.MACRO_REGIONS: rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE,
+    endpoints.REGION_TYPES: rosreestr_client_fixtures.REGION_TYPES_RESPONSE,
+    endpoints.RIGHT: rosreestr_client_fixtures.RIGHT_RESPONSE,
+    endpoints.ADDRESS: rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE,
+    endpoints.FIR_OBJECT: rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE,
+    endpoints.PKK_PARCEL_BY_COORDS: pkk_client_fixtures.PARCEL_BY_COORDINATES_RESPONSE,
+    endpoints.PKK_PARCEL_BY_CADASTRAL_ID: pkk_client_fixtures.PARCEL_BY_CADASTRAL_ID_RESPONSE,
+    endpoints.PKK_BUILDING_BY_COORDS: pkk_client_fixtures.BUILDING_BY_COORDINATES_RESPONSE,
+    endpoints.PKK_BUILDING_BY_CADASTRAL_ID: pkk_client_fixtures.BUILDING_BY_CADASTRAL_ID_RESPONSE,
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Replays test fixtures for rosreestr and PKK urls, with the latency
+    # and the error rate of the server
+    protocol_version = 'HTTP/1.1'
+    # headers and the body are written separately, without TCP_NODELAY
+    # delayed ACKs add 40ms to every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        endpoint = _get_endpoint(self.path)
+        latency = self.server.latency
+        if self.server.jitter:
+            latency += random.uniform(0, self.server.jitter)
+        if latency:
+            time.sleep(latency)
+
+        if random.random() < self.server.error_rate:
+            self._send(503, b'')
+        elif endpoint == endpoints.REGIONS:
+            match = _REGIONS_ID_RE.search(self.path)
+            body = REGIONS.get(match.group(1)) if match else None
+            self._send(200, body) if body is not None else self._send(404, b'')
+        elif endpoint in PAYLOADS:
+            self._send(200, PAYLOADS[endpoint])
+        else:
+            self._send(404, b'')
+
+    def _send(self, status_code: int, body: bytes):
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0, tls=True):
+        super().__init__(('localhost', port), StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.ssl_context = None
+        if tls:
+            self.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            self.ssl_context.load_cert_chain(CERT_PATH, KEY_PATH)
+
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            # the handshake is done by the handler thread on the first read
+            sock = self.ssl_context.wrap_socket(
+                sock, server_side=True, do_handshake_on_connect=False)
+        return sock, address
+
+    @property
+    def base_url(self) -> str:
+        scheme = 'https' if self.ssl_context is not None else 'http'
+        return f'{scheme}://localhost:{self.server_port}'
+
+
+class StubServerProcess:
+    # The server runs in its own process, so it doesn't compete with the measured client
+    # for the GIL
+
+    def __init__(self, **server_kwargs):
+        self.server_kwargs = server_kwargs
+        self.base_url = None
+        self._process = None
+
+    def __enter__(self) -> 'StubServerProcess':
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        self._process = context.Process(
+            target=_serve, args=(queue,), kwargs=self.server_kwargs, daemon=True)
+        self._process.start()
+        self.base_url = queue.get(timeout=30)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
+
+
+def _serve(queue, **server_kwargs):
+    server = StubServer(**server_kwargs)
+    queue.put(server.base_url)
+    server.serve_forever()
+
+
+def _get_endpoint(path: str) -> str:
+    for pattern, endpoint in endpoints.ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return endpoint
+    return endpoints.OTHER
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stub of rosreestr and PKK APIs')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 503 responses')
+    parser.add_argument('--no-tls', action='store_true')
+    args = parser.parse_args()
+    server = StubServer(
+        port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        tls=not args.no_tls)
+    print(f'Serving on {server.base_url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import csv
+import dataclasses
+import json
+import logging
+import os
+import sys
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from rosreestr_api.clients.concurrency import map_concurrently
+from rosreestr_api.clients.http import BaseHTTPClient
+from rosreestr_api.clients.ratelimit import RateLimiter
+from rosreestr_api.clients.retry import RetryPolicy
+from rosreestr_api.clients.rosreestr import (
+    AddressWrapper,
+    PKKRosreestrAPIClient,
+    RosreestrAPIClient,
+)
+
+
+# rosreestr-api object ids.csv --output objects.jsonl --checkpoint objects.journal
+# rosreestr-api parcel points.jsonl --max-workers 16 --rate 10 > parcels.jsonl
+COMMANDS = ('object', 'parcel', 'building', 'address')
+FORMATS = ('jsonl', 'csv')
+ADDRESS_FIELDS = tuple(field.name for field in dataclasses.fields(AddressWrapper))
+
+
+class Checkpoint:
+    # A journal of finished row numbers, one per line. A row is journaled after its result
+    # is written, so after a crash the row can be written twice, but it is never lost.
+    # Finished rows are kept in a bitmap, millions of them take a few hundred kilobytes.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done_number = 0
+        self._done = bytearray()
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, 'a')
+
+    def is_done(self, index: int) -> bool:
+        byte_index = index >> 3
+        return byte_index < len(self._done) and bool(self._done[byte_index] & (1 << (index & 7)))
+
+    def mark_done(self, index: int):
+        self._set(index)
+        self._file.write(f'{index}\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def _load(self):
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            # the last line is torn if the process was killed while writing it
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            if line:
+                self._set(int(line))
+
+    def _set(self, index: int):
+        byte_index = index >> 3
+        if byte_index >= len(self._done):
+            self._done.extend(bytes(max(byte_index + 1 - len(self._done), len(self._done))))
+        if not self._done[byte_index] & (1 << (index & 7)):
+            self._done[byte_index] |= 1 << (index & 7)
+            self.done_number += 1
+
+
+def iter_rows(paths: List[str], input_format: str = None) -> Iterator[Any]:
+    # Yields dicts of csv and jsonl rows of all inputs, `-` is stdin.
+    # A broken jsonl line is yielded as the error, so it becomes the result of the row.
+    for path in paths or ['-']:
+        row_format = input_format or _get_format(path)
+        if path == '-':
+            yield from _iter_file_rows(sys.stdin, row_format)
+        else:
+            with open(path, newline='', encoding='utf-8') as f:
+                yield from _iter_file_rows(f, row_format)
+
+
+def create_lookup(command: str, **client_kwargs) -> Tuple[Any, Callable[[Any], Any]]:
+    if command == 'object':
+        client = RosreestrAPIClient(**client_kwargs)
+        return client, lambda row: client.get_object(_get_field(row, 'cadastral_id'))
+    if command == 'address':
+        client = RosreestrAPIClient(lazy_regions=True, **client_kwargs)
+        return client, lambda row: client.get_objects_by_address(_get_address_wrapper(row))
+
+    client = PKKRosreestrAPIClient(**client_kwargs)
+    if command == 'parcel':
+        by_cadastral_id, by_coordinates = (
+            client.get_parcel_by_cadastral_id, client.get_parcel_by_coordinates)
+    else:
+        by_cadastral_id, by_coordinates = (
+            client.get_building_by_cadastral_id, client.get_building_by_coordinates)
+
+    def lookup(row):
+        # rows have either cadastral_id or lat and long
+        if not isinstance(row, dict) or row.get('cadastral_id'):
+            return by_cadastral_id(_get_field(row, 'cadastral_id'))
+        return by_coordinates(
+            lat=float(_get_field(row, 'lat')), long=float(_get_field(row, 'long')))
+    return client, lookup
+
+
+def run(lookup: Callable[[Any], Any], rows: Iterable[Any], output, max_workers: int = 8,
+        checkpoint: Checkpoint = None) -> dict:
+    stats = {'written': 0, 'errors': 0, 'skipped': 0}
+
+    def iter_pending_rows():
+        for index, row in enumerate(rows):
+            if checkpoint is not None and checkpoint.is_done(index):
+                stats['skipped'] += 1
+            else:
+                yield index, row
+
+    results = map_concurrently(
+        lambda item: _call_lookup(lookup, item[1]), iter_pending_rows(),
+        max_workers=max_workers, ordered=False)
+    for (index, row), result in results:
+        record = {'row': index, 'input': None if isinstance(row, Exception) else row}
+        if isinstance(result, Exception):
+            record['error'] = f'{type(result).__name__}: {result}'
+            stats['errors'] += 1
+        else:
+            record['result'] = result
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+        stats['written'] += 1
+        # failed requests are retried by the next run, other errors are final
+        if checkpoint is not None and not _is_retryable(result):
+            checkpoint.mark_done(index)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='rosreestr-api',
+        description='Looks up rows of csv or jsonl inputs and writes results as jsonl. '
+                    'object rows have cadastral_id, parcel and building rows have cadastral_id '
+                    'or lat and long, address rows have AddressWrapper fields.')
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('inputs', nargs='*', help='csv or jsonl files, stdin by default')
+    parser.add_argument('--format', choices=FORMATS, help='by the file extension by default')
+    parser.add_argument('--output', help='stdout by default')
+    parser.add_argument('--checkpoint', help='a journal of finished rows to resume the job')
+    parser.add_argument('--max-workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, help='requests per second per host')
+    parser.add_argument('--retries', type=int, default=3, help='attempts per request')
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--transport', choices=BaseHTTPClient.TRANSPORTS, default='requests')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr)
+
+    client_kwargs = {
+        'timeout': args.timeout, 'keep_alive': True, 'transport': args.transport,
+        'pool_maxsize': args.max_workers,
+        'retry_policy': RetryPolicy(max_attempts=args.retries)}
+    if args.rate:
+        client_kwargs['rate_limiter'] = RateLimiter(rate=args.rate)
+    client, lookup = create_lookup(args.command, **client_kwargs)
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    # a resumed job appends to the results of the previous runs
+    output_mode = 'a' if checkpoint is not None else 'w'
+    output = open(args.output, output_mode, encoding='utf-8') if args.output else sys.stdout
+    try:
+        stats = run(
+            lookup, iter_rows(args.inputs, args.format), output,
+            max_workers=args.max_workers, checkpoint=checkpoint)
+    finally:
+        client.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if output is not sys.stdout:
+            output.close()
+    print(f"Rows written: {stats['written']}, errors: {stats['errors']}, "
+          f"skipped as finished: {stats['skipped']}", file=sys.stderr)
+    return 0
+
+
+def _get_format(path: str) -> str:
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def _iter_file_rows(f, row_format: str) -> Iterator[Any]:
+    if row_format == 'csv':
+        yield from csv.DictReader(f)
+        return
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+def _get_field(row: Any, name: str) -> Any:
+    # jsonl rows of a single field can be plain values like "77:05:0007007:4926"
+    if isinstance(row, dict):
+        if not row.get(name):
+            raise ValueError(f'The row has no {name}')
+        return row[name]
+    if isinstance(row, str) and name == 'cadastral_id':
+        return row
+    raise ValueError(f'The row has no {name}')
+
+
+def _get_address_wrapper(row: Any) -> AddressWrapper:
+    if not isinstance(row, dict):
+        raise ValueError('Address rows must be objects')
+    return AddressWrapper(**{name: str(row[name]) for name in ADDRESS_FIELDS if row.get(name)})
+
+
+def _call_lookup(lookup: Callable[[Any], Any], row: Any) -> Any:
+    if isinstance(row, Exception):
+        raise row
+    return lookup(row)
+
+
+def _is_retryable(result: Any) -> bool:
+    if isinstance(result, requests.HTTPError):
+        response = result.response
+        return response is None or response.status_code in RetryPolicy.DEFAULT_STATUS_CODES
+    return isinstance(result, RetryPolicy.DEFAULT_EXCEPTIONS)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,556 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Iterable, Optional, Tuple
+from urllib.parse import quote_plus
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from rosreestr_api.clients import endpoints, tracing
+from rosreestr_api.clients.cache import BaseCache
+from rosreestr_api.clients.concurrency import amap_concurrently, unique
+from rosreestr_api.clients.http import (
+    BaseHTTPClient,
+    RosreestrHTTPClient,
+    _close_response,
+    _is_answer,
+    get_ssl_context,
+)
+from rosreestr_api.clients.useragent import DEFAULT_POOL
+from rosreestr_api.clients.models import PkkBuilding, PkkParcel, get_fir_object
+from rosreestr_api.clients.regions import RegionsSnapshot
+from rosreestr_api.clients.singleflight import AsyncSingleFlight
+from rosreestr_api.clients.spatial import SpatialCache, group_points
+from rosreestr_api.clients.streaming import JSONArrayParser
+from rosreestr_api.clients.rosreestr import (
+    AddressWrapper,
+    RosreestrAPIClient,
+    PKKRosreestrAPIClient,
+    _get_address_rows,
+    _get_features,
+    _get_features_cache_key,
+    _get_json,
+    _has_no_features,
+    _iter_distinct_regions,
+    _normalize_object_id,
+    _normalize_object_ids,
+)
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBaseHTTPClient(BaseHTTPClient):
+
+    def __init__(self, timeout=3, keep_alive=True, default_headers=None,
+                 limit=100, limit_per_host=10, ssl_context=None, **kwargs):
+        if aiohttp is None:
+            raise ImportError(
+                'aiohttp is required for async clients, '
+                'install it with `pip install rosreestr-api[async]`')
+        super().__init__(
+            timeout=timeout, keep_alive=keep_alive, default_headers=default_headers, **kwargs)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ssl_context = ssl_context
+
+    @property
+    def session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            self._session_headers = None
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                force_close=not self.keep_alive,
+                ssl=self.ssl_context if self.ssl_context is not None else True)
+            trace_configs = [tracing.create_aiohttp_trace_config()] if self.tracer else None
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=trace_configs)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get(self, url, params=None, **kwargs) -> requests.Response:
+        return await super().get(url, params=params, **kwargs)
+
+    async def post(self, url, **kwargs) -> requests.Response:
+        return await super().post(url, **kwargs)
+
+    async def patch(self, url, **kwargs) -> requests.Response:
+        return await super().patch(url, **kwargs)
+
+    async def put(self, url, **kwargs) -> requests.Response:
+        return await super().put(url, **kwargs)
+
+    async def _make_request(self, method, url, stream=False, **kwargs) -> requests.Response:
+        # with stream=True the body is read by the caller from response.raw.content,
+        # the caller has to release response.raw
+        timeout = kwargs.pop('timeout', self.timeout)
+
+        headers = self.default_headers.copy()
+        headers.update(kwargs.pop('headers', {}))
+
+        # requests prepares the body and the url, so both clients send the same bytes
+        request = requests.Request(method, url, headers=headers, **kwargs)
+        prepared_request = request.prepare()
+        deadline = self._get_deadline()
+        attempt = 1
+        while True:
+            try:
+                attempt_timeout = self._get_attempt_timeout(timeout, deadline)
+                if self._is_hedgeable(method, url, stream):
+                    response = await self._send_hedged(
+                        prepared_request, attempt_timeout, attempt=attempt)
+                else:
+                    response = await self._send(
+                        prepared_request, attempt_timeout, attempt=attempt, stream=stream)
+            except requests.exceptions.RequestException as e:
+                delay = self._get_retry_delay(method, attempt, deadline, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._get_retry_delay(method, attempt, deadline, response=response)
+                if delay is None:
+                    return response
+                response.close()
+            self._record_retry(url)
+            await asyncio.sleep(delay)
+            attempt += 1
+            logger.info(f'Request is retried, url: {url}, attempt: {attempt}')
+
+    async def _send_hedged(self, prepared_request, timeout, attempt=1) -> requests.Response:
+        # unlike threads, the request which lost the race is cancelled
+        url = prepared_request.url
+        delay = self.hedge_policy.get_delay(self._get_endpoint(url))
+        self.hedge_policy.add_request()
+        if delay is None:
+            return await self._send(prepared_request, timeout, attempt=attempt)
+
+        tasks = [asyncio.ensure_future(self._send(prepared_request, timeout, attempt=attempt))]
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and self.hedge_policy.acquire():
+            self._record_hedge(url)
+            tasks.append(asyncio.ensure_future(
+                self._send(prepared_request, timeout, attempt=attempt)))
+
+        winner = None
+        pending = set(tasks)
+        try:
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in tasks if t in done and _is_answer(t)), None)
+        finally:
+            for task in pending:
+                task.cancel()
+        winner = winner or tasks[0]
+        for task in tasks:
+            if task is not winner and task.done() and not task.cancelled():
+                _close_response(task)
+        if winner is not tasks[0]:
+            self.hedge_policy.record_win()
+        return winner.result()
+
+    async def _send(self, prepared_request, timeout, attempt=1,
+                    stream=False) -> requests.Response:
+        method, url = prepared_request.method, prepared_request.url
+        is_log_sampled = self._is_log_sampled(url)
+        if is_log_sampled:
+            self._log_request(method, url, prepared_request.body)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(url)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.async_acquire(url)
+        span = self._start_span(method, url, attempt)
+        start_time = time.time()
+        try:
+            request_context = self.session.request(
+                method,
+                yarl.URL(url, encoded=True),
+                headers=dict(prepared_request.headers),
+                data=prepared_request.body,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                trace_request_ctx=span)
+            if stream:
+                response = _build_response(prepared_request, await request_context, None)
+            else:
+                async with request_context as aiohttp_response:
+                    content = await aiohttp_response.read()
+                    response = _build_response(prepared_request, aiohttp_response, content)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            self._log_request(method, url, prepared_request.body, log_method=logging.exception)
+            if isinstance(e, asyncio.TimeoutError):
+                error = requests.exceptions.Timeout(e, request=prepared_request)
+            else:
+                error = requests.exceptions.ConnectionError(e, request=prepared_request)
+            self._record_response(url, time.time() - start_time, error=error, span=span)
+            raise error from e
+
+        duration = time.time() - start_time
+        self._record_response(url, duration, response=response, span=span)
+        if response.status_code >= 400:
+            self._log_response(response, duration=duration, log_method=logging.error)
+        elif is_log_sampled:
+            self._log_response(response, duration=duration, log_method=logging.debug)
+        return response
+
+
+class AsyncRosreestrHTTPClient(AsyncBaseHTTPClient):
+    ENDPOINT_PATTERNS = RosreestrHTTPClient.ENDPOINT_PATTERNS
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('ssl_context', get_ssl_context())
+        kwargs.setdefault('user_agent_pool', DEFAULT_POOL)
+        super().__init__(*args, **kwargs)
+
+
+class AsyncRosreestrAPIClient(RosreestrAPIClient):
+
+    def __init__(self, timeout=5, keep_alive=True, limit_per_host=10, lazy_regions=False,
+                 regions_snapshot: RegionsSnapshot = None, cache: BaseCache = None,
+                 max_workers=8, **http_client_kwargs):
+        self._http_client = AsyncRosreestrHTTPClient(
+            timeout=timeout,
+            keep_alive=keep_alive,
+            limit_per_host=limit_per_host,
+            **http_client_kwargs
+        )
+        self.lazy_regions = lazy_regions
+        # concurrent tasks of bulk lookups
+        self.max_workers = max_workers
+        self.regions_snapshot = regions_snapshot
+        self.cache = cache
+        self.single_flight = AsyncSingleFlight()
+        self._macro_regions = None
+        self._macro_regions_to_regions = {}
+        self._are_all_regions_loaded = False
+        self._names_indexes = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._http_client.close()
+
+    @property
+    def macro_regions(self):
+        if not self._macro_regions:
+            raise RuntimeError('Macro regions are not loaded, await get_macro_regions() first')
+        return self._macro_regions
+
+    @property
+    def macro_regions_to_regions(self):
+        if not self._are_all_regions_loaded:
+            raise RuntimeError(
+                'Regions are not loaded, await get_macro_regions_to_regions() first')
+        return self._macro_regions_to_regions
+
+    def _get_regions(self, macro_region_id) -> list:
+        if macro_region_id not in self._macro_regions_to_regions:
+            raise RuntimeError(
+                f'Regions are not loaded, macro_region_id: {macro_region_id}')
+        return self._macro_regions_to_regions[macro_region_id]
+
+    async def get_macro_regions(self):
+        if not self._macro_regions and not self._load_regions_snapshot():
+            try:
+                self._macro_regions = await self.single_flight.do(
+                    endpoints.MACRO_REGIONS, self._download_macro_regions)
+            except requests.RequestException:
+                if not self._load_regions_snapshot(allow_stale=True):
+                    raise
+                logger.warning('Macro regions were not downloaded, stale snapshot is used')
+        return self._macro_regions
+
+    async def _download_macro_regions(self) -> list:
+        macro_regions = _get_json(await self._http_client.get(self.MACRO_REGIONS_URL))
+        logger.info('Macro regions were downloaded')
+        return macro_regions
+
+    async def get_macro_regions_to_regions(self):
+        if not self._are_all_regions_loaded and not self._load_regions_snapshot():
+            try:
+                await self._load_regions(
+                    [macro_region['id'] for macro_region in await self.get_macro_regions()])
+            except requests.RequestException:
+                if not self._load_regions_snapshot(allow_stale=True):
+                    raise
+                logger.warning('Regions were not downloaded, stale snapshot is used')
+            else:
+                self._are_all_regions_loaded = True
+                logger.info('Regions were downloaded')
+                self._save_regions_snapshot()
+        return self._macro_regions_to_regions
+
+    async def refresh(self):
+        macro_regions = await self._download_macro_regions()
+        macro_regions_to_regions = await self._download_all_regions(
+            [macro_region['id'] for macro_region in macro_regions])
+        self._macro_regions = macro_regions
+        self._macro_regions_to_regions = macro_regions_to_regions
+        self._are_all_regions_loaded = True
+        self._save_regions_snapshot()
+
+    async def _load_regions(self, macro_region_ids):
+        self._macro_regions_to_regions.update(await self._download_all_regions([
+            macro_region_id for macro_region_id in macro_region_ids
+            if macro_region_id not in self._macro_regions_to_regions]))
+
+    async def _download_all_regions(self, macro_region_ids) -> dict:
+        regions = await asyncio.gather(*[
+            self._download_regions(macro_region_id) for macro_region_id in macro_region_ids])
+        return dict(zip(macro_region_ids, regions))
+
+    async def _download_regions(self, macro_region_id) -> list:
+        return await self.single_flight.do(
+            (endpoints.REGIONS, macro_region_id),
+            lambda: self._download_regions_once(macro_region_id))
+
+    async def _download_regions_once(self, macro_region_id) -> list:
+        response = await self._http_client.get(self.REGIONS_URL.format(macro_region_id))
+        return _get_json(response)
+
+    async def get_region_types(self, region_id: str):
+        return await self.single_flight.do(
+            (endpoints.REGION_TYPES, region_id), lambda: self._get_region_types(region_id))
+
+    async def _get_region_types(self, region_id: str):
+        response = await self._http_client.get(self.REGION_TYPES_URL.format(region_id))
+        return self._get_response_body(response)
+
+    async def get_objects_by_right(self, region_number: str, right_number: str):
+        url = self.SEARCH_OBJECTS_BY_RIGHT_URL.format(region_number, quote_plus(right_number))
+        return self._get_response_body(await self._http_client.get(url))
+
+    async def get_objects_by_address(self, address_wrapper: AddressWrapper):
+        await self._load_address_regions(address_wrapper)
+        search_objects_url = self._get_objects_by_address_url(address_wrapper)
+        return await self._search_objects(search_objects_url)
+
+    async def _search_objects(self, search_objects_url: str) -> list:
+        logger.info('Trying to download rosreestr objects')
+        response = await self._http_client.get(search_objects_url)
+        return self._get_objects_from_response(response)
+
+    async def get_objects_by_addresses(self, addresses, max_workers: int = None
+                                       ) -> AsyncIterator[Tuple[int, Any, Any]]:
+        rows = _get_address_rows(addresses)
+        address_ids = {}
+        for region_key, address_wrapper in _iter_distinct_regions(rows):
+            address_ids[region_key] = await self._resolve_address_ids(address_wrapper)
+        searches, errors = self._group_address_searches(rows, address_ids)
+        for error in errors:
+            yield error
+        async for url, result in amap_concurrently(
+                self._search_objects, searches, max_workers=max_workers or self.max_workers,
+                ordered=False):
+            for index, address in searches[url]:
+                yield index, address, result
+
+    async def _resolve_address_ids(self, address_wrapper: AddressWrapper):
+        try:
+            await self._load_address_regions(address_wrapper)
+            return self._get_address_ids(address_wrapper)
+        except (ValueError, requests.RequestException) as e:
+            return e
+
+    async def iter_objects_by_address(self, address_wrapper: AddressWrapper,
+                                      chunk_size: int = 64 * 1024) -> AsyncIterator[dict]:
+        await self._load_address_regions(address_wrapper)
+        search_objects_url = self._get_objects_by_address_url(address_wrapper)
+        logger.info('Trying to stream rosreestr objects')
+        response = await self._http_client.get(search_objects_url, stream=True)
+        try:
+            if response.status_code >= 400:
+                response.raise_for_status()
+            parser = JSONArrayParser()
+            objects_number = 0
+            async for chunk in response.raw.content.iter_chunked(chunk_size):
+                for obj in parser.feed(chunk):
+                    objects_number += 1
+                    yield obj
+            for obj in parser.close():
+                objects_number += 1
+                yield obj
+        finally:
+            response.raw.release()
+        logger.info(f'Number of streamed rosreestr objects: {objects_number}')
+
+    async def _load_address_regions(self, address_wrapper: AddressWrapper):
+        if not (address_wrapper.macro_region_id and address_wrapper.region_id):
+            await self.get_macro_regions()
+        if not address_wrapper.region_id:
+            if self.lazy_regions:
+                await self._load_regions(
+                    [self._get_macro_region_id(address_wrapper.macro_region_name)])
+            else:
+                await self.get_macro_regions_to_regions()
+
+    async def get_object(self, obj_id: str, model: bool = False):
+        obj_id = _normalize_object_id(obj_id)
+        if self.cache is None:
+            body = await self._get_shared_object(obj_id)
+        else:
+            body = await self.cache.aget_or_fetch(
+                endpoints.FIR_OBJECT, obj_id, lambda: self._get_shared_object(obj_id))
+        return get_fir_object(body) if model else body
+
+    async def _get_shared_object(self, obj_id: str):
+        return await self.single_flight.do(
+            (endpoints.FIR_OBJECT, obj_id), lambda: self._get_object(obj_id))
+
+    async def _get_object(self, obj_id: str):
+        url = self.SEARCH_DETAILED_OBJECT_BY_ID.format(obj_id)
+        logger.info(f'Trying to download detailed object, object_id: {obj_id}')
+        response = await self._http_client.get(url)
+        logger.info(f'Detailed object was downloaded, object_id: {obj_id}')
+        return self._get_response_body(response)
+
+    async def get_objects(self, obj_ids: Iterable[str], max_workers: int = None,
+                          ordered: bool = True,
+                          model: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+        obj_ids = unique(_normalize_object_ids(obj_ids))
+        async for obj_id, result in amap_concurrently(
+                lambda obj_id: self.get_object(obj_id, model=model), obj_ids,
+                max_workers=max_workers or self.max_workers, ordered=ordered):
+            yield obj_id, result
+
+
+class AsyncPKKRosreestrAPIClient(PKKRosreestrAPIClient):
+
+    def __init__(self, timeout=5, keep_alive=True, limit_per_host=10, cache: BaseCache = None,
+                 spatial_cache: SpatialCache = None, max_workers=8, **http_client_kwargs):
+        self._http_client = AsyncRosreestrHTTPClient(
+            timeout=timeout,
+            keep_alive=keep_alive,
+            limit_per_host=limit_per_host,
+            **http_client_kwargs
+        )
+        self.cache = cache
+        self.spatial_cache = spatial_cache
+        self.max_workers = max_workers
+        self.single_flight = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._http_client.close()
+
+    async def get_parcel_by_coordinates(self, *, lat, long, limit=11, tolerance=2,
+                                        model=False):
+        found, body = self._get_spatially_cached_features(
+            self.PARCEL_OBJECT_TYPE, endpoints.PKK_PARCEL_BY_COORDS, lat, long, limit,
+            tolerance)
+        if not found:
+            url = self.SEARCH_PARCEL_BY_COORDINATES_URL.format(
+                lat=lat, long=long, limit=limit, tolerance=tolerance)
+            body = await self._get_features(url, self.PARCEL_OBJECT_TYPE)
+        return _get_features(body, PkkParcel, model)
+
+    async def get_parcel_by_cadastral_id(self, cadastral_id, limit=11, tolerance=2,
+                                         model=False):
+        url = self.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
+            cadastral_id=cadastral_id, limit=limit, tolerance=tolerance)
+        body = await self._get_cached_features(
+            endpoints.PKK_PARCEL_BY_CADASTRAL_ID,
+            _get_features_cache_key(cadastral_id, limit, tolerance), url,
+            self.PARCEL_OBJECT_TYPE)
+        return _get_features(body, PkkParcel, model)
+
+    async def get_building_by_cadastral_id(self, cadastral_id, limit=11, tolerance=2,
+                                           model=False):
+        url = self.SEARCH_BUILDING_BY_CADASTRAL_ID_URL.format(
+            cadastral_id=cadastral_id, limit=limit, tolerance=tolerance)
+        body = await self._get_cached_features(
+            endpoints.PKK_BUILDING_BY_CADASTRAL_ID,
+            _get_features_cache_key(cadastral_id, limit, tolerance), url,
+            self.BUILDING_OBJECT_TYPE)
+        return _get_features(body, PkkBuilding, model)
+
+    async def _get_cached_features(self, endpoint: str, cache_key: str, url: str,
+                                   object_type: int) -> dict:
+        def fetch():
+            return self.single_flight.do(
+                (endpoint, cache_key), lambda: self._download_features(url, object_type))
+
+        if self.cache is None:
+            return await fetch()
+        return await self.cache.aget_or_fetch(
+            endpoint, cache_key, fetch, is_negative=_has_no_features)
+
+    async def _get_features(self, url: str, object_type: int) -> dict:
+        return await self.single_flight.do(
+            url, lambda: self._download_features(url, object_type))
+
+    async def _download_features(self, url: str, object_type: int) -> dict:
+        body = _get_json(await self._http_client.get(url))
+        self._add_spatially_cached_features(object_type, body)
+        return body
+
+    async def get_building_by_coordinates(self, *, lat, long, limit=11, tolerance=2,
+                                          model=False):
+        found, body = self._get_spatially_cached_features(
+            self.BUILDING_OBJECT_TYPE, endpoints.PKK_BUILDING_BY_COORDS, lat, long, limit,
+            tolerance)
+        if not found:
+            url = self.SEARCH_BUILDING_BY_COORDINATES_URL.format(
+                lat=lat, long=long, limit=limit, tolerance=tolerance)
+            body = await self._get_features(url, self.BUILDING_OBJECT_TYPE)
+        return _get_features(body, PkkBuilding, model)
+
+    async def get_parcels_by_coordinates(self, points, precision=5, max_workers=None,
+                                         **kwargs) -> AsyncIterator[Tuple[int, Tuple, Any]]:
+        async for row in self._get_many_by_coordinates(
+                self.get_parcel_by_coordinates, points, precision, max_workers, kwargs):
+            yield row
+
+    async def get_buildings_by_coordinates(self, points, precision=5, max_workers=None,
+                                           **kwargs) -> AsyncIterator[Tuple[int, Tuple, Any]]:
+        async for row in self._get_many_by_coordinates(
+                self.get_building_by_coordinates, points, precision, max_workers, kwargs):
+            yield row
+
+    async def _get_many_by_coordinates(self, get_features, points, precision, max_workers,
+                                       kwargs):
+        rows_by_point = group_points(points, precision)
+        async for point, result in amap_concurrently(
+                lambda point: get_features(lat=point[0], long=point[1], **kwargs),
+                rows_by_point, max_workers=max_workers or self.max_workers, ordered=False):
+            for index in rows_by_point[point]:
+                yield index, point, result
+
+
+def _build_response(prepared_request, aiohttp_response,
+                    content: Optional[bytes]) -> requests.Response:
+    response = requests.Response()
+    response.status_code = aiohttp_response.status
+    response.reason = aiohttp_response.reason
+    response.headers = CaseInsensitiveDict(aiohttp_response.headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = prepared_request.url
+    response.request = prepared_request
+    if content is None:
+        # a streamed body, it is read from aiohttp_response.content
+        response._content = False
+        response.raw = aiohttp_response
+    else:
+        response._content = content
+        response._content_consumed = True
+    return response
@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from http.client import responses as http_reasons
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from rosreestr_api.clients.metrics import Metrics
+
+
+NEGATIVE_STATUS_CODES = frozenset([404])
+
+
+@dataclass
+class CacheStats:
+
+    hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class BaseCache:
+    # Entries are json compatible dicts: {'value': ...} for a response body and
+    # {'status_code': ..., 'url': ...} for a cached HTTP error.
+    DEFAULT_TTL = 60 * 60
+    DEFAULT_NEGATIVE_TTL = 5 * 60
+
+    def __init__(self, ttl: float = DEFAULT_TTL, negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 ttls: Dict[str, float] = None, metrics: Metrics = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # per endpoint ttls, look at rosreestr_api.clients.endpoints for the names
+        self.ttls = ttls or {}
+        self.stats = CacheStats()
+        # hits and misses are also counted per endpoint in shared metrics
+        self.metrics = metrics
+        self._lock = threading.RLock()
+
+    def get_or_fetch(self, endpoint: str, key: str, fetch: Callable[[], Any],
+                     is_negative: Callable[[Any], bool] = None) -> Any:
+        found, value = self.get(endpoint, key)
+        if found:
+            return value
+        try:
+            value = fetch()
+        except requests.HTTPError as e:
+            self.set_error(endpoint, key, e)
+            raise
+        self.set(endpoint, key, value, is_negative=(is_negative or _is_empty)(value))
+        return value
+
+    async def aget_or_fetch(self, endpoint: str, key: str, fetch: Callable[[], Any],
+                            is_negative: Callable[[Any], bool] = None) -> Any:
+        found, value = self.get(endpoint, key)
+        if found:
+            return value
+        try:
+            value = await fetch()
+        except requests.HTTPError as e:
+            self.set_error(endpoint, key, e)
+            raise
+        self.set(endpoint, key, value, is_negative=(is_negative or _is_empty)(value))
+        return value
+
+    def get(self, endpoint: str, key: str):
+        # Returns (found, value) and raises a cached HTTP error
+        entry = self._get(_get_cache_key(endpoint, key), time.time())
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                if 'status_code' in entry or _is_empty(entry['value']):
+                    self.stats.negative_hits += 1
+        if self.metrics is not None:
+            self.metrics.increment('cache_misses' if entry is None else 'cache_hits', endpoint)
+        if entry is None:
+            return False, None
+        if 'status_code' in entry:
+            _raise_http_error(entry['status_code'], entry['url'])
+        return True, entry['value']
+
+    def set(self, endpoint: str, key: str, value: Any, is_negative: bool = False):
+        ttl = self.negative_ttl if is_negative else self.ttls.get(endpoint, self.ttl)
+        self._set(_get_cache_key(endpoint, key), {'value': value}, time.time() + ttl)
+
+    def set_error(self, endpoint: str, key: str, error: requests.HTTPError):
+        response = error.response
+        if response is not None and response.status_code in NEGATIVE_STATUS_CODES:
+            entry = {'status_code': response.status_code, 'url': response.url}
+            self._set(_get_cache_key(endpoint, key), entry, time.time() + self.negative_ttl)
+
+    def clear(self):
+        raise NotImplementedError
+
+    def _get(self, cache_key: str, now: float) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _set(self, cache_key: str, entry: dict, expires_at: float):
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+
+    def __init__(self, max_size: int = 10000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, cache_key: str, now: float) -> Optional[dict]:
+        with self._lock:
+            entry, expires_at = self._entries.get(cache_key, (None, None))
+            if entry is None:
+                return None
+            if expires_at <= now:
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry
+
+    def _set(self, cache_key: str, entry: dict, expires_at: float):
+        with self._lock:
+            self._entries[cache_key] = (entry, expires_at)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, path: str, max_size: int = 1000000, **kwargs):
+        import sqlite3
+
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_size = max_size
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, entry TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM cache')
+
+    def _get(self, cache_key: str, now: float) -> Optional[dict]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT entry, expires_at FROM cache WHERE key = ?', (cache_key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._connection.execute('DELETE FROM cache WHERE key = ?', (cache_key,))
+                return None
+            self._connection.execute(
+                'UPDATE cache SET accessed_at = ? WHERE key = ?', (now, cache_key))
+            return json.loads(row[0])
+
+    def _set(self, cache_key: str, entry: dict, expires_at: float):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO cache (key, entry, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (cache_key, json.dumps(entry, ensure_ascii=False), expires_at, time.time()))
+            size = self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if size > self.max_size:
+                self._connection.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    '(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)',
+                    (size - self.max_size,))
+                self.stats.evictions += size - self.max_size
+
+
+def _get_cache_key(endpoint: str, key: str) -> str:
+    return f'{endpoint}:{key}'
+
+
+def _is_empty(value: Any) -> bool:
+    return not value
+
+
+def _raise_http_error(status_code: int, url: str):
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = http_reasons.get(status_code, '')
+    response.url = url
+    response.raise_for_status()
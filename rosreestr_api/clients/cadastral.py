@@ -0,0 +1,80 @@
+import re
+from typing import Dict, Iterable, Iterator, Optional
+
+
+# region:district:quarter:number, like 77:05:0007007:4926
+_CADASTRAL_NUMBER_RE = re.compile(r'(\d{1,2}):(\d{1,2}):(\d{1,7}):(\d{1,12})')
+
+
+class InvalidCadastralNumber(ValueError):
+    pass
+
+
+class CadastralNumber(str):
+    # A validated cadastral number normalized the way rosreestr expects it: leading zeros
+    # of the parts are stripped, so 77:05:0007007:4926 becomes 77:5:7007:4926.
+    # It is a str, so it can be used as an id, a cache key or a dict key as is.
+    __slots__ = ()
+
+    def __new__(cls, value: str):
+        if isinstance(value, cls):
+            return value
+        match = _CADASTRAL_NUMBER_RE.fullmatch(value.strip()) if isinstance(value, str) else None
+        if match is None:
+            raise InvalidCadastralNumber(f'Invalid cadastral number: {value!r}')
+        return super().__new__(cls, ':'.join(part.lstrip('0') or '0' for part in match.groups()))
+
+    @classmethod
+    def parse(cls, value: str,
+              interned: Dict[str, 'CadastralNumber'] = None) -> 'CadastralNumber':
+        # equal numbers parsed with the same `interned` dict are the same object
+        if interned is None or isinstance(value, cls):
+            return cls(value)
+        cadastral_number = interned.get(value)
+        if cadastral_number is None:
+            cadastral_number = cls(value)
+            cadastral_number = interned.setdefault(str(cadastral_number), cadastral_number)
+            interned[value] = cadastral_number
+        return cadastral_number
+
+    @classmethod
+    def is_valid(cls, value: str) -> bool:
+        return isinstance(value, str) and _CADASTRAL_NUMBER_RE.fullmatch(value.strip()) is not None
+
+    @property
+    def region(self) -> str:
+        return self.split(':', 1)[0]
+
+    @property
+    def district(self) -> str:
+        return self.split(':', 2)[1]
+
+    @property
+    def quarter(self) -> str:
+        return self.split(':', 3)[2]
+
+    @property
+    def number(self) -> str:
+        return self.rsplit(':', 1)[1]
+
+    @property
+    def quarter_number(self) -> str:
+        # the cadastral quarter the object belongs to, like 77:5:7007
+        return self.rsplit(':', 1)[0]
+
+    def __repr__(self):
+        return f'{type(self).__name__}({str(self)!r})'
+
+
+def normalize_many(values: Iterable[str],
+                   strict: bool = True) -> Iterator[Optional[CadastralNumber]]:
+    # Duplicates are parsed once and share one object. With strict=False
+    # None is yielded for invalid values instead of raising InvalidCadastralNumber.
+    interned = {}
+    for value in values:
+        try:
+            yield CadastralNumber.parse(value, interned)
+        except InvalidCadastralNumber:
+            if strict:
+                raise
+            yield None
@@ -0,0 +1,93 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Hashable, Iterable, Iterator, Tuple
+
+
+def map_concurrently(func: Callable, items: Iterable, max_workers: int = 8,
+                     ordered: bool = True) -> Iterator[Tuple[Any, Any]]:
+    # Yields (item, result) pairs, result is an exception instance if func failed.
+    # Only a bounded window of items is submitted at once, so items can be a huge iterator.
+    if max_workers < 1:
+        raise ValueError('max_workers must be greater than 0')
+    window_size = max_workers * 2
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if ordered:
+            pending = deque()
+            for item in items:
+                pending.append((item, executor.submit(_call, func, item)))
+                if len(pending) >= window_size:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        else:
+            futures_to_items = {}
+            for item in items:
+                futures_to_items[executor.submit(_call, func, item)] = item
+                if len(futures_to_items) >= window_size:
+                    yield from _pop_completed(futures_to_items)
+            while futures_to_items:
+                yield from _pop_completed(futures_to_items)
+
+
+async def amap_concurrently(func: Callable, items: Iterable, max_workers: int = 8,
+                            ordered: bool = True) -> AsyncIterator[Tuple[Any, Any]]:
+    # The same as map_concurrently, but func is a coroutine function and
+    # max_workers limits the number of tasks in flight
+    # asyncio is imported here, because it is the heaviest import of sync clients
+    import asyncio
+
+    if max_workers < 1:
+        raise ValueError('max_workers must be greater than 0')
+    if ordered:
+        pending = deque()
+        for item in items:
+            pending.append((item, asyncio.ensure_future(_acall(func, item))))
+            if len(pending) >= max_workers:
+                item, task = pending.popleft()
+                yield item, await task
+        while pending:
+            item, task = pending.popleft()
+            yield item, await task
+    else:
+        tasks_to_items = {}
+        for item in items:
+            tasks_to_items[asyncio.ensure_future(_acall(func, item))] = item
+            if len(tasks_to_items) >= max_workers:
+                done, _ = await asyncio.wait(tasks_to_items, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield tasks_to_items.pop(task), task.result()
+        while tasks_to_items:
+            done, _ = await asyncio.wait(tasks_to_items, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks_to_items.pop(task), task.result()
+
+
+def unique(items: Iterable[Hashable]) -> Iterator:
+    seen = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+
+def _pop_completed(futures_to_items: dict) -> Iterator[Tuple[Any, Any]]:
+    done, _ = wait(futures_to_items, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield futures_to_items.pop(future), future.result()
+
+
+def _call(func: Callable, item: Any) -> Any:
+    try:
+        return func(item)
+    except Exception as e:
+        return e
+
+
+async def _acall(func: Callable, item: Any) -> Any:
+    try:
+        return await func(item)
+    except Exception as e:
+        return e
@@ -0,0 +1,30 @@
+import re
+
+
+# Logical names of rosreestr endpoints, they are used instead of raw urls
+# as cache namespaces and labels
+MACRO_REGIONS = 'macro_regions'
+REGIONS = 'regions'
+REGION_TYPES = 'region_types'
+RIGHT = 'right'
+ADDRESS = 'address'
+FIR_OBJECT = 'fir_object'
+PKK_PARCEL_BY_COORDS = 'pkk_parcel_by_coords'
+PKK_PARCEL_BY_CADASTRAL_ID = 'pkk_parcel_by_cadastral_id'
+PKK_BUILDING_BY_COORDS = 'pkk_building_by_coords'
+PKK_BUILDING_BY_CADASTRAL_ID = 'pkk_building_by_cadastral_id'
+OTHER = 'other'
+
+_PKK_COORDINATES = r'\?text=-?[\d.]+(%20| )-?[\d.]+&'
+ENDPOINT_PATTERNS = (
+    (re.compile(r'/api/online/macro_regions/'), MACRO_REGIONS),
+    (re.compile(r'/api/online/regions/'), REGIONS),
+    (re.compile(r'/api/online/region_types/'), REGION_TYPES),
+    (re.compile(r'/api/online/right/'), RIGHT),
+    (re.compile(r'/api/online/address/fir_objects/'), ADDRESS),
+    (re.compile(r'/api/online/fir_object/'), FIR_OBJECT),
+    (re.compile(r'/api/features/1' + _PKK_COORDINATES), PKK_PARCEL_BY_COORDS),
+    (re.compile(r'/api/features/1\?'), PKK_PARCEL_BY_CADASTRAL_ID),
+    (re.compile(r'/api/features/5' + _PKK_COORDINATES), PKK_BUILDING_BY_COORDS),
+    (re.compile(r'/api/features/5\?'), PKK_BUILDING_BY_CADASTRAL_ID),
+)
@@ -0,0 +1,258 @@
+import contextlib
+import heapq
+import itertools
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from rosreestr_api.clients import endpoints as endpoint_names
+from rosreestr_api.clients.metrics import Histogram
+from rosreestr_api.clients.transport import get_pool_managers
+
+
+@dataclass
+class HedgeStats:
+
+    # hedgeable requests
+    requests: int = 0
+    hedges: int = 0
+    # hedges answered before the original request
+    wins: int = 0
+    # hedges not sent because the budget was spent
+    throttled: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class HedgePolicy:
+    # Hedged requests, https://research.google/pubs/the-tail-at-scale/
+    # If a response has not arrived after the `quantile` of latencies observed for
+    # the endpoint (or after a fixed `delay`), the same request is sent once more and
+    # the first answer is taken. Every hedgeable request adds `max_ratio` of a hedge to
+    # the budget, up to `burst` hedges, so hedges add at most `max_ratio` of extra load.
+    # Only GET requests of `endpoints` are hedged, they are idempotent.
+    # One instance can be shared by threads and clients.
+    DEFAULT_ENDPOINTS = (
+        endpoint_names.FIR_OBJECT,
+        endpoint_names.PKK_PARCEL_BY_COORDS,
+        endpoint_names.PKK_PARCEL_BY_CADASTRAL_ID,
+        endpoint_names.PKK_BUILDING_BY_COORDS,
+        endpoint_names.PKK_BUILDING_BY_CADASTRAL_ID,
+    )
+    METHODS = ('GET',)
+    # 10ms to 25s, every bucket is 25% wider than the previous one
+    BUCKETS = tuple(round(0.01 * 1.25 ** power, 4) for power in range(36))
+
+    def __init__(self, quantile: float = 0.95, delay: float = None, min_delay: float = 0.01,
+                 max_ratio: float = 0.1, burst: float = 10, min_samples: int = 20,
+                 window: int = 1000, endpoints: Iterable[str] = DEFAULT_ENDPOINTS,
+                 max_threads: int = 64):
+        self.quantile = quantile
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.burst = burst
+        # requests are not hedged until the endpoint has min_samples latencies
+        self.min_samples = min_samples
+        # latencies are estimated by the last `window` to `2 * window` responses
+        self.window = window
+        self.endpoints = frozenset(endpoints)
+        # threads of a client sending hedges, original requests are sent by callers
+        self.max_threads = max_threads
+        self.stats = HedgeStats()
+        self._tokens = 0.0
+        self._latencies = {}
+        self._previous_latencies = {}
+        self._lock = threading.Lock()
+
+    def is_hedgeable(self, method: str, endpoint: str) -> bool:
+        return method in self.METHODS and endpoint in self.endpoints
+
+    def get_delay(self, endpoint: str) -> Optional[float]:
+        # None if the endpoint has too few latencies to hedge its requests
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or latencies.count < self.min_samples:
+                latencies = self._previous_latencies.get(endpoint)
+            if latencies is None or latencies.count < self.min_samples:
+                return None
+            return max(self.min_delay, latencies.get_quantile(self.quantile))
+
+    def observe(self, endpoint: str, duration: float):
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or latencies.count >= self.window:
+                self._previous_latencies[endpoint] = latencies
+                latencies = self._latencies[endpoint] = Histogram(self.BUCKETS)
+            latencies.observe(duration)
+
+    def add_request(self):
+        with self._lock:
+            self.stats.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.max_ratio)
+
+    def acquire(self) -> bool:
+        # takes a hedge from the budget
+        with self._lock:
+            if self._tokens < 1:
+                self.stats.throttled += 1
+                return False
+            self._tokens -= 1
+            self.stats.hedges += 1
+            return True
+
+    def record_win(self):
+        with self._lock:
+            self.stats.wins += 1
+
+
+class HedgedCall:
+    # The state of an original request sent by the caller thread and of its hedge.
+    # The first answer wins, the lock orders the winner, the hedge and the connection.
+
+    def __init__(self, on_sent: Callable[[], None]):
+        self.lock = threading.Lock()
+        self.winner = None
+        self.hedge = None
+        # no hedges are sent after the caller has the result of the original request
+        self.is_closed = False
+        self.is_aborted = False
+        self._on_sent = on_sent
+        self._is_sent = False
+        self._connection = None
+
+    def set_connection(self, connection):
+        with self.lock:
+            self._connection = connection
+            is_first = not self._is_sent
+            self._is_sent = True
+        # the delay starts when the request has a connection, not when it waits for one
+        if is_first:
+            self._on_sent()
+
+    def release_connection(self):
+        # the connection went back to the pool, other requests can use it now
+        with self.lock:
+            self._connection = None
+
+    def win(self, winner: Any) -> bool:
+        # True if the winner is the given one
+        with self.lock:
+            if self.winner is None:
+                self.winner = winner
+            return self.winner is winner
+
+    def abort(self):
+        # The caller thread is blocked reading the response of the original request,
+        # shutting its socket down wakes it up with a connection error. A connection
+        # which is still being opened can't be aborted, the caller waits for it.
+        with self.lock:
+            if self.is_closed:
+                return
+            self.is_aborted = True
+            sock = getattr(self._connection, 'sock', None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class HedgeTimer:
+    # One thread of a client calls the callbacks of hedgeable requests after their delays
+
+    def __init__(self):
+        self._callbacks = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._is_closed = False
+
+    def schedule(self, delay: float, callback: Callable[[], None]):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='rosreestr-hedge-timer', daemon=True)
+                self._thread.start()
+            heapq.heappush(
+                self._callbacks, (time.monotonic() + delay, next(self._counter), callback))
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._is_closed = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._is_closed:
+                    now = time.monotonic()
+                    if self._callbacks and self._callbacks[0][0] <= now:
+                        break
+                    self._condition.wait(
+                        self._callbacks[0][0] - now if self._callbacks else None)
+                if self._is_closed:
+                    return
+                _, _, callback = heapq.heappop(self._callbacks)
+            callback()
+
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def track(call: HedgedCall):
+    # connections of the requests sent by the thread in the block are tracked by the call
+    _local.call = call
+    try:
+        yield call
+    finally:
+        _local.call = None
+
+
+def get_current_call() -> Optional[HedgedCall]:
+    return getattr(_local, 'call', None)
+
+
+class _HedgedPoolMixin:
+
+    def _get_conn(self, *args, **kwargs):
+        connection = super()._get_conn(*args, **kwargs)
+        call = get_current_call()
+        if call is not None:
+            call.set_connection(connection)
+        return connection
+
+    def _put_conn(self, connection):
+        call = get_current_call()
+        if call is not None:
+            call.release_connection()
+        return super()._put_conn(connection)
+
+
+_hedged_pool_classes = {}
+
+
+def instrument_session(session):
+    # requests sessions and urllib3 transports report connections of tracked requests
+    # after this call, it works together with tracing.instrument_session
+    for pool_manager in get_pool_managers(session):
+        pool_manager.pool_classes_by_scheme = {
+            scheme: _get_hedged_pool_cls(pool_cls)
+            for scheme, pool_cls in pool_manager.pool_classes_by_scheme.items()}
+
+
+def _get_hedged_pool_cls(pool_cls):
+    if issubclass(pool_cls, _HedgedPoolMixin):
+        return pool_cls
+    hedged_pool_cls = _hedged_pool_classes.get(pool_cls)
+    if hedged_pool_cls is None:
+        hedged_pool_cls = _hedged_pool_classes[pool_cls] = type(
+            f'Hedged{pool_cls.__name__}', (_HedgedPoolMixin, pool_cls), {})
+    return hedged_pool_cls
@@ -1,23 +1,75 @@
 import logging
 import os.path
+import random
 import ssl
+import threading
 import time
-from typing import Union
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Union
 from urllib.parse import urlencode
 from importlib.util import find_spec
 
 import requests
 from requests import Session
-from requests.adapters import HTTPAdapter
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
 
 import rosreestr_api
+from rosreestr_api.clients import endpoints, hedging, tracing
+from rosreestr_api.clients.hedging import HedgePolicy
+from rosreestr_api.clients.metrics import Metrics
+from rosreestr_api.clients.ratelimit import RateLimiter
+from rosreestr_api.clients.retry import CircuitBreaker, RetryPolicy
+from rosreestr_api.clients.tracing import Tracer
+from rosreestr_api.clients.transport import BaseTransport, Urllib3Transport
+from rosreestr_api.clients.useragent import DEFAULT_POOL, UserAgentPool
 
 
 logger = logging.getLogger(__name__)
 
+CACERT_PATH = os.path.join(
+    os.path.dirname(find_spec(rosreestr_api.__name__).origin),
+    'cacert.pem'
+)
+
+
+class PooledSession(Session):
+    ADAPTER_CLS = HTTPAdapter
+
+    def __init__(self, pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE,
+                 pool_block=DEFAULT_POOLBLOCK):
+        super().__init__()
+        adapter = self.ADAPTER_CLS(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.mount(prefix='https://', adapter=adapter)
+        self.mount(prefix='http://', adapter=adapter)
+
+    def prepare(self, method, url, default_headers, headers=None,
+                **kwargs) -> requests.PreparedRequest:
+        # the request is prepared without the session state: cookies, auth and so on
+        request_headers = default_headers.copy()
+        request_headers.update(headers or {})
+        return requests.Request(method, url, headers=request_headers, **kwargs).prepare()
+
 
 class BaseHTTPClient:
-    SESSION_CLS = Session
+    # With keep_alive=True one session is shared by all threads using the client.
+    # It is safe, because requests are prepared without the session state and
+    # urllib3 connection pools are thread-safe. pool_maxsize limits connections
+    # kept per host, with pool_block=True threads wait for a free connection
+    # instead of opening extra ones.
+    # transport='urllib3' sends requests with URLLIB3_TRANSPORT_CLS instead of
+    # a requests session, it costs less CPU per request, look at Urllib3Transport.
+    # With a hedge_policy slow requests are sent twice and the first answer is taken,
+    # look at HedgePolicy.
+    # Without a pinned user_agent or a User-Agent in default_headers it is taken from
+    # user_agent_pool on the first request of a session or on every request.
+    SESSION_CLS = PooledSession
+    URLLIB3_TRANSPORT_CLS = Urllib3Transport
+    TRANSPORTS = ('requests', 'urllib3')
+    USER_AGENT_ROTATIONS = ('session', 'request')
+    # (compiled regex, endpoint name) pairs used to label requests by url
+    ENDPOINT_PATTERNS = ()
+    LOG_BODY_MAX_LENGTH = 2048
 
     GET_HTTP_METHOD = 'GET'
     POST_HTTP_METHOD = 'POST'
@@ -29,20 +81,106 @@ class BaseHTTPClient:
     LOG_RESPONSE_TEMPLATE = (LOG_REQUEST_TEMPLATE +
                              ' - HTTP %(status_code)s%(response_body)s%(duration)s')
 
-    def __init__(self, timeout=3, keep_alive=False, default_headers=None):
+    def __init__(self, timeout=3, keep_alive=False, default_headers=None,
+                 rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None,
+                 circuit_breaker: CircuitBreaker = None, pool_connections=DEFAULT_POOLSIZE,
+                 pool_maxsize=DEFAULT_POOLSIZE, pool_block=DEFAULT_POOLBLOCK,
+                 log_body_max_length: int = LOG_BODY_MAX_LENGTH,
+                 log_sample_rates: Dict[str, float] = None, metrics: Metrics = None,
+                 tracer: Tracer = None, transport: str = 'requests',
+                 hedge_policy: HedgePolicy = None, user_agent: str = None,
+                 user_agent_pool: UserAgentPool = None, user_agent_rotation: str = 'session'):
+        if transport not in self.TRANSPORTS:
+            raise ValueError(f'Unknown transport: {transport}, use one of {self.TRANSPORTS}')
+        if user_agent_rotation not in self.USER_AGENT_ROTATIONS:
+            raise ValueError(
+                f'Unknown user_agent_rotation: {user_agent_rotation}, '
+                f'use one of {self.USER_AGENT_ROTATIONS}')
         self.timeout = timeout
         self.keep_alive = keep_alive
-        self.default_headers = default_headers or {}
+        default_headers = default_headers or {}
+        if user_agent is not None:
+            default_headers = dict(default_headers, **{'User-Agent': user_agent})
+        self.default_headers = default_headers
+        self.user_agent_pool = user_agent_pool
+        self.user_agent_rotation = user_agent_rotation
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        # None disables truncation of logged bodies
+        self.log_body_max_length = log_body_max_length
+        # endpoint name -> share of requests to log, look at ENDPOINT_PATTERNS
+        self.log_sample_rates = log_sample_rates or {}
+        self.metrics = metrics
+        self.tracer = tracer
+        self.transport = transport
+        self.hedge_policy = hedge_policy
         self._session = None
+        self._session_lock = threading.Lock()
+        self._hedge_executor = None
+        self._hedge_timer = None
+
+    @property
+    def default_headers(self) -> dict:
+        if self.user_agent_pool is None or 'User-Agent' in self._default_headers:
+            return self._default_headers
+        if self.user_agent_rotation == 'request':
+            return self._with_user_agent(self.user_agent_pool.get_random())
+        if self._session_headers is None:
+            self._session_headers = self._with_user_agent(self.user_agent_pool.get_random())
+        return self._session_headers
+
+    @default_headers.setter
+    def default_headers(self, headers: dict):
+        self._default_headers = headers
+        self._session_headers = None
+
+    def _with_user_agent(self, user_agent: str) -> dict:
+        headers = self._default_headers.copy()
+        headers['User-Agent'] = user_agent
+        return headers
 
     @property
-    def session(self) -> requests.Session:
+    def session(self) -> Union[requests.Session, BaseTransport]:
         if self.keep_alive:
             if not self._session:
-                self._session = self.SESSION_CLS()
+                with self._session_lock:
+                    if not self._session:
+                        self._session = self._create_session()
             return self._session
         else:
-            return self.SESSION_CLS()
+            return self._create_session()
+
+    def _create_session(self) -> Union[requests.Session, BaseTransport]:
+        # every session gets another User-Agent, without keep_alive it is every request
+        self._session_headers = None
+        if self.transport == 'urllib3':
+            session = self.URLLIB3_TRANSPORT_CLS(
+                pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                pool_block=self.pool_block)
+        else:
+            session = self.SESSION_CLS(
+                pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                pool_block=self.pool_block)
+        if self.tracer is not None:
+            tracing.instrument_session(session)
+        if self.hedge_policy is not None:
+            hedging.instrument_session(session)
+        return session
+
+    def close(self):
+        if self._session:
+            self._session.close()
+            self._session = None
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        if self._hedge_timer is not None:
+            self._hedge_timer.close()
+            self._hedge_timer = None
 
     def get(self, url, params=None, **kwargs) -> requests.Response:
         if params:
@@ -62,95 +200,363 @@ class BaseHTTPClient:
         return self._make_request(self.PUT_HTTP_METHOD, url, **kwargs)
 
     def _log_request(self, method, url, body, duration=None, log_method=logger.info):
+        # bodies and durations are rendered only when a handler emits the record
         message_params = {
-            'method': method, 'url': url, 'request_body': _get_body_for_logging(body),
-            'duration': _get_duration_for_logging(duration)}
+            'method': method, 'url': url,
+            'request_body': _LogBody(body, self.log_body_max_length),
+            'duration': _LogDuration(duration)}
         log_method(self.LOG_REQUEST_TEMPLATE, message_params)
 
     def _log_response(self, response, duration, log_method=logger.info):
         message_params = {
             'method': response.request.method,
             'url': response.request.url,
-            'request_body': _get_body_for_logging(response.request.body),
+            'request_body': _LogBody(response.request.body, self.log_body_max_length),
             'status_code': response.status_code,
-            'response_body': _get_body_for_logging(response.content),
-            'duration': _get_duration_for_logging(duration)}
+            'response_body': _LogBody(_get_loaded_content(response), self.log_body_max_length),
+            'duration': _LogDuration(duration)}
         log_method(self.LOG_RESPONSE_TEMPLATE, message_params)
 
-    def _make_request(self, method, url, **kwargs) -> requests.Response:
-        kwargs.setdefault('timeout', self.timeout)
+    def _get_endpoint(self, url) -> str:
+        for pattern, endpoint in self.ENDPOINT_PATTERNS:
+            if pattern.search(url):
+                return endpoint
+        return endpoints.OTHER
+
+    def _is_log_sampled(self, url) -> bool:
+        # errors are logged always, sampling applies to requests and successful responses
+        if not self.log_sample_rates:
+            return True
+        sample_rate = self.log_sample_rates.get(self._get_endpoint(url), 1)
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    def _make_request(self, method, url, stream=False, **kwargs) -> requests.Response:
+        # with stream=True the body is downloaded when the caller iterates it
         session = self.session
         timeout = kwargs.pop('timeout', self.timeout)
+        prepared_request = session.prepare(method, url, self.default_headers, **kwargs)
+        deadline = self._get_deadline()
+        attempt = 1
+        try:
+            while True:
+                try:
+                    attempt_timeout = self._get_attempt_timeout(timeout, deadline)
+                    if self._is_hedgeable(method, url, stream):
+                        response = self._send_hedged(
+                            session, prepared_request, attempt_timeout, attempt=attempt)
+                    else:
+                        response = self._send(
+                            session, prepared_request, attempt_timeout, attempt=attempt,
+                            stream=stream)
+                except requests.exceptions.RequestException as e:
+                    delay = self._get_retry_delay(method, attempt, deadline, error=e)
+                    if delay is None:
+                        raise
+                else:
+                    delay = self._get_retry_delay(method, attempt, deadline, response=response)
+                    if delay is None:
+                        return response
+                    response.close()
+                self._record_retry(url)
+                time.sleep(delay)
+                attempt += 1
+                logger.info(f'Request is retried, url: {url}, attempt: {attempt}')
+        finally:
+            if not self.keep_alive:
+                session.close()
 
-        headers = self.default_headers.copy()
-        headers.update(kwargs.pop('headers', {}))
-
-        request = requests.Request(method, url, headers=headers, **kwargs)
-        prepared_request = request.prepare()
-        self._log_request(method, url, prepared_request.body)
+    def _send(self, session, prepared_request, timeout, attempt=1,
+              stream=False) -> requests.Response:
+        method, url = prepared_request.method, prepared_request.url
+        is_log_sampled = self._is_log_sampled(url)
+        if is_log_sampled:
+            self._log_request(method, url, prepared_request.body)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request(url)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(url)
+        span = self._start_span(method, url, attempt)
         start_time = time.time()
         try:
-            response = session.send(prepared_request, timeout=timeout)
+            with tracing.use_span(span):
+                response = session.send(prepared_request, timeout=timeout, stream=stream)
             duration = time.time() - start_time
+            self._record_response(url, duration, response=response, span=span)
             if response.status_code >= 400:
-                log_method = logging.error
-            else:
-                log_method = logging.debug
-
-            self._log_response(response, duration=duration, log_method=log_method)
+                self._log_response(response, duration=duration, log_method=logging.error)
+            elif is_log_sampled:
+                self._log_response(response, duration=duration, log_method=logging.debug)
             return response
         except requests.exceptions.RequestException as e:
+            call = hedging.get_current_call()
+            if call is not None and call.is_aborted:
+                # the hedge has won, the original request is not a failure of the server
+                if span is not None:
+                    self.tracer.finish_span(span, error=e)
+                raise
             duration = time.time() - start_time
+            self._record_response(url, duration, error=e, span=span)
             if e.response:
                 self._log_response(e.response, duration=duration, log_method=logging.error)
             else:
                 self._log_request(method, url, prepared_request.body, log_method=logging.exception)
             raise
-        finally:
-            if not self.keep_alive:
-                session.close()
+
+    def _send_hedged(self, session, prepared_request, timeout,
+                     attempt=1) -> requests.Response:
+        # The original request is sent by the caller thread. If it has no answer after
+        # the delay counted from the moment it got a connection, a hedge is sent by a
+        # thread of the client. The first answer wins, the original request is aborted
+        # and the response of the hedge is closed when it arrives.
+        url = prepared_request.url
+        delay = self.hedge_policy.get_delay(self._get_endpoint(url))
+        self.hedge_policy.add_request()
+        if delay is None:
+            return self._send(session, prepared_request, timeout, attempt=attempt)
+
+        def on_hedge_done(future):
+            if _is_answer(future) and call.win(future):
+                call.abort()
+            else:
+                _close_response(future)
+
+        def send_hedge():
+            with call.lock:
+                if (call.is_closed or call.winner is not None or
+                        not self.hedge_policy.acquire()):
+                    return
+                self._record_hedge(url)
+                call.hedge = self._get_hedge_executor().submit(
+                    self._send, session, prepared_request, timeout, attempt=attempt)
+            call.hedge.add_done_callback(on_hedge_done)
+
+        call = hedging.HedgedCall(
+            on_sent=lambda: self._get_hedge_timer().schedule(delay, send_hedge))
+        response = error = None
+        with hedging.track(call):
+            try:
+                response = self._send(session, prepared_request, timeout, attempt=attempt)
+            except requests.exceptions.RequestException as e:
+                error = e
+        with call.lock:
+            call.is_closed = True
+            hedge = call.hedge
+            is_won = (call.winner is None and response is not None and
+                      response.status_code < 500)
+            if is_won:
+                call.winner = response
+        if hedge is not None and not is_won:
+            wait([hedge])
+            if _is_answer(hedge) and call.win(hedge):
+                self.hedge_policy.record_win()
+                if response is not None:
+                    response.close()
+                return hedge.result()
+        # if both requests failed, the failure of the original one is returned
+        if error is not None:
+            raise error
+        return response
+
+    def _get_hedge_timer(self) -> hedging.HedgeTimer:
+        if self._hedge_timer is None:
+            with self._session_lock:
+                if self._hedge_timer is None:
+                    self._hedge_timer = hedging.HedgeTimer()
+        return self._hedge_timer
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._session_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.hedge_policy.max_threads,
+                        thread_name_prefix='rosreestr-hedge')
+        return self._hedge_executor
+
+    def _is_hedgeable(self, method, url, stream=False) -> bool:
+        # streamed bodies are read by the caller, so they can't be raced
+        return (self.hedge_policy is not None and not stream and
+                self.hedge_policy.is_hedgeable(method, self._get_endpoint(url)))
+
+    def _start_span(self, method, url, attempt) -> Optional[tracing.Span]:
+        if self.tracer is None:
+            return None
+        return self.tracer.start_span(
+            method, url, endpoint=self._get_endpoint(url), attempt=attempt)
+
+    def _record_response(self, url, duration, response=None, error=None, span=None):
+        status_code = response.status_code if response is not None else None
+        if self.rate_limiter is not None:
+            self.rate_limiter.update(url, status_code=status_code, duration=duration, error=error)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(url, status_code=status_code, error=error)
+        if self.metrics is not None:
+            self.metrics.observe_request(
+                self._get_endpoint(url), duration, status_code=status_code,
+                bytes_received=_get_content_length(response))
+        if span is not None:
+            self.tracer.finish_span(span, status_code=status_code, error=error)
+        if self.hedge_policy is not None and status_code is not None and status_code < 500:
+            self.hedge_policy.observe(self._get_endpoint(url), duration)
+
+    def _record_retry(self, url):
+        if self.metrics is not None:
+            self.metrics.increment('retries', self._get_endpoint(url))
+
+    def _record_hedge(self, url):
+        if self.metrics is not None:
+            self.metrics.increment('hedges', self._get_endpoint(url))
+
+    def _get_deadline(self):
+        if self.retry_policy is not None and self.retry_policy.deadline is not None:
+            return time.monotonic() + self.retry_policy.deadline
+        return None
+
+    def _get_attempt_timeout(self, timeout, deadline):
+        if deadline is None or timeout is None:
+            return timeout
+        return max(0.001, min(timeout, deadline - time.monotonic()))
+
+    def _get_retry_delay(self, method, attempt, deadline, response=None, error=None):
+        if self.retry_policy is None or not self.retry_policy.should_retry(
+                method, attempt, response=response, error=error):
+            return None
+        delay = self.retry_policy.get_delay(attempt, response=response)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+
+def create_ssl_context(cafile: str = None) -> ssl.SSLContext:
+    ssl_context = ssl.create_default_context()
+    # https://www.openssl.org/docs/man3.0/man3/SSL_CTX_set_security_level.html
+    # rosreestr supports only SECLEVEL 1
+    ssl_context.set_ciphers('DEFAULT@SECLEVEL=1')
+    # We want to use the most secured protocol from security level 1
+    ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
+    if cafile:
+        ssl_context.load_verify_locations(cafile=cafile)
+    return ssl_context
+
+
+_ssl_context = None
+_ssl_context_lock = threading.Lock()
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    # One context for all sessions and clients of the process, so the ciphers are set
+    # and cacert.pem is parsed once. SSLContext is safe to share between threads.
+    global _ssl_context
+    if _ssl_context is None:
+        with _ssl_context_lock:
+            if _ssl_context is None:
+                _ssl_context = create_ssl_context(cafile=CACERT_PATH)
+    return _ssl_context
 
 
 class HTTPSAdapter(HTTPAdapter):
     def init_poolmanager(self, *args, **kwargs):
-        ssl_context = ssl.create_default_context()
-        # https://www.openssl.org/docs/man3.0/man3/SSL_CTX_set_security_level.html
-        # rosreestr supports only SECLEVEL 1
-        ssl_context.set_ciphers('DEFAULT@SECLEVEL=1')
-        # We want to use the most secured protocol from security level 1
-        ssl_context.minimum_version = ssl.TLSVersion.TLSv1_2
-        kwargs['ssl_context'] = ssl_context
+        kwargs['ssl_context'] = get_ssl_context()
         return super().init_poolmanager(*args, **kwargs)
 
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if verify == CACERT_PATH and url.lower().startswith('https'):
+            # the shared ssl context already trusts cacert.pem, otherwise urllib3
+            # loads the CA bundle into the context for every new connection
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
 
-class CustomSession(Session):
-    CACERT_PATH = os.path.join(
-        os.path.dirname(find_spec(rosreestr_api.__name__).origin),
-        'cacert.pem'
-    )
-    def __init__(self):
-        super().__init__()
+
+class CustomUrllib3Transport(Urllib3Transport):
+
+    def __init__(self, **kwargs):
+        super().__init__(ssl_context=get_ssl_context(), **kwargs)
+
+
+class CustomSession(PooledSession):
+    ADAPTER_CLS = HTTPSAdapter
+    CACERT_PATH = CACERT_PATH
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
         self.verify = self.CACERT_PATH
-        self.mount(prefix='https://', adapter=HTTPSAdapter())
 
 
 class RosreestrHTTPClient(BaseHTTPClient):
     SESSION_CLS = CustomSession
+    URLLIB3_TRANSPORT_CLS = CustomUrllib3Transport
+    ENDPOINT_PATTERNS = endpoints.ENDPOINT_PATTERNS
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('user_agent_pool', DEFAULT_POOL)
+        super().__init__(*args, **kwargs)
+
+
+class _LogBody:
+    __slots__ = ('body', 'max_length')
+
+    def __init__(self, body: Union[bytes, str, None], max_length: int = None):
+        self.body = body
+        self.max_length = max_length
+
+    def __str__(self) -> str:
+        return _get_body_for_logging(self.body, self.max_length)
+
+
+class _LogDuration:
+    __slots__ = ('duration',)
+
+    def __init__(self, duration: Optional[float]):
+        self.duration = duration
+
+    def __str__(self) -> str:
+        return _get_duration_for_logging(self.duration)
+
+
+def _is_answer(future: Future) -> bool:
+    return future.exception() is None and future.result().status_code < 500
+
+
+def _close_response(future: Future):
+    if future.exception() is None:
+        future.result().close()
+
+
+def _get_loaded_content(response: requests.Response) -> Optional[bytes]:
+    # the body of a streamed response is downloaded only when it is iterated
+    return response.content if response._content is not False else None
+
+
+def _get_content_length(response: Optional[requests.Response]) -> int:
+    if response is None:
+        return 0
+    content = _get_loaded_content(response)
+    if content is not None:
+        return len(content)
+    try:
+        return int(response.headers.get('Content-Length', 0))
+    except ValueError:
+        return 0
 
 
-def _get_body_for_logging(body: Union[bytes, str]) -> str:
+def _get_body_for_logging(body: Union[bytes, str], max_length: int = None) -> str:
+    is_truncated = max_length is not None and body is not None and len(body) > max_length
+    suffix = f'... ({len(body)} in total)' if is_truncated else ''
     try:
         if isinstance(body, bytes):
+            if is_truncated:
+                return ' BODY: ' + body[:max_length].decode('utf-8', errors='ignore') + suffix
             return (b' BODY: ' + body).decode('utf-8')
         elif isinstance(body, str):
-            return ' BODY: ' + body
+            return ' BODY: ' + (body[:max_length] if is_truncated else body) + suffix
         else:
             return ''
     except UnicodeDecodeError:
         return ''
 
 
-def _get_duration_for_logging(duration: str) -> str:
+def _get_duration_for_logging(duration: Optional[float]) -> str:
     if duration is not None:
         return ' {0:.6f}s'.format(duration)
     else:
@@ -0,0 +1,137 @@
+import bisect
+import threading
+from typing import Dict, Iterable, Optional
+
+
+class Histogram:
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = sorted(buckets)
+        # the last count is for values greater than the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_quantile(self, quantile: float) -> Optional[float]:
+        # linear interpolation inside the bucket, like histogram_quantile in Prometheus
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        cumulative_count = 0
+        for index, count in enumerate(self.counts):
+            if cumulative_count + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower_bound = self.buckets[index - 1] if index else 0.0
+                upper_bound = self.buckets[index]
+                return lower_bound + (upper_bound - lower_bound) * (
+                    (rank - cumulative_count) / count)
+            cumulative_count += count
+        return self.buckets[-1]
+
+    def as_dict(self) -> dict:
+        cumulative_counts = []
+        cumulative_count = 0
+        for count in self.counts:
+            cumulative_count += count
+            cumulative_counts.append(cumulative_count)
+        buckets = dict(zip([str(bucket) for bucket in self.buckets] + ['+Inf'], cumulative_counts))
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class Metrics:
+    # Request metrics labelled by logical endpoint (look at rosreestr_api.clients.endpoints).
+    # One instance can be shared by threads and clients.
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10)
+    ERROR_STATUS = 'error'
+    PREFIX = 'rosreestr'
+    COUNTERS = ('bytes_received', 'retries', 'hedges', 'cache_hits', 'cache_misses')
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._latencies = {}
+        self._statuses = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint: str, duration: float, status_code: int = None,
+                        bytes_received: int = 0):
+        status = str(status_code) if status_code is not None else self.ERROR_STATUS
+        with self._lock:
+            latency = self._latencies.get(endpoint)
+            if latency is None:
+                latency = self._latencies[endpoint] = Histogram(self.buckets)
+            latency.observe(duration)
+            statuses = self._statuses.setdefault(endpoint, {})
+            statuses[status] = statuses.get(status, 0) + 1
+            self._increment('bytes_received', endpoint, bytes_received)
+
+    def increment(self, name: str, endpoint: str, value: int = 1):
+        with self._lock:
+            self._increment(name, endpoint, value)
+
+    def get_quantile(self, endpoint: str, quantile: float) -> Optional[float]:
+        with self._lock:
+            latency = self._latencies.get(endpoint)
+            return latency.get_quantile(quantile) if latency is not None else None
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            endpoints = set(self._latencies) | set(self._statuses)
+            for counters in self._counters.values():
+                endpoints.update(counters)
+            snapshot = {}
+            for endpoint in sorted(endpoints):
+                latency = self._latencies.get(endpoint)
+                snapshot[endpoint] = {
+                    'statuses': dict(self._statuses.get(endpoint, {})),
+                    'latency': latency.as_dict() if latency is not None else None}
+                for name in self.COUNTERS:
+                    snapshot[endpoint][name] = self._counters.get(name, {}).get(endpoint, 0)
+            return snapshot
+
+    def to_prometheus(self) -> str:
+        # Prometheus text exposition format 0.0.4
+        snapshot = self.snapshot()
+        lines = []
+        name = f'{self.PREFIX}_requests_total'
+        lines.extend([f'# HELP {name} Number of HTTP requests.', f'# TYPE {name} counter'])
+        for endpoint, metrics in snapshot.items():
+            for status, count in sorted(metrics['statuses'].items()):
+                lines.append(f'{name}{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        name = f'{self.PREFIX}_request_duration_seconds'
+        lines.extend([f'# HELP {name} Duration of HTTP requests.', f'# TYPE {name} histogram'])
+        for endpoint, metrics in snapshot.items():
+            latency = metrics['latency']
+            if latency is None:
+                continue
+            for bucket, count in latency['buckets'].items():
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bucket}"}} {count}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {latency["sum"]}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {latency["count"]}')
+
+        for counter in self.COUNTERS:
+            name = f'{self.PREFIX}_{counter}_total'
+            lines.extend([
+                f'# HELP {name} Number of {counter.replace("_", " ")}.',
+                f'# TYPE {name} counter'])
+            for endpoint, metrics in snapshot.items():
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {metrics[counter]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._statuses.clear()
+            self._counters.clear()
+
+    def _increment(self, name: str, endpoint: str, value: int):
+        counters = self._counters.setdefault(name, {})
+        counters[endpoint] = counters.get(endpoint, 0) + value
+
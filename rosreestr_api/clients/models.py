@@ -0,0 +1,145 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class _LazyField:
+    # A rarely used field, it is decoded from the compact payload on every access
+
+    def __init__(self, *path: str):
+        self.path = path
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return _get_by_path(instance.raw, self.path)
+
+
+class BaseModel:
+    # Common fields are kept as attributes and the whole payload is kept as compact
+    # json bytes, which take several times less memory than nested dicts. raw and lazy
+    # fields decode the payload on every access and don't keep the decoded dict.
+    # (attribute, path in the payload) pairs
+    FIELDS = ()
+
+    __slots__ = ('_payload',)
+
+    @classmethod
+    def from_raw(cls, raw: dict) -> 'BaseModel':
+        instance = cls.__new__(cls)
+        instance._set_fields(raw)
+        return instance
+
+    def _set_fields(self, raw: dict):
+        for attribute, path in self.FIELDS:
+            setattr(self, attribute, _get_by_path(raw, path))
+        self._payload = json.dumps(raw, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @property
+    def raw(self) -> dict:
+        return json.loads(self._payload)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._payload == other._payload
+
+    def __hash__(self):
+        return hash(self._payload)
+
+    def __repr__(self):
+        fields = ', '.join(
+            f'{attribute}={getattr(self, attribute)!r}' for attribute, _ in self.FIELDS)
+        return f'{type(self).__name__}({fields})'
+
+    def __getstate__(self):
+        return self._payload
+
+    def __setstate__(self, payload: bytes):
+        self._set_fields(json.loads(payload))
+
+
+class FirObject(BaseModel):
+    FIELDS = (
+        ('object_id', ('objectId',)),
+        ('type', ('type',)),
+        ('region_key', ('regionKey',)),
+        ('actual_date', ('firActualDate',)),
+        ('cadastral_id', ('objectData', 'objectCn')),
+        ('name', ('objectData', 'objectName')),
+        ('address', ('objectData', 'addressNote')),
+    )
+    __slots__ = tuple(attribute for attribute, _ in FIELDS)
+
+    object_data = _LazyField('objectData')
+    object_address = _LazyField('objectData', 'objectAddress')
+    parcel_data = _LazyField('parcelData')
+    realty_data = _LazyField('realtyData')
+    premises_data = _LazyField('premisesData')
+    right_encumbrance_objects = _LazyField('rightEncumbranceObjects')
+    old_numbers = _LazyField('oldNumbers')
+
+
+class PkkFeature(BaseModel):
+    FIELDS = (
+        ('id', ('attrs', 'id')),
+        ('cadastral_id', ('attrs', 'cn')),
+        ('address', ('attrs', 'address')),
+        ('type', ('type',)),
+    )
+    __slots__ = tuple(attribute for attribute, _ in FIELDS) + ('center', 'extent')
+
+    attrs = _LazyField('attrs')
+
+    def _set_fields(self, raw: dict):
+        super()._set_fields(raw)
+        # (x, y) and (xmin, ymin, xmax, ymax) in EPSG:3857
+        self.center = _get_point(raw.get('center'))
+        self.extent = _get_extent(raw.get('extent'))
+
+
+class PkkParcel(PkkFeature):
+    __slots__ = ()
+
+    area_value = _LazyField('attrs', 'area_value')
+    cadastral_cost = _LazyField('attrs', 'cad_cost')
+    category_type = _LazyField('attrs', 'category_type')
+    permitted_use = _LazyField('attrs', 'util_by_doc')
+
+
+class PkkBuilding(PkkFeature):
+    __slots__ = ()
+
+    purpose = _LazyField('attrs', 'purpose')
+    floors = _LazyField('attrs', 'floors')
+    year_built = _LazyField('attrs', 'year_built')
+    cadastral_cost = _LazyField('attrs', 'cad_cost')
+
+
+def get_fir_object(body: Any) -> Optional[FirObject]:
+    return FirObject.from_raw(body) if body else None
+
+
+def get_pkk_features(body: Any, model_cls) -> List[PkkFeature]:
+    features = body.get('features') if isinstance(body, dict) else None
+    return [model_cls.from_raw(feature) for feature in features or ()]
+
+
+def _get_by_path(raw: Any, path: Tuple[str, ...]) -> Any:
+    value = raw
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _get_point(point: Optional[dict]) -> Optional[Tuple[float, float]]:
+    if not point:
+        return None
+    return point.get('x'), point.get('y')
+
+
+def _get_extent(extent: Optional[dict]) -> Optional[Tuple[float, float, float, float]]:
+    if not extent:
+        return None
+    return extent.get('xmin'), extent.get('ymin'), extent.get('xmax'), extent.get('ymax')
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict
+from urllib.parse import urlsplit
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, burst: float = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        # Takes a token and returns how long the caller has to wait before using it,
+        # tokens can go below zero, so concurrent callers queue up behind each other.
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self.rate = rate
+
+
+class RateLimiter:
+    # Token bucket per host, one instance can be shared by threads and clients.
+    # With adaptive=True the rate of a host is adjusted with AIMD: it grows by
+    # `increase` requests per second after every successful response and is multiplied
+    # by `decrease` after 429, 5xx, connection errors or responses slower than `max_latency`.
+    THROTTLING_STATUS_CODES = frozenset([429])
+
+    def __init__(self, rate: float = 5, burst: float = None, rates: Dict[str, float] = None,
+                 adaptive: bool = False, min_rate: float = 0.5, max_rate: float = 50,
+                 increase: float = 0.1, decrease: float = 0.5, max_latency: float = None,
+                 decrease_interval: float = 1, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}
+        self.adaptive = adaptive
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.max_latency = max_latency
+        # several failed responses in a row usually have the same cause,
+        # so the rate is decreased not more often than once per interval
+        self.decrease_interval = decrease_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._decreased_at = {}
+        self._lock = threading.Lock()
+
+    def get_rate(self, url: str) -> float:
+        return self._get_bucket(_get_host(url)).rate
+
+    def acquire(self, url: str) -> float:
+        delay = self._get_bucket(_get_host(url)).reserve()
+        if delay > 0:
+            self._sleep(delay)
+        return delay
+
+    async def async_acquire(self, url: str) -> float:
+        delay = self._get_bucket(_get_host(url)).reserve()
+        if delay > 0:
+            import asyncio
+
+            await asyncio.sleep(delay)
+        return delay
+
+    def update(self, url: str, status_code: int = None, duration: float = None,
+               error: Exception = None):
+        if not self.adaptive:
+            return
+        host = _get_host(url)
+        bucket = self._get_bucket(host)
+        is_overloaded = (
+            error is not None
+            or status_code in self.THROTTLING_STATUS_CODES
+            or (status_code is not None and status_code >= 500)
+            or (self.max_latency is not None and duration is not None
+                and duration > self.max_latency))
+        with self._lock:
+            if is_overloaded:
+                now = self._clock()
+                if now - self._decreased_at.get(host, float('-inf')) < self.decrease_interval:
+                    return
+                self._decreased_at[host] = now
+                rate = max(self.min_rate, bucket.rate * self.decrease)
+                logger.warning(f'Rate limit was decreased, host: {host}, rate: {rate:.2f}')
+            else:
+                rate = min(self.max_rate, bucket.rate + self.increase)
+            bucket.set_rate(rate)
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    bucket = TokenBucket(
+                        self.rates.get(host, self.rate), burst=self.burst, clock=self._clock)
+                    self._buckets[host] = bucket
+        return bucket
+
+
+def _get_host(url: str) -> str:
+    return urlsplit(url).hostname or ''
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+REGION_TYPE_WORDS = frozenset(['область', 'обл', 'обл.', 'край', 'республика', 'респ', 'респ.'])
+
+
+class RegionsSnapshot:
+    # On-disk copy of macro regions and their regions, one snapshot can be shared
+    # by any number of processes, they only read the file and never download regions.
+    VERSION = 1
+    DEFAULT_TTL = 7 * 24 * 60 * 60
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = None
+
+    def load(self, allow_stale: bool = False) -> Optional[Tuple[List[dict], Dict[int, list]]]:
+        data = self._read()
+        if data is None:
+            return None
+        if not allow_stale and self.is_stale(data['created_at']):
+            logger.info(f'Regions snapshot is stale, path: {self.path}')
+            return None
+        macro_regions_to_regions = {
+            macro_region_id: regions for macro_region_id, regions in data['regions']}
+        return data['macro_regions'], macro_regions_to_regions
+
+    def save(self, macro_regions: List[dict], macro_regions_to_regions: Dict[int, list]):
+        data = {
+            'version': self.VERSION,
+            'created_at': time.time(),
+            'macro_regions': macro_regions,
+            'regions': [
+                [macro_region_id, regions]
+                for macro_region_id, regions in macro_regions_to_regions.items()]}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # readers never see a partially written file
+        with tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as file:
+            json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+        os.replace(file.name, self.path)
+        logger.info(f'Regions snapshot was saved, path: {self.path}')
+
+    def is_stale(self, created_at: float = None) -> bool:
+        if created_at is None:
+            data = self._read()
+            if data is None:
+                return True
+            created_at = data['created_at']
+        return time.time() - created_at > self.ttl
+
+    def _read(self) -> Optional[dict]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if mtime != self._mtime:
+                try:
+                    with open(self.path, encoding='utf-8') as file:
+                        data = json.load(file)
+                except ValueError:
+                    logger.exception(f'Regions snapshot is broken, path: {self.path}')
+                    return None
+                if data.get('version') != self.VERSION:
+                    logger.info(f'Regions snapshot has unknown version, path: {self.path}')
+                    return None
+                self._mtime, self._data = mtime, data
+            return self._data
+
+
+class RegionNamesIndex:
+    # Maps normalized names of macro regions or regions to their ids.
+    # An exact normalized name wins over a name without region type words.
+    def __init__(self, items: List[dict]):
+        self.source = items
+        self._ids = {}
+        ids_without_types = {}
+        for item in items:
+            name = normalize_region_name(item['name'])
+            self._ids.setdefault(name, item['id'])
+            ids_without_types.setdefault(strip_region_type(name), item['id'])
+        for name, item_id in ids_without_types.items():
+            self._ids.setdefault(name, item_id)
+
+    def get(self, name: str) -> Optional[int]:
+        name = normalize_region_name(name)
+        item_id = self._ids.get(name)
+        if item_id is None:
+            item_id = self._ids.get(strip_region_type(name))
+        return item_id
+
+
+def normalize_region_name(name: str) -> str:
+    name = name.lower().replace('ё', 'е').replace('-', ' ')
+    return ' '.join(name.split())
+
+
+def strip_region_type(normalized_name: str) -> str:
+    return ' '.join(
+        word for word in normalized_name.split(' ') if word not in REGION_TYPE_WORDS)
@@ -0,0 +1,135 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple, Type
+
+import requests
+
+from rosreestr_api.clients.ratelimit import _get_host
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+
+class RetryPolicy:
+
+    DEFAULT_STATUS_CODES = (429, 500, 502, 503, 504)
+    DEFAULT_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    DEFAULT_METHODS = ('GET',)
+
+    def __init__(self, max_attempts: int = 3, status_codes: Iterable[int] = DEFAULT_STATUS_CODES,
+                 exceptions: Tuple[Type[Exception], ...] = DEFAULT_EXCEPTIONS,
+                 methods: Iterable[str] = DEFAULT_METHODS, backoff_factor: float = 0.5,
+                 max_backoff: float = 10, jitter: bool = True, deadline: float = None,
+                 respect_retry_after: bool = True):
+        self.max_attempts = max_attempts
+        self.status_codes = frozenset(status_codes)
+        self.exceptions = exceptions
+        self.methods = frozenset(methods)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        # total time for all attempts including backoff, in seconds
+        self.deadline = deadline
+        self.respect_retry_after = respect_retry_after
+
+    def get_delay(self, attempt: int, response: requests.Response = None) -> float:
+        if self.respect_retry_after and response is not None:
+            retry_after = _get_retry_after(response)
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            # full jitter, https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+            delay = random.uniform(0, delay)
+        return delay
+
+    def should_retry(self, method: str, attempt: int, response: requests.Response = None,
+                     error: Exception = None) -> bool:
+        if attempt >= self.max_attempts or method not in self.methods:
+            return False
+        if isinstance(error, CircuitOpenError):
+            return False
+        if error is not None:
+            return isinstance(error, self.exceptions)
+        return response is not None and response.status_code in self.status_codes
+
+
+class CircuitBreaker:
+    # Per host circuit breaker, one instance can be shared by threads and clients.
+    # After `failure_threshold` consecutive failures requests to the host fail fast with
+    # CircuitOpenError, after `recovery_timeout` seconds one trial request is let through.
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30,
+                 failure_status_codes: Iterable[int] = (500, 502, 503, 504),
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_status_codes = frozenset(failure_status_codes)
+        self._clock = clock
+        self._failures = {}
+        self._opened_at = {}
+        self._trials = set()
+        self._lock = threading.Lock()
+
+    def get_state(self, url: str) -> str:
+        host = _get_host(url)
+        with self._lock:
+            return self._get_state(host)
+
+    def before_request(self, url: str):
+        host = _get_host(url)
+        with self._lock:
+            state = self._get_state(host)
+            if state == self.OPEN or (state == self.HALF_OPEN and host in self._trials):
+                raise CircuitOpenError(f'Circuit is open for host {host}')
+            if state == self.HALF_OPEN:
+                self._trials.add(host)
+
+    def record(self, url: str, status_code: int = None, error: Exception = None):
+        if error is not None or status_code in self.failure_status_codes:
+            self.record_failure(url)
+        else:
+            self.record_success(url)
+
+    def record_success(self, url: str):
+        host = _get_host(url)
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trials.discard(host)
+
+    def record_failure(self, url: str):
+        host = _get_host(url)
+        with self._lock:
+            self._trials.discard(host)
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                if host not in self._opened_at:
+                    logger.warning(f'Circuit was opened, host: {host}')
+                self._opened_at[host] = self._clock()
+
+    def _get_state(self, host: str) -> str:
+        opened_at = self._opened_at.get(host)
+        if opened_at is None:
+            return self.CLOSED
+        if self._clock() - opened_at < self.recovery_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+
+def _get_retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
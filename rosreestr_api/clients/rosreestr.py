@@ -1,11 +1,31 @@
 import logging
 from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type, Union
 from urllib.parse import quote_plus
 
 import requests
-from fake_useragent import UserAgent
 
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.cache import BaseCache
+from rosreestr_api.clients.cadastral import CadastralNumber, InvalidCadastralNumber
+from rosreestr_api.clients.concurrency import map_concurrently, unique
 from rosreestr_api.clients.http import RosreestrHTTPClient
+from rosreestr_api.clients.models import (
+    FirObject,
+    PkkBuilding,
+    PkkFeature,
+    PkkParcel,
+    get_fir_object,
+    get_pkk_features,
+)
+from rosreestr_api.clients.regions import (
+    RegionNamesIndex,
+    RegionsSnapshot,
+    normalize_region_name,
+)
+from rosreestr_api.clients.singleflight import SingleFlight
+from rosreestr_api.clients.spatial import SpatialCache, group_points
+from rosreestr_api.clients.streaming import iter_json_array
 
 logger = logging.getLogger(__name__)
 
@@ -46,16 +66,29 @@ class RosreestrAPIClient:
         + '&structure={house_structure}&apartment={apartment}')
     SEARCH_DETAILED_OBJECT_BY_ID = f'{BASE_URL}/fir_object/' + '{}/'
 
-    REPUBLIC = 'республика'
-
-    def __init__(self, timeout=5, keep_alive=False):
+    def __init__(self, timeout=5, keep_alive=False, lazy_regions=False, max_workers=8,
+                 regions_snapshot: RegionsSnapshot = None, cache: BaseCache = None,
+                 **http_client_kwargs):
         self._http_client = RosreestrHTTPClient(
             timeout=timeout,
             keep_alive=keep_alive,
-            default_headers={'User-Agent': UserAgent().random}
+            # rate_limiter, retry_policy, circuit_breaker and other BaseHTTPClient options
+            **http_client_kwargs
         )
+        # with lazy_regions only regions of a requested macro region are downloaded
+        self.lazy_regions = lazy_regions
+        self.max_workers = max_workers
+        self.regions_snapshot = regions_snapshot
+        self.cache = cache
+        # concurrent identical requests are sent once
+        self.single_flight = SingleFlight()
         self._macro_regions = None
-        self._macro_regions_to_regions = None
+        self._macro_regions_to_regions = {}
+        self._are_all_regions_loaded = False
+        self._names_indexes = {}
+
+    def close(self):
+        self._http_client.close()
 
     def _get_response_body(self, response: requests.Response):
         status_code = response.status_code
@@ -67,44 +100,124 @@ class RosreestrAPIClient:
         else:
             return response.json()
 
+    def _get_names_index(self, key, items: List[dict]) -> RegionNamesIndex:
+        # the index is rebuilt only when the directory is loaded again
+        names_index = self._names_indexes.get(key)
+        if names_index is None or names_index.source is not items:
+            names_index = RegionNamesIndex(items)
+            self._names_indexes[key] = names_index
+        return names_index
+
     def _get_macro_region_id(self, macro_region_name: str):
-        for macro_region in self.macro_regions:
-            if macro_region['name'].lower() == macro_region_name.lower():
-                return macro_region['id']
-        raise ValueError(
-            f'There was not found suitable macro region '
-            f'for macro region name - `{macro_region_name}`')
+        macro_region_id = self._get_names_index(None, self.macro_regions).get(macro_region_name)
+        if macro_region_id is None:
+            raise ValueError(
+                f'There was not found suitable macro region '
+                f'for macro region name - `{macro_region_name}`')
+        return macro_region_id
 
     def _get_region_id(self, region_name: str, macro_region_name: str) -> int:
         macro_region_id = self._get_macro_region_id(macro_region_name)
-        for region in self.macro_regions_to_regions[macro_region_id]:
-            if region['name'].lower() == region_name.lower():
-                return region['id']
-        raise ValueError(
-            f'There was not found suitable region_id for '
-            f'region name - `{region_name}` and macro region '
-            f'name - `{macro_region_name}`')
+        region_id = self._get_names_index(
+            macro_region_id, self._get_regions(macro_region_id)).get(region_name)
+        if region_id is None:
+            raise ValueError(
+                f'There was not found suitable region_id for '
+                f'region name - `{region_name}` and macro region '
+                f'name - `{macro_region_name}`')
+        return region_id
 
     @property
     def macro_regions(self):
-        if not self._macro_regions:
-            self._macro_regions = self._http_client.get(self.MACRO_REGIONS_URL).json()
-            logger.info('Macro regions were downloaded')
+        if not self._macro_regions and not self._load_regions_snapshot():
+            try:
+                self._macro_regions = self.single_flight.do(
+                    endpoints.MACRO_REGIONS, self._download_macro_regions)
+            except requests.RequestException:
+                if not self._load_regions_snapshot(allow_stale=True):
+                    raise
+                logger.warning('Macro regions were not downloaded, stale snapshot is used')
         return self._macro_regions
 
     @property
     def macro_regions_to_regions(self):
-        if not self._macro_regions_to_regions:
-            self._macro_regions_to_regions = {}
-            for macro_region in self.macro_regions:
-                response = self._http_client.get(
-                    self.REGIONS_URL.format(macro_region['id']))
-                self._macro_regions_to_regions[
-                    macro_region['id']] = response.json()
-            logger.info('Regions were downloaded')
+        if not self._are_all_regions_loaded and not self._load_regions_snapshot():
+            try:
+                macro_region_ids = [
+                    macro_region['id'] for macro_region in self.macro_regions
+                    if macro_region['id'] not in self._macro_regions_to_regions]
+                self._macro_regions_to_regions.update(self._download_all_regions(macro_region_ids))
+            except requests.RequestException:
+                if not self._load_regions_snapshot(allow_stale=True):
+                    raise
+                logger.warning('Regions were not downloaded, stale snapshot is used')
+            else:
+                self._are_all_regions_loaded = True
+                self._save_regions_snapshot()
         return self._macro_regions_to_regions
 
+    def refresh(self):
+        macro_regions = self._download_macro_regions()
+        macro_regions_to_regions = self._download_all_regions(
+            [macro_region['id'] for macro_region in macro_regions])
+        self._macro_regions = macro_regions
+        self._macro_regions_to_regions = macro_regions_to_regions
+        self._are_all_regions_loaded = True
+        self._save_regions_snapshot()
+
+    def _load_regions_snapshot(self, allow_stale=False) -> bool:
+        if self.regions_snapshot is None:
+            return False
+        snapshot = self.regions_snapshot.load(allow_stale=allow_stale)
+        if snapshot is None:
+            return False
+        self._macro_regions, self._macro_regions_to_regions = snapshot
+        self._are_all_regions_loaded = True
+        logger.info('Regions were loaded from snapshot')
+        return True
+
+    def _save_regions_snapshot(self):
+        if self.regions_snapshot is not None:
+            self.regions_snapshot.save(self._macro_regions, self._macro_regions_to_regions)
+
+    def _download_macro_regions(self) -> list:
+        macro_regions = _get_json(self._http_client.get(self.MACRO_REGIONS_URL))
+        logger.info('Macro regions were downloaded')
+        return macro_regions
+
+    def _download_all_regions(self, macro_region_ids) -> dict:
+        macro_regions_to_regions = {}
+        for macro_region_id, regions in map_concurrently(
+                self._download_regions, macro_region_ids, max_workers=self.max_workers):
+            if isinstance(regions, Exception):
+                raise regions
+            macro_regions_to_regions[macro_region_id] = regions
+        logger.info('Regions were downloaded')
+        return macro_regions_to_regions
+
+    def _get_regions(self, macro_region_id) -> list:
+        if not self.lazy_regions:
+            return self.macro_regions_to_regions[macro_region_id]
+        if macro_region_id not in self._macro_regions_to_regions:
+            self._macro_regions_to_regions[macro_region_id] = self._download_regions(
+                macro_region_id)
+        return self._macro_regions_to_regions[macro_region_id]
+
+    def _download_regions(self, macro_region_id) -> list:
+        return self.single_flight.do(
+            (endpoints.REGIONS, macro_region_id),
+            lambda: self._download_regions_once(macro_region_id))
+
+    def _download_regions_once(self, macro_region_id) -> list:
+        regions = _get_json(self._http_client.get(self.REGIONS_URL.format(macro_region_id)))
+        logger.info(f'Regions were downloaded, macro_region_id: {macro_region_id}')
+        return regions
+
     def get_region_types(self, region_id: str):
+        return self.single_flight.do(
+            (endpoints.REGION_TYPES, region_id), lambda: self._get_region_types(region_id))
+
+    def _get_region_types(self, region_id: str):
         response = self._http_client.get(self.REGION_TYPES_URL.format(region_id))
         return self._get_response_body(response)
 
@@ -112,23 +225,24 @@ class RosreestrAPIClient:
         url = self.SEARCH_OBJECTS_BY_RIGHT_URL.format(region_number, quote_plus(right_number))
         return self._get_response_body(self._http_client.get(url))
 
-    def get_objects_by_address(self, address_wrapper: AddressWrapper):
+    def _get_address_ids(self, address_wrapper: AddressWrapper):
         macro_region_id = address_wrapper.macro_region_id
         if not address_wrapper.macro_region_id:
-            macro_region_name = address_wrapper.macro_region_name.lower()
-            if macro_region_name.endswith('ая'):
-                macro_region_name = macro_region_name + ' область'
-            elif macro_region_name.endswith('ий'):
-                macro_region_name = macro_region_name + ' край'
-            elif address_wrapper.macro_region_type.lower() == self.REPUBLIC:
-                macro_region_name = f'{self.REPUBLIC} {macro_region_name}'
-            macro_region_id = self._get_macro_region_id(macro_region_name)
+            # region type words like `область` are optional for the names index
+            macro_region_id = self._get_macro_region_id(address_wrapper.macro_region_name)
 
         region_id = address_wrapper.region_id
         if not region_id:
             region_id = self._get_region_id(
                 address_wrapper.region_name, address_wrapper.macro_region_name)
+        return macro_region_id, region_id
+
+    def _get_objects_by_address_url(self, address_wrapper: AddressWrapper) -> str:
+        macro_region_id, region_id = self._get_address_ids(address_wrapper)
+        return self._format_objects_by_address_url(address_wrapper, macro_region_id, region_id)
 
+    def _format_objects_by_address_url(self, address_wrapper: AddressWrapper, macro_region_id,
+                                       region_id) -> str:
         search_objects_url = self.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
             macro_region_id=macro_region_id, region_id=region_id,
             street_name=address_wrapper.street_name,
@@ -136,11 +250,10 @@ class RosreestrAPIClient:
             house_building=address_wrapper.house_building,
             house_structure=address_wrapper.house_structure,
             apartment=address_wrapper.apartment)
-
         logger.info(f'search_objects_url: {search_objects_url}')
-        logger.info('Trying to download rosreestr objects')
-        response = self._http_client.get(search_objects_url)
+        return search_objects_url
 
+    def _get_objects_from_response(self, response: requests.Response) -> list:
         objects = self._get_response_body(response)
         if objects:
             logger.info('Rosreestr objects were downloaded')
@@ -149,14 +262,118 @@ class RosreestrAPIClient:
         else:
             return []
 
-    def get_object(self, obj_id: str):
-        obj_id = _strip_cadastral_id(obj_id)
+    def get_objects_by_address(self, address_wrapper: AddressWrapper):
+        search_objects_url = self._get_objects_by_address_url(address_wrapper)
+        return self._search_objects(search_objects_url)
+
+    def _search_objects(self, search_objects_url: str) -> list:
+        logger.info('Trying to download rosreestr objects')
+        response = self._http_client.get(search_objects_url)
+        return self._get_objects_from_response(response)
+
+    def get_objects_by_addresses(self, addresses: Iterable[Union[AddressWrapper, dict]],
+                                 max_workers: int = None) -> Iterator[Tuple[int, Any, Any]]:
+        # Yields (index, address, result) for every address as soon as its search is done,
+        # result is a list of objects or an exception instance. Addresses are AddressWrapper
+        # or dicts of its fields, invalid ones and ones with unknown regions get the error
+        # as the result. Every distinct region is resolved once, equal searches are sent once
+        # and searches are sent region by region.
+        rows = _get_address_rows(addresses)
+        address_ids = {}
+        for region_key, address_wrapper in _iter_distinct_regions(rows):
+            address_ids[region_key] = self._resolve_address_ids(address_wrapper)
+        searches, errors = self._group_address_searches(rows, address_ids)
+        yield from errors
+        results = map_concurrently(
+            self._search_objects, searches, max_workers=max_workers or self.max_workers,
+            ordered=False)
+        for url, result in results:
+            for index, address in searches[url]:
+                yield index, address, result
+
+    def _resolve_address_ids(self, address_wrapper: AddressWrapper):
+        try:
+            return self._get_address_ids(address_wrapper)
+        except (ValueError, requests.RequestException) as e:
+            return e
+
+    def _group_address_searches(self, rows: list, address_ids: dict) -> Tuple[dict, list]:
+        # address_ids are region keys -> (macro_region_id, region_id) or an error,
+        # returns search urls -> [(index, address)] ordered by region and error rows
+        searches_by_region = {}
+        errors = []
+        for index, address, address_wrapper in rows:
+            if isinstance(address_wrapper, Exception):
+                errors.append((index, address, address_wrapper))
+                continue
+            ids = address_ids[_get_region_key(address_wrapper)]
+            if isinstance(ids, Exception):
+                errors.append((index, address, ids))
+                continue
+            url = self._format_objects_by_address_url(address_wrapper, *ids)
+            searches_by_region.setdefault(tuple(ids), {}).setdefault(url, []).append(
+                (index, address))
+        searches = {}
+        for region_searches in searches_by_region.values():
+            searches.update(region_searches)
+        return searches, errors
+
+    def iter_objects_by_address(self, address_wrapper: AddressWrapper,
+                                chunk_size: int = 64 * 1024) -> Iterator[dict]:
+        # the same objects as get_objects_by_address, but they are parsed while
+        # the response is downloaded, so memory doesn't grow with their number
+        search_objects_url = self._get_objects_by_address_url(address_wrapper)
+        logger.info('Trying to stream rosreestr objects')
+        response = self._http_client.get(search_objects_url, stream=True)
+        with response:
+            if response.status_code >= 400:
+                response.raise_for_status()
+            objects_number = 0
+            for obj in iter_json_array(response.iter_content(chunk_size)):
+                objects_number += 1
+                yield obj
+        logger.info(f'Number of streamed rosreestr objects: {objects_number}')
+
+    def get_object(self, obj_id: Union[str, CadastralNumber],
+                   model: bool = False) -> Union[dict, FirObject, None]:
+        # with model=True a compact FirObject is returned instead of the response body
+        obj_id = _normalize_object_id(obj_id)
+        if self.cache is None:
+            body = self._get_shared_object(obj_id)
+        else:
+            body = self.cache.get_or_fetch(
+                endpoints.FIR_OBJECT, obj_id, lambda: self._get_shared_object(obj_id))
+        return get_fir_object(body) if model else body
+
+    def _get_shared_object(self, obj_id: str):
+        return self.single_flight.do(
+            (endpoints.FIR_OBJECT, obj_id), lambda: self._get_object(obj_id))
+
+    def _get_object(self, obj_id: str):
         url = self.SEARCH_DETAILED_OBJECT_BY_ID.format(obj_id)
         logger.info(f'Trying to download detailed object, object_id: {obj_id}')
         response = self._http_client.get(url)
         logger.info(f'Detailed object was downloaded, object_id: {obj_id}')
         return self._get_response_body(response)
 
+    def get_object_if_changed(self, obj_id: Union[str, CadastralNumber], etag: str = None,
+                              last_modified: str = None) -> Tuple[requests.Response, Any]:
+        # A conditional request with validators of a previous response, the cache is
+        # bypassed. The body is None when the object is not modified or not found.
+        url = self.SEARCH_DETAILED_OBJECT_BY_ID.format(_normalize_object_id(obj_id))
+        response = self._http_client.get(
+            url, headers=_get_conditional_headers(etag, last_modified))
+        if response.status_code in (204, 304, 404):
+            return response, None
+        return response, self._get_response_body(response)
+
+    def get_objects(self, obj_ids: Iterable[str], max_workers: int = None,
+                    ordered: bool = True, model: bool = False) -> Iterator[Tuple[str, Any]]:
+        obj_ids = unique(_normalize_object_ids(obj_ids))
+        return map_concurrently(
+            lambda obj_id: self.get_object(obj_id, model=model), obj_ids,
+            max_workers=max_workers or self.max_workers, ordered=ordered)
+
 
 class PKKRosreestrAPIClient:
 
@@ -166,43 +383,246 @@ class PKKRosreestrAPIClient:
     # https://geostart.ru/post/312
 
     BASE_URL = 'https://pkk.rosreestr.ru/api'
+    PARCEL_OBJECT_TYPE = 1
+    BUILDING_OBJECT_TYPE = 5
     SEARCH_OBJECT_BY_CADASTRAL_ID = (
         BASE_URL + '/features/{object_type}?text={{cadastral_id}}&limit={{limit}}&'
         + 'tolerance={{tolerance}}')
     SEARCH_OBJECT_BY_COORDINATES = (
         BASE_URL + '/features/{object_type}?text={{lat}}%20{{long}}&limit={{limit}}&'
         + 'tolerance={{tolerance}}')
-    SEARCH_BUILDING_BY_COORDINATES_URL = SEARCH_OBJECT_BY_COORDINATES.format(object_type=5)
-    SEARCH_BUILDING_BY_CADASTRAL_ID_URL = SEARCH_OBJECT_BY_CADASTRAL_ID.format(object_type=5)
-    SEARCH_PARCEL_BY_COORDINATES_URL = SEARCH_OBJECT_BY_COORDINATES.format(object_type=1)
-    SEARCH_PARCEL_BY_CADASTRAL_ID_URL = SEARCH_OBJECT_BY_CADASTRAL_ID.format(object_type=1)
-
-    def __init__(self, timeout=5, keep_alive=False):
+    SEARCH_BUILDING_BY_COORDINATES_URL = SEARCH_OBJECT_BY_COORDINATES.format(
+        object_type=BUILDING_OBJECT_TYPE)
+    SEARCH_BUILDING_BY_CADASTRAL_ID_URL = SEARCH_OBJECT_BY_CADASTRAL_ID.format(
+        object_type=BUILDING_OBJECT_TYPE)
+    SEARCH_PARCEL_BY_COORDINATES_URL = SEARCH_OBJECT_BY_COORDINATES.format(
+        object_type=PARCEL_OBJECT_TYPE)
+    SEARCH_PARCEL_BY_CADASTRAL_ID_URL = SEARCH_OBJECT_BY_CADASTRAL_ID.format(
+        object_type=PARCEL_OBJECT_TYPE)
+
+    # spatial_cache answers coordinate lookups with features fetched before,
+    # look at SpatialCache
+    def __init__(self, timeout=5, keep_alive=False, cache: BaseCache = None,
+                 spatial_cache: SpatialCache = None, max_workers=8, **http_client_kwargs):
         self._http_client = RosreestrHTTPClient(
             timeout=timeout,
             keep_alive=keep_alive,
-            default_headers={'User-Agent': UserAgent().random}
+            **http_client_kwargs
         )
-
-    def get_parcel_by_coordinates(self, *, lat, long, limit=11, tolerance=2) -> dict:
-        url = self.SEARCH_PARCEL_BY_COORDINATES_URL.format(
-            lat=lat, long=long, limit=limit, tolerance=tolerance)
-        return self._http_client.get(url).json()
-
-    def get_parcel_by_cadastral_id(self, cadastral_id, limit=11, tolerance=2) -> dict:
+        self.cache = cache
+        # threads of bulk lookups
+        self.max_workers = max_workers
+        self.spatial_cache = spatial_cache
+        self.single_flight = SingleFlight()
+
+    def close(self):
+        self._http_client.close()
+
+    # with model=True getters return lists of compact PkkParcel or PkkBuilding
+    # instead of response bodies
+    def get_parcel_by_coordinates(self, *, lat, long, limit=11, tolerance=2,
+                                  model=False) -> Union[dict, List[PkkParcel]]:
+        found, body = self._get_spatially_cached_features(
+            self.PARCEL_OBJECT_TYPE, endpoints.PKK_PARCEL_BY_COORDS, lat, long, limit,
+            tolerance)
+        if not found:
+            url = self.SEARCH_PARCEL_BY_COORDINATES_URL.format(
+                lat=lat, long=long, limit=limit, tolerance=tolerance)
+            body = self._get_features(url, self.PARCEL_OBJECT_TYPE)
+        return _get_features(body, PkkParcel, model)
+
+    def get_parcel_by_cadastral_id(self, cadastral_id, limit=11, tolerance=2,
+                                   model=False) -> Union[dict, List[PkkParcel]]:
         url = self.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
             cadastral_id=cadastral_id, limit=limit, tolerance=tolerance)
-        return self._http_client.get(url).json()
-
-    def get_building_by_cadastral_id(self, cadastral_id, limit=11, tolerance=2) -> dict:
+        body = self._get_cached_features(
+            endpoints.PKK_PARCEL_BY_CADASTRAL_ID,
+            _get_features_cache_key(cadastral_id, limit, tolerance), url,
+            self.PARCEL_OBJECT_TYPE)
+        return _get_features(body, PkkParcel, model)
+
+    def get_building_by_cadastral_id(self, cadastral_id, limit=11, tolerance=2,
+                                     model=False) -> Union[dict, List[PkkBuilding]]:
         url = self.SEARCH_BUILDING_BY_CADASTRAL_ID_URL.format(
             cadastral_id=cadastral_id, limit=limit, tolerance=tolerance)
-        return self._http_client.get(url).json()
+        body = self._get_cached_features(
+            endpoints.PKK_BUILDING_BY_CADASTRAL_ID,
+            _get_features_cache_key(cadastral_id, limit, tolerance), url,
+            self.BUILDING_OBJECT_TYPE)
+        return _get_features(body, PkkBuilding, model)
+
+    # conditional requests with validators of a previous response, caches are bypassed,
+    # the body is None when the feature is not modified or not found
+    def get_parcel_if_changed(self, cadastral_id, etag: str = None, last_modified: str = None,
+                              limit=11, tolerance=2) -> Tuple[requests.Response, Any]:
+        url = self.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
+            cadastral_id=cadastral_id, limit=limit, tolerance=tolerance)
+        return self._get_features_if_changed(url, etag, last_modified)
 
-    def get_building_by_coordinates(self, *, lat, long, limit=11, tolerance=2) -> dict:
-        url = self.SEARCH_BUILDING_BY_COORDINATES_URL.format(
-            lat=lat, long=long, limit=limit, tolerance=tolerance)
-        return self._http_client.get(url).json()
+    def get_building_if_changed(self, cadastral_id, etag: str = None, last_modified: str = None,
+                                limit=11, tolerance=2) -> Tuple[requests.Response, Any]:
+        url = self.SEARCH_BUILDING_BY_CADASTRAL_ID_URL.format(
+            cadastral_id=cadastral_id, limit=limit, tolerance=tolerance)
+        return self._get_features_if_changed(url, etag, last_modified)
+
+    def _get_features_if_changed(self, url: str, etag: str,
+                                 last_modified: str) -> Tuple[requests.Response, Any]:
+        response = self._http_client.get(
+            url, headers=_get_conditional_headers(etag, last_modified))
+        if response.status_code == 304:
+            return response, None
+        body = _get_json(response)
+        return response, None if _has_no_features(body) else body
+
+    def _get_cached_features(self, endpoint: str, cache_key: str, url: str,
+                             object_type: int) -> dict:
+        # requests of the same normalized cadastral id are coalesced even if urls differ
+        def fetch():
+            return self.single_flight.do(
+                (endpoint, cache_key), lambda: self._download_features(url, object_type))
+
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch(endpoint, cache_key, fetch, is_negative=_has_no_features)
+
+    def _get_features(self, url: str, object_type: int) -> dict:
+        return self.single_flight.do(url, lambda: self._download_features(url, object_type))
+
+    def _download_features(self, url: str, object_type: int) -> dict:
+        body = _get_json(self._http_client.get(url))
+        self._add_spatially_cached_features(object_type, body)
+        return body
+
+    def _get_spatially_cached_features(self, object_type: int, endpoint: str, lat, long,
+                                       limit, tolerance) -> Tuple[bool, dict]:
+        if self.spatial_cache is None:
+            return False, None
+        features = self.spatial_cache.get(
+            object_type, lat, long, endpoint=endpoint, tolerance=tolerance)
+        if features is None:
+            return False, None
+        # only features are known for a cached answer
+        return True, {'features': features[:int(limit)]}
+
+    def _add_spatially_cached_features(self, object_type: int, body: dict):
+        if self.spatial_cache is not None and isinstance(body, dict):
+            self.spatial_cache.add(object_type, body.get('features') or [])
+
+    def get_building_by_coordinates(self, *, lat, long, limit=11, tolerance=2,
+                                    model=False) -> Union[dict, List[PkkBuilding]]:
+        found, body = self._get_spatially_cached_features(
+            self.BUILDING_OBJECT_TYPE, endpoints.PKK_BUILDING_BY_COORDS, lat, long, limit,
+            tolerance)
+        if not found:
+            url = self.SEARCH_BUILDING_BY_COORDINATES_URL.format(
+                lat=lat, long=long, limit=limit, tolerance=tolerance)
+            body = self._get_features(url, self.BUILDING_OBJECT_TYPE)
+        return _get_features(body, PkkBuilding, model)
+
+    # Bulk lookups yield (index, rounded (lat, long), result) for every input point as soon
+    # as the result is ready. Points equal after rounding to precision digits are requested
+    # once with the rounded coordinates and share the result, it must not be modified.
+    # result is an exception instance if the lookup failed, kwargs are passed to the getter.
+    def get_parcels_by_coordinates(self, points: Iterable[Tuple[float, float]],
+                                   precision: int = 5, max_workers: int = None,
+                                   **kwargs) -> Iterator[Tuple[int, Tuple[float, float], Any]]:
+        return self._get_many_by_coordinates(
+            self.get_parcel_by_coordinates, points, precision, max_workers, kwargs)
+
+    def get_buildings_by_coordinates(self, points: Iterable[Tuple[float, float]],
+                                     precision: int = 5, max_workers: int = None,
+                                     **kwargs) -> Iterator[Tuple[int, Tuple[float, float], Any]]:
+        return self._get_many_by_coordinates(
+            self.get_building_by_coordinates, points, precision, max_workers, kwargs)
+
+    def _get_many_by_coordinates(self, get_features, points, precision, max_workers, kwargs):
+        rows_by_point = group_points(points, precision)
+        results = map_concurrently(
+            lambda point: get_features(lat=point[0], long=point[1], **kwargs), rows_by_point,
+            max_workers=max_workers or self.max_workers, ordered=False)
+        for point, result in results:
+            for index in rows_by_point[point]:
+                yield index, point, result
+
+
+def _get_address_rows(addresses: Iterable[Union[AddressWrapper, dict]]) -> list:
+    # [(index, address, AddressWrapper or the validation error)]
+    rows = []
+    for index, address in enumerate(addresses):
+        try:
+            address_wrapper = (
+                address if isinstance(address, AddressWrapper) else AddressWrapper(**address))
+        except (TypeError, ValueError) as e:
+            address_wrapper = e
+        rows.append((index, address, address_wrapper))
+    return rows
+
+
+def _get_json(response: requests.Response) -> Any:
+    # error bodies are html pages, so the status is checked before parsing
+    if response.status_code >= 400:
+        response.raise_for_status()
+    return response.json()
+
+
+def _get_conditional_headers(etag: str = None, last_modified: str = None) -> dict:
+    # 304 is returned if the server gave these validators and the resource is not changed
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def _get_region_key(address_wrapper: AddressWrapper) -> tuple:
+    # names are normalized like in the names index, so `Москва` and `москва ` are one region
+    return (str(address_wrapper.macro_region_id).strip(),
+            normalize_region_name(address_wrapper.macro_region_name),
+            str(address_wrapper.region_id).strip(),
+            normalize_region_name(address_wrapper.region_name))
+
+
+def _iter_distinct_regions(rows: list) -> Iterator[Tuple[tuple, AddressWrapper]]:
+    region_keys = set()
+    for _, _, address_wrapper in rows:
+        if isinstance(address_wrapper, AddressWrapper):
+            region_key = _get_region_key(address_wrapper)
+            if region_key not in region_keys:
+                region_keys.add(region_key)
+                yield region_key, address_wrapper
+
+
+def _get_features_cache_key(cadastral_id, limit, tolerance) -> str:
+    # malformed cadastral ids raise InvalidCadastralNumber before a request is sent
+    return f'{CadastralNumber(cadastral_id)}:{limit}:{tolerance}'
+
+
+def _get_features(body: dict, model_cls: Type[PkkFeature], model: bool):
+    return get_pkk_features(body, model_cls) if model else body
+
+
+def _has_no_features(body: dict) -> bool:
+    return isinstance(body, dict) and not body.get('features')
+
+
+def _normalize_object_id(obj_id: Union[str, CadastralNumber],
+                         interned: Dict[str, CadastralNumber] = None) -> str:
+    # cadastral numbers are validated and normalized,
+    # fir object ids like 177_385900460001 are only stripped
+    if isinstance(obj_id, CadastralNumber) or ':' in obj_id:
+        return CadastralNumber.parse(obj_id, interned)
+    return _strip_cadastral_id(obj_id)
+
+
+def _normalize_object_ids(obj_ids: Iterable[str]) -> Iterator[str]:
+    interned = {}
+    for obj_id in obj_ids:
+        try:
+            yield _normalize_object_id(obj_id, interned)
+        except InvalidCadastralNumber:
+            # get_object raises the error again, so it becomes the result of the id
+            yield obj_id
 
 
 def _strip_cadastral_id(cadastral_id):
@@ -0,0 +1,77 @@
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one call of the function: the first caller
+    # runs it, the others wait and get the same result or exception. Results are not kept
+    # after the call, that is what caches are for. Callers share the result object,
+    # so it must not be modified.
+
+    def __init__(self):
+        # number of calls which got the result of another call
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    # SingleFlight for coroutines of one event loop. The function runs in its own task
+    # which every caller awaits through asyncio.shield, so a cancelled caller, the first
+    # one included, doesn't cancel the call for the others.
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        import asyncio
+
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._tasks[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._finish(key, task))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task):
+        del self._tasks[key]
+        # the exception is retrieved, because all callers may have been cancelled
+        if not task.cancelled():
+            task.exception()
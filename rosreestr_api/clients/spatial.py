@@ -0,0 +1,179 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rosreestr_api.clients.cache import CacheStats
+from rosreestr_api.clients.metrics import Metrics
+
+
+# the radius of EPSG:3857, PKK returns centers and extents in it
+EARTH_RADIUS = 6378137.0
+
+
+def to_web_mercator(lat: float, long: float) -> Tuple[float, float]:
+    x = math.radians(long) * EARTH_RADIUS
+    y = math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * EARTH_RADIUS
+    return x, y
+
+
+def group_points(points: Iterable[Tuple[float, float]],
+                 precision: int = 5) -> Dict[Tuple[float, float], List[int]]:
+    # (lat, long) rounded to precision digits -> indexes of the points, 5 digits are about 1m.
+    # Points can be an iterable of pairs or a numpy array of shape (n, 2).
+    rows_by_point = {}
+    for index, (lat, long) in enumerate(points):
+        point = (round(float(lat), precision), round(float(long), precision))
+        rows_by_point.setdefault(point, []).append(index)
+    return rows_by_point
+
+
+class _Entry:
+    __slots__ = ('feature', 'extent', 'area', 'center', 'cells', 'expires_at')
+
+    def __init__(self, feature: dict, extent: Tuple[float, float, float, float],
+                 center: Optional[Tuple[float, float]], cells: List[Tuple[int, int]],
+                 expires_at: float):
+        self.feature = feature
+        self.extent = extent
+        self.area = (extent[2] - extent[0]) * (extent[3] - extent[1])
+        self.center = center
+        self.cells = cells
+        self.expires_at = expires_at
+
+    def contains(self, x: float, y: float, tolerance: float = 0) -> bool:
+        xmin, ymin, xmax, ymax = self.extent
+        return (xmin - tolerance <= x <= xmax + tolerance and
+                ymin - tolerance <= y <= ymax + tolerance)
+
+    def get_distance(self, x: float, y: float) -> float:
+        if self.center is None:
+            return 0
+        return math.hypot(self.center[0] - x, self.center[1] - y)
+
+
+class SpatialCache:
+    # A grid index of PKK features already fetched by any lookup. Points inside the extent
+    # of a cached feature of the same type are answered without a request. Extents are
+    # bounding boxes, so a feature can be returned for a point near its border and other
+    # features at the point may be missing, use it when that precision is enough.
+    # A tolerance widens extents by that many meters of EPSG:3857, the units of PKK
+    # extents, like the tolerance of PKK searches by coordinates.
+    # Features are kept for ttl seconds, the oldest ones are evicted after max_size.
+    DEFAULT_TTL = 60 * 60
+    # meters of EPSG:3857
+    DEFAULT_CELL_SIZE = 250
+    # bigger features are checked for every point instead of being put in the grid
+    MAX_CELLS_PER_FEATURE = 256
+
+    def __init__(self, ttl: float = DEFAULT_TTL, cell_size: float = DEFAULT_CELL_SIZE,
+                 max_size: int = 100000, metrics: Metrics = None):
+        self.ttl = ttl
+        self.cell_size = cell_size
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self.metrics = metrics
+        self._entries = OrderedDict()
+        # (object type, cell x, cell y) -> keys of entries
+        self._grid = {}
+        # object type -> keys of entries which are too big for the grid
+        self._large = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, object_type: int, features: Iterable[dict]):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for feature in features:
+                extent = _get_extent(feature)
+                feature_id = (feature.get('attrs') or {}).get('id')
+                if extent is None or feature_id is None:
+                    continue
+                key = (object_type, feature_id)
+                if key in self._entries:
+                    self._remove(key)
+                cells = self._get_cells(extent)
+                self._entries[key] = _Entry(
+                    feature, extent, _get_center(feature), cells or [], expires_at)
+                if cells is None:
+                    self._large.setdefault(object_type, set()).add(key)
+                    continue
+                for cell_x, cell_y in cells:
+                    self._grid.setdefault((object_type, cell_x, cell_y), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def get(self, object_type: int, lat: float, long: float, endpoint: str = None,
+            tolerance: float = 0) -> Optional[List[dict]]:
+        # features covering the point within tolerance, the smallest ones first, or None
+        x, y = to_web_mercator(float(lat), float(long))
+        tolerance = float(tolerance)
+        now = time.time()
+        # cells of features which can be within tolerance of the point
+        cells = self._get_cells((x - tolerance, y - tolerance, x + tolerance, y + tolerance))
+        with self._lock:
+            # a tolerance too wide for the grid is a miss
+            keys = set(self._large.get(object_type, ())) if cells is not None else set()
+            for cell_x, cell_y in cells or []:
+                keys.update(self._grid.get((object_type, cell_x, cell_y), ()))
+            entries = []
+            for key in keys:
+                entry = self._entries[key]
+                if entry.expires_at <= now:
+                    self._remove(key)
+                elif entry.contains(x, y, tolerance):
+                    entries.append(entry)
+            if entries:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        if self.metrics is not None and endpoint is not None:
+            self.metrics.increment('cache_hits' if entries else 'cache_misses', endpoint)
+        if not entries:
+            return None
+        entries.sort(key=lambda entry: (entry.area, entry.get_distance(x, y)))
+        return [entry.feature for entry in entries]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._grid.clear()
+            self._large.clear()
+
+    def _get_cells(self, extent: Tuple[float, float, float, float]
+                   ) -> Optional[List[Tuple[int, int]]]:
+        xmin, ymin, xmax, ymax = (int(value // self.cell_size) for value in extent)
+        if (xmax - xmin + 1) * (ymax - ymin + 1) > self.MAX_CELLS_PER_FEATURE:
+            return None
+        return [(x, y) for x in range(xmin, xmax + 1) for y in range(ymin, ymax + 1)]
+
+    def _remove(self, key: Tuple[int, str]):
+        entry = self._entries.pop(key)
+        object_type = key[0]
+        for cell_x, cell_y in entry.cells:
+            cell = self._grid[(object_type, cell_x, cell_y)]
+            cell.discard(key)
+            if not cell:
+                del self._grid[(object_type, cell_x, cell_y)]
+        if not entry.cells:
+            self._large.get(object_type, set()).discard(key)
+
+
+def _get_extent(feature: dict) -> Optional[Tuple[float, float, float, float]]:
+    extent = feature.get('extent')
+    try:
+        return extent['xmin'], extent['ymin'], extent['xmax'], extent['ymax']
+    except (KeyError, TypeError):
+        return None
+
+
+def _get_center(feature: dict) -> Optional[Tuple[float, float]]:
+    center = feature.get('center')
+    try:
+        return center['x'], center['y']
+    except (KeyError, TypeError):
+        return None
@@ -0,0 +1,90 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator, List
+
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+_decoder = json.JSONDecoder()
+
+
+class JSONArrayParser:
+    # Incremental parser of a JSON array: chunks of the body are fed as they are
+    # downloaded and items are returned as soon as they are complete, so only the item
+    # being parsed and one chunk are kept in memory. A body which is not an array is
+    # returned by close() as a single item unless it is empty, like `null` or `{}`.
+    _START = 'start'
+    _ITEM_OR_END = 'item_or_end'
+    _ITEM = 'item'
+    _COMMA_OR_END = 'comma_or_end'
+    _END = 'end'
+    _NOT_ARRAY = 'not_array'
+
+    def __init__(self, encoding: str = 'utf-8'):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._buffer = ''
+        self._position = 0
+        self._state = self._START
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        # parsed characters are dropped, so the buffer doesn't grow with the body
+        self._buffer = self._buffer[self._position:] + self._decoder.decode(chunk)
+        self._position = 0
+        return self._parse(is_final=False)
+
+    def close(self) -> List[Any]:
+        self._buffer += self._decoder.decode(b'', final=True)
+        items = self._parse(is_final=True)
+        if self._state == self._NOT_ARRAY:
+            value = json.loads(self._buffer[self._position:])
+            return [value] if value else []
+        if self._state not in (self._START, self._END):
+            raise ValueError('Unexpected end of JSON array')
+        return items
+
+    def _parse(self, is_final: bool) -> List[Any]:
+        items = []
+        while self._state not in (self._END, self._NOT_ARRAY) and self._skip_whitespace():
+            char = self._buffer[self._position]
+            if self._state == self._START:
+                if char != '[':
+                    self._state = self._NOT_ARRAY
+                    break
+                self._position += 1
+                self._state = self._ITEM_OR_END
+            elif char == ']' and self._state != self._ITEM:
+                self._position += 1
+                self._state = self._END
+            elif self._state == self._COMMA_OR_END:
+                if char != ',':
+                    raise ValueError(f'Expected `,` instead of `{char}` in JSON array')
+                self._position += 1
+                self._state = self._ITEM
+            else:
+                try:
+                    item, end = _decoder.raw_decode(self._buffer, self._position)
+                except json.JSONDecodeError:
+                    if is_final:
+                        raise
+                    break
+                # a number like `1.` or `1e` can continue in the next chunk,
+                # so an item is complete only when it is followed by a delimiter
+                is_delimited = end < len(self._buffer) and self._buffer[end] in _DELIMITERS
+                if not is_final and not is_delimited:
+                    break
+                items.append(item)
+                self._position = end
+                self._state = self._COMMA_OR_END
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+            self._position += 1
+        return self._position < len(self._buffer)
+
+
+def iter_json_array(chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator[Any]:
+    parser = JSONArrayParser(encoding)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
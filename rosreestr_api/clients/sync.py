@@ -0,0 +1,193 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+import requests
+
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.cadastral import CadastralNumber, InvalidCadastralNumber
+from rosreestr_api.clients.concurrency import map_concurrently, unique
+from rosreestr_api.clients.rosreestr import (
+    PKKRosreestrAPIClient,
+    RosreestrAPIClient,
+    _normalize_object_id,
+)
+
+
+NEW = 'new'
+CHANGED = 'changed'
+DELETED = 'deleted'
+ERROR = 'error'
+
+
+@dataclass
+class SyncChange:
+
+    kind: str
+    id: str
+    status: str
+    # the new body for new and changed objects
+    body: Any = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class _Fingerprint:
+
+    fingerprint: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class FingerprintStore:
+    # Fingerprints of object bodies from the last sync and validators for conditional
+    # requests, per kind and normalized id, in a SQLite file
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS fingerprints ('
+                'kind TEXT NOT NULL, id TEXT NOT NULL, fingerprint TEXT NOT NULL, '
+                'etag TEXT, last_modified TEXT, synced_at REAL NOT NULL, '
+                'PRIMARY KEY (kind, id))')
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+
+    def get(self, kind: str, obj_id: str) -> Optional[_Fingerprint]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT fingerprint, etag, last_modified FROM fingerprints '
+                'WHERE kind = ? AND id = ?', (kind, obj_id)).fetchone()
+        return _Fingerprint(*row) if row is not None else None
+
+    def set(self, kind: str, obj_id: str, fingerprint: _Fingerprint):
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO fingerprints '
+                '(kind, id, fingerprint, etag, last_modified, synced_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, obj_id, fingerprint.fingerprint, fingerprint.etag,
+                 fingerprint.last_modified, time.time()))
+
+    def delete(self, kind: str, obj_id: str):
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM fingerprints WHERE kind = ? AND id = ?', (kind, obj_id))
+
+    def commit(self):
+        with self._lock:
+            self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+
+def get_fingerprint(body: Any) -> str:
+    # the same json in any key order has the same fingerprint
+    data = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def sync_objects(api_client: RosreestrAPIClient, obj_ids: Iterable[str], store: FingerprintStore,
+                 max_workers: int = None) -> Iterator[SyncChange]:
+    # Yields changes of fir objects since the last sync with the store, unchanged objects are
+    # skipped. An object is deleted when rosreestr responds 404 or 204 for it.
+    return _sync(
+        endpoints.FIR_OBJECT, obj_ids, _normalize_object_id, store,
+        api_client.get_object_if_changed, max_workers or api_client.max_workers)
+
+
+def sync_parcels(pkk_client: PKKRosreestrAPIClient, cadastral_ids: Iterable[str],
+                 store: FingerprintStore, max_workers: int = None) -> Iterator[SyncChange]:
+    # A parcel is deleted when PKK finds no features for it
+    return _sync(
+        endpoints.PKK_PARCEL_BY_CADASTRAL_ID, cadastral_ids, CadastralNumber, store,
+        pkk_client.get_parcel_if_changed, max_workers or pkk_client.max_workers)
+
+
+def sync_buildings(pkk_client: PKKRosreestrAPIClient, cadastral_ids: Iterable[str],
+                   store: FingerprintStore, max_workers: int = None) -> Iterator[SyncChange]:
+    return _sync(
+        endpoints.PKK_BUILDING_BY_CADASTRAL_ID, cadastral_ids, CadastralNumber, store,
+        pkk_client.get_building_if_changed, max_workers or pkk_client.max_workers)
+
+
+def _sync(kind: str, obj_ids: Iterable[str], normalize: Callable[[str], str],
+          store: FingerprintStore,
+          fetch: Callable[..., Tuple[requests.Response, Any]],
+          max_workers: int, commit_every: int = 1000) -> Iterator[SyncChange]:
+    # Ids are normalized, so the store has one entry per object. A malformed id is passed
+    # as is and its InvalidCadastralNumber is yielded as an error change.
+    def normalize_all():
+        for obj_id in obj_ids:
+            try:
+                yield normalize(obj_id)
+            except InvalidCadastralNumber:
+                yield obj_id
+
+    def sync_one(obj_id: str):
+        obj_id = normalize(obj_id)
+        fingerprint = store.get(kind, obj_id)
+        if fingerprint is None:
+            response, body = fetch(obj_id)
+        else:
+            response, body = fetch(
+                obj_id, etag=fingerprint.etag, last_modified=fingerprint.last_modified)
+        return fingerprint, response, body
+
+    results = map_concurrently(
+        sync_one, unique(normalize_all()), max_workers=max_workers, ordered=False)
+    updates_number = 0
+    try:
+        for obj_id, result in results:
+            if isinstance(result, Exception):
+                yield SyncChange(kind, obj_id, ERROR, error=result)
+                continue
+            change, update = _apply(kind, obj_id, store, *result)
+            if change is not None:
+                # The store is updated when the consumer asks for the next change. If it
+                # raises or stops while handling this one, the next sync reports it again.
+                yield change
+            if update is not None:
+                update()
+                updates_number += 1
+                if updates_number % commit_every == 0:
+                    store.commit()
+    finally:
+        # only updates of handled changes were made
+        store.commit()
+
+
+def _apply(kind: str, obj_id: str, store: FingerprintStore, fingerprint: Optional[_Fingerprint],
+           response: requests.Response,
+           body: Any) -> Tuple[Optional[SyncChange], Optional[Callable[[], None]]]:
+    # the change to yield and the update of the store to make after it is handled
+    if response.status_code == 304:
+        return None, None
+    if body is None:
+        if fingerprint is None:
+            return None, None
+        return SyncChange(kind, obj_id, DELETED), lambda: store.delete(kind, obj_id)
+
+    new_fingerprint = _Fingerprint(
+        get_fingerprint(body), etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'))
+    def update():
+        store.set(kind, obj_id, new_fingerprint)
+
+    if fingerprint is not None and fingerprint.fingerprint == new_fingerprint.fingerprint:
+        if (fingerprint.etag, fingerprint.last_modified) != (
+                new_fingerprint.etag, new_fingerprint.last_modified):
+            return None, update
+        return None, None
+    return SyncChange(kind, obj_id, NEW if fingerprint is None else CHANGED, body=body), update
+
@@ -0,0 +1,282 @@
+import contextlib
+import json
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+from rosreestr_api.clients.transport import get_pool_managers
+
+
+# Phases of a request, timestamps are seconds since the epoch.
+# dns, connect and tls are absent when a kept alive connection is reused,
+# the async client can't tell tls from connect, so its connect includes tls.
+DNS = 'dns'
+CONNECT = 'connect'
+TLS = 'tls'
+TTFB = 'ttfb'  # from the request is sent to the response headers are received
+DOWNLOAD = 'download'
+PHASES = (DNS, CONNECT, TLS, TTFB, DOWNLOAD)
+
+
+class Span:
+    __slots__ = ('name', 'start_time', 'end_time', 'attributes', 'phases')
+
+    def __init__(self, name: str, start_time: float, attributes: dict = None):
+        self.name = name
+        self.start_time = start_time
+        self.end_time = None
+        self.attributes = attributes or {}
+        # phase -> (start time, end time)
+        self.phases = {}
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.end_time - self.start_time if self.end_time is not None else None
+
+    def add_phase(self, name: str, start_time: float, end_time: float):
+        self.phases[name] = (start_time, end_time)
+
+    def get_durations(self) -> Dict[str, float]:
+        return {
+            phase: self.phases[phase][1] - self.phases[phase][0]
+            for phase in PHASES if phase in self.phases}
+
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name, 'start_time': self.start_time, 'end_time': self.end_time,
+            'duration': self.duration, 'attributes': self.attributes,
+            'phases': self.get_durations()}
+
+
+class JSONLinesExporter:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.as_dict(), ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetryExporter:
+    # Every phase is exported as a child span of the request span
+    ATTRIBUTES_PREFIX = 'rosreestr.'
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer('rosreestr_api')
+
+    def export(self, span: Span):
+        attributes = {
+            self.ATTRIBUTES_PREFIX + name: value
+            for name, value in span.attributes.items() if value is not None}
+        otel_span = self._tracer.start_span(
+            span.name, start_time=_to_ns(span.start_time), attributes=attributes)
+        context = self._trace.set_span_in_context(otel_span)
+        for phase in PHASES:
+            if phase in span.phases:
+                start_time, end_time = span.phases[phase]
+                self._tracer.start_span(
+                    phase, context=context, start_time=_to_ns(start_time)
+                ).end(end_time=_to_ns(end_time))
+        otel_span.end(end_time=_to_ns(span.end_time))
+
+    def close(self):
+        pass
+
+
+class Tracer:
+    # One instance can be shared by threads and clients.
+    # Without an exporter spans go to the `path` JSON lines file when it is given
+    # and to OpenTelemetry otherwise.
+
+    def __init__(self, exporter=None, path: str = None):
+        self.exporter = exporter if exporter is not None else create_exporter(path)
+
+    def start_span(self, method: str, url: str, endpoint: str, attempt: int = 1) -> Span:
+        attributes = {
+            'method': method, 'url': url, 'endpoint': endpoint,
+            'host': urlsplit(url).hostname, 'attempt': attempt}
+        return Span(f'HTTP {method}', time.time(), attributes)
+
+    def finish_span(self, span: Span, status_code: int = None, error: Exception = None):
+        span.end_time = time.time()
+        if TTFB in span.phases:
+            span.add_phase(DOWNLOAD, span.phases[TTFB][1], span.end_time)
+        span.attributes['status_code'] = status_code
+        span.attributes['connection_reused'] = CONNECT not in span.phases
+        if error is not None:
+            span.attributes['error'] = type(error).__name__
+        self.exporter.export(span)
+
+    def close(self):
+        self.exporter.close()
+
+
+def create_exporter(path: str = None):
+    if path is not None:
+        return JSONLinesExporter(path)
+    if not _is_opentelemetry_installed():
+        raise ValueError('path is required to export spans without opentelemetry')
+    return OpenTelemetryExporter()
+
+
+def _is_opentelemetry_installed() -> bool:
+    # opentelemetry is a namespace package, other distributions can install it without
+    # the API, so the trace module is imported instead of looking the package up
+    try:
+        from opentelemetry import trace  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_local = threading.local()
+
+
+def get_current_span() -> Optional[Span]:
+    return getattr(_local, 'span', None)
+
+
+@contextlib.contextmanager
+def use_span(span: Optional[Span]):
+    # connections of the thread add phases to the span
+    previous_span = get_current_span()
+    _local.span = span
+    try:
+        yield span
+    finally:
+        _local.span = previous_span
+
+
+class _TracedConnectionMixin:
+
+    def _new_conn(self):
+        span = get_current_span()
+        if span is None:
+            return super()._new_conn()
+        # the host is resolved here, so DNS and TCP connect are timed separately
+        dns_host = self._dns_host
+        start_time = time.time()
+        try:
+            addresses = socket.getaddrinfo(
+                dns_host.strip('[]'), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            # urllib3 resolves the host again and raises its own error
+            return super()._new_conn()
+        connect_start_time = time.time()
+        span.add_phase(DNS, start_time, connect_start_time)
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = address[4][0]
+                try:
+                    sock = super()._new_conn()
+                    break
+                except ConnectTimeoutError:
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+        span.add_phase(CONNECT, connect_start_time, time.time())
+        return sock
+
+    def getresponse(self, *args, **kwargs):
+        span = get_current_span()
+        if span is None:
+            return super().getresponse(*args, **kwargs)
+        start_time = time.time()
+        response = super().getresponse(*args, **kwargs)
+        span.add_phase(TTFB, start_time, time.time())
+        return response
+
+
+class _TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        span = get_current_span()
+        if span is None:
+            return super().connect()
+        start_time = time.time()
+        super().connect()
+        # everything after the TCP connect is the TLS handshake
+        connect_end_time = span.phases[CONNECT][1] if CONNECT in span.phases else start_time
+        span.add_phase(TLS, connect_end_time, time.time())
+
+
+class _TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+_TRACED_POOL_CLASSES_BY_SCHEME = {
+    'http': _TracedHTTPConnectionPool, 'https': _TracedHTTPSConnectionPool}
+
+
+def instrument_session(session):
+    # requests sessions and urllib3 transports open connections with the traced classes
+    # after this call
+    for pool_manager in get_pool_managers(session):
+        pool_manager.pool_classes_by_scheme = _TRACED_POOL_CLASSES_BY_SCHEME
+
+
+def create_aiohttp_trace_config():
+    # spans are passed to aiohttp as trace_request_ctx
+    import aiohttp
+
+    async def on_dns_resolvehost_start(session, context, params):
+        context.dns_start_time = time.time()
+
+    async def on_dns_resolvehost_end(session, context, params):
+        context.trace_request_ctx.add_phase(DNS, context.dns_start_time, time.time())
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_start_time = time.time()
+
+    async def on_connection_create_end(session, context, params):
+        span = context.trace_request_ctx
+        start_time = span.phases[DNS][1] if DNS in span.phases else context.connect_start_time
+        span.add_phase(CONNECT, start_time, time.time())
+
+    async def on_request_headers_sent(session, context, params):
+        context.request_sent_time = time.time()
+
+    async def on_request_end(session, context, params):
+        start_time = getattr(context, 'request_sent_time', None)
+        if start_time is not None:
+            context.trace_request_ctx.add_phase(TTFB, start_time, time.time())
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_headers_sent.append(on_request_headers_sent)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def _to_ns(timestamp: float) -> int:
+    return int(timestamp * 1e9)
@@ -0,0 +1,210 @@
+import ssl
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE
+from requests.models import DEFAULT_REDIRECT_LIMIT
+from requests.structures import CaseInsensitiveDict
+from requests.utils import default_headers, get_encoding_from_headers, requote_uri
+from urllib3 import PoolManager
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import (
+    ClosedPoolError, ConnectTimeoutError, HTTPError, MaxRetryError, NewConnectionError,
+    ProtocolError, ReadTimeoutError, SSLError)
+from urllib3.util import Retry, Timeout, parse_url
+
+
+class BaseTransport:
+    # What BaseHTTPClient sends requests with. prepare is called once per request,
+    # send once per attempt. PooledSession is the requests implementation.
+
+    def prepare(self, method: str, url: str, default_headers: Dict[str, str],
+                headers: Dict[str, str] = None, **kwargs) -> requests.PreparedRequest:
+        raise NotImplementedError
+
+    def send(self, request: requests.PreparedRequest, timeout=None,
+             stream: bool = False) -> requests.Response:
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class Urllib3Transport(BaseTransport):
+    # Sends requests with a urllib3 PoolManager directly. Requests without a body skip
+    # requests.Request.prepare: headers are merged once per set of default headers,
+    # connection pools are looked up once per origin of the url constants, and
+    # the adapter stack and cookie handling of requests are not used.
+    # Responses are requests.Response as with the requests transport.
+    REDIRECT_STATUS_CODES = frozenset((301, 302, 303, 307, 308))
+    # don't retry in urllib3, RetryPolicy of the client does it
+    RETRIES = Retry(0, read=False, redirect=False)
+
+    def __init__(self, pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE,
+                 pool_block=DEFAULT_POOLBLOCK, ssl_context: ssl.SSLContext = None,
+                 ca_certs: str = None):
+        pool_kwargs = {}
+        if ssl_context is not None:
+            pool_kwargs['ssl_context'] = ssl_context
+        else:
+            pool_kwargs.update(
+                cert_reqs='CERT_REQUIRED', ca_certs=ca_certs or requests.certs.where())
+        # the same attribute as HTTPAdapter has, tracing swaps its pool classes
+        self.poolmanager = PoolManager(
+            num_pools=pool_connections, maxsize=pool_maxsize, block=pool_block, **pool_kwargs)
+        self._base_headers = default_headers()
+        self._headers_cache = {}
+        self._pools = {}
+
+    def prepare(self, method, url, default_headers, headers=None,
+                **kwargs) -> requests.PreparedRequest:
+        if kwargs:
+            # bodies, params, auth and so on are prepared by requests
+            request_headers = self._get_headers(default_headers).copy()
+            request_headers.update(headers or {})
+            return requests.Request(method, url, headers=request_headers, **kwargs).prepare()
+
+        request = requests.PreparedRequest()
+        request.method = method
+        request.url = requote_uri(url) if not _is_quoted(url) else url
+        # the cached dict is shared by requests without extra headers and must not be modified
+        request.headers = self._get_headers(default_headers)
+        if headers:
+            request.headers = request.headers.copy()
+            request.headers.update(headers)
+        return request
+
+    def send(self, request, timeout=None, stream=False) -> requests.Response:
+        start_time = time.perf_counter()
+        history = []
+        while True:
+            response = self._send(request, timeout)
+            location = response.headers.get('Location')
+            if response.status_code not in self.REDIRECT_STATUS_CODES or not location:
+                break
+            if len(history) >= DEFAULT_REDIRECT_LIMIT:
+                response.close()
+                raise requests.exceptions.TooManyRedirects(
+                    f'Exceeded {DEFAULT_REDIRECT_LIMIT} redirects.', response=response)
+            response.content
+            history.append(response)
+            request = _get_redirect_request(request, response, location)
+
+        response.history = history
+        response.elapsed = timedelta(seconds=time.perf_counter() - start_time)
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        self.poolmanager.clear()
+        self._pools.clear()
+
+    def _send(self, request, timeout) -> requests.Response:
+        pool, path = self._get_pool(request.url)
+        try:
+            raw_response = pool.urlopen(
+                method=request.method, url=path, body=request.body, headers=request.headers,
+                redirect=False, assert_same_host=False, preload_content=False,
+                decode_content=False, retries=self.RETRIES, timeout=_get_timeout(timeout))
+        except Exception as e:
+            error = _convert_error(e, request)
+            if error is None:
+                raise
+            raise error from e
+
+        response = requests.Response()
+        response.status_code = raw_response.status
+        response.reason = raw_response.reason
+        response.headers = CaseInsensitiveDict(raw_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = raw_response
+        response.url = request.url
+        response.request = request
+        return response
+
+    def _get_headers(self, headers: Dict[str, str]) -> Dict[str, str]:
+        key = tuple(headers.items())
+        merged_headers = self._headers_cache.get(key)
+        if merged_headers is None:
+            merged_headers = CaseInsensitiveDict(self._base_headers)
+            merged_headers.update(headers)
+            merged_headers = self._headers_cache[key] = dict(merged_headers.items())
+        return merged_headers
+
+    def _get_pool(self, url: str) -> Tuple[HTTPConnectionPool, str]:
+        # https://host:port/path?query -> (the pool of https://host:port, /path?query)
+        path_index = url.find('/', url.find('://') + 3)
+        origin, path = (url, '/') if path_index == -1 else (url[:path_index], url[path_index:])
+        path = path.split('#', 1)[0]
+        pool = self._pools.get(origin)
+        # pools evicted by the PoolManager are closed
+        if pool is None or pool.pool is None:
+            parsed_url = parse_url(url)
+            if '?' in origin or '#' in origin or parsed_url.auth:
+                # rare urls like http://host?query, their pools are not cached
+                return self.poolmanager.connection_from_url(url), parsed_url.request_uri
+            pool = self._pools[origin] = self.poolmanager.connection_from_host(
+                parsed_url.host, port=parsed_url.port, scheme=parsed_url.scheme)
+        return pool, path
+
+
+def get_pool_managers(session) -> list:
+    # pool managers of a requests session or of a transport
+    if hasattr(session, 'adapters'):
+        return [adapter.poolmanager for adapter in session.adapters.values()]
+    return [session.poolmanager]
+
+
+def _is_quoted(url: str) -> bool:
+    # urls built from the url constants are usually quoted already
+    return url.isascii() and ' ' not in url
+
+
+def _get_timeout(timeout: Union[float, Tuple[float, float], None]) -> Timeout:
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return Timeout(connect=connect, read=read)
+    return Timeout(connect=timeout, read=timeout)
+
+
+def _get_redirect_request(request: requests.PreparedRequest, response: requests.Response,
+                          location: str) -> requests.PreparedRequest:
+    # the same method changes as requests.Session.rebuild_method does
+    method = request.method
+    if response.status_code == 303 and method != 'HEAD' or (
+            response.status_code in (301, 302) and method == 'POST'):
+        method = 'GET'
+    redirect_request = request.copy()
+    redirect_request.method = method
+    redirect_request.url = requote_uri(urljoin(request.url, location))
+    if method == 'GET' and request.method != 'GET':
+        redirect_request.body = None
+        redirect_request.headers = {
+            name: value for name, value in request.headers.items()
+            if name.lower() not in ('content-length', 'content-type', 'transfer-encoding')}
+    return redirect_request
+
+
+def _convert_error(error: Exception,
+                   request: requests.PreparedRequest) -> Optional[requests.RequestException]:
+    # the same exceptions as requests.adapters.HTTPAdapter.send raises
+    if isinstance(error, MaxRetryError):
+        reason = error.reason
+        if isinstance(reason, ConnectTimeoutError) and not isinstance(reason, NewConnectionError):
+            return requests.exceptions.ConnectTimeout(error, request=request)
+        if isinstance(reason, SSLError):
+            return requests.exceptions.SSLError(error, request=request)
+        return requests.exceptions.ConnectionError(error, request=request)
+    if isinstance(error, (ProtocolError, OSError, ClosedPoolError)):
+        return requests.exceptions.ConnectionError(error, request=request)
+    if isinstance(error, SSLError):
+        return requests.exceptions.SSLError(error, request=request)
+    if isinstance(error, ReadTimeoutError):
+        return requests.exceptions.ReadTimeout(error, request=request)
+    if isinstance(error, HTTPError):
+        return requests.exceptions.ConnectionError(error, request=request)
+    return None
@@ -0,0 +1,37 @@
+import random
+import threading
+from typing import Iterable, List
+
+
+class UserAgentPool:
+    # User-Agents of real browsers. fake_useragent is imported and its data is loaded
+    # on the first use, so clients are created without touching it and a pinned
+    # User-Agent doesn't need it at all. One pool can be shared by threads and clients.
+    DEFAULT_SIZE = 100
+
+    def __init__(self, user_agents: Iterable[str] = None, size: int = DEFAULT_SIZE):
+        self.size = size
+        self._user_agents = list(user_agents) if user_agents is not None else None
+        self._lock = threading.Lock()
+
+    @property
+    def user_agents(self) -> List[str]:
+        if self._user_agents is None:
+            with self._lock:
+                if self._user_agents is None:
+                    self._user_agents = _load_user_agents(self.size)
+        return self._user_agents
+
+    def get_random(self) -> str:
+        return random.choice(self.user_agents)
+
+
+# the pool of all rosreestr clients of the process which have no pinned User-Agent
+DEFAULT_POOL = UserAgentPool()
+
+
+def _load_user_agents(size: int) -> List[str]:
+    from fake_useragent import UserAgent
+
+    user_agent = UserAgent()
+    return list(dict.fromkeys(user_agent.random for _ in range(size)))
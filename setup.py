@@ -14,7 +14,11 @@ setup(
     install_requires=requirements,
     description='Toolset to work with rosreestr.gov.ru/api and pkk.rosreestr.ru/api',
     packages=find_packages(),
-    extras_require={'dev': ['ipdb>=0.13.2', 'pytest>=5.4.1', 'httpretty>=1.0.2']},
+    entry_points={'console_scripts': ['rosreestr-api = rosreestr_api.cli:main']},
+    extras_require={
+        'async': ['aiohttp>=3.8'],
+        'tracing': ['opentelemetry-api>=1.0'],
+        'dev': ['ipdb>=0.13.2', 'pytest>=5.4.1', 'httpretty>=1.0.2', 'aiohttp>=3.8']},
     classifiers=[
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
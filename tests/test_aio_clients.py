@@ -0,0 +1,398 @@
+import asyncio
+import threading
+
+import pytest
+import requests
+
+from benchmarks.run import get_stub_client_cls, get_stub_ssl_context
+from benchmarks.stub_server import StubHandler, StubServer
+from tests import pkk_client_fixtures, rosreestr_client_fixtures
+
+aiohttp = pytest.importorskip('aiohttp')
+
+from rosreestr_api.clients.aio import (  # noqa: E402
+    AsyncRosreestrAPIClient,
+    AsyncPKKRosreestrAPIClient,
+)
+from rosreestr_api.clients.hedging import HedgePolicy  # noqa: E402
+from rosreestr_api.clients.regions import RegionsSnapshot  # noqa: E402
+from rosreestr_api.clients.retry import RetryPolicy  # noqa: E402
+from rosreestr_api.clients.rosreestr import AddressWrapper, RosreestrAPIClient  # noqa: E402
+
+
+class FakeAiohttpResponse:
+
+    def __init__(self, status, body, delay=0):
+        self.status = status
+        self.reason = 'OK' if status < 400 else 'Error'
+        self.headers = {'Content-Type': 'application/json'}
+        self._body = body
+        self._delay = delay
+
+    @property
+    def content(self):
+        return self
+
+    async def read(self):
+        await asyncio.sleep(self._delay)
+        return self._body
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self._body), size):
+            yield self._body[i:i + size]
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __await__(self):
+        yield from []
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeAiohttpSession:
+
+    closed = False
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requested_urls = []
+
+    def request(self, method, url, **kwargs):
+        url = str(url)
+        self.requested_urls.append(url)
+        route = self.routes[url]
+        if isinstance(route, Exception):
+            raise route
+        # routes are (status, body) or (status, body, delay)
+        return FakeAiohttpResponse(*(route.pop(0) if isinstance(route, list) else route))
+
+    async def close(self):
+        self.closed = True
+
+
+class RecordingStubHandler(StubHandler):
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        super().do_GET()
+
+
+@pytest.fixture
+def stub_server():
+    # the HTTPS stub server of benchmarks, the clients trust its certificate
+    server = StubServer()
+    server.RequestHandlerClass = RecordingStubHandler
+    server.paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _make_stub_client(client_cls, stub_server, **kwargs):
+    return get_stub_client_cls(client_cls, stub_server.base_url)(
+        ssl_context=get_stub_ssl_context(), user_agent='rosreestr-api', **kwargs)
+
+
+def _make_client(client_cls, routes, **kwargs):
+    client = client_cls(**kwargs)
+    session = FakeAiohttpSession(routes)
+    client._http_client._session = session
+    return client, session
+
+
+def test_get_object():
+    object_id = '177_385900460001'
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format(object_id)
+    client, _ = _make_client(
+        AsyncRosreestrAPIClient, {url: (200, rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)})
+
+    obj = asyncio.run(client.get_object(object_id))
+
+    assert rosreestr_client_fixtures.OBJECT_BY_ID == obj
+
+
+def test_get_object_raises_http_error():
+    object_id = '177_385900460001'
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format(object_id)
+    client, _ = _make_client(AsyncRosreestrAPIClient, {url: (500, b'')})
+
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(client.get_object(object_id))
+
+
+def test_get_object_is_retried():
+    object_id = '177_385900460001'
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format(object_id)
+    client = AsyncRosreestrAPIClient(
+        retry_policy=RetryPolicy(max_attempts=2, backoff_factor=0.001))
+    client._http_client._session = session = FakeAiohttpSession(
+        {url: [(503, b''), (200, rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)]})
+
+    obj = asyncio.run(client.get_object(object_id))
+
+    assert rosreestr_client_fixtures.OBJECT_BY_ID == obj
+    assert len(session.requested_urls) == 2
+
+
+def test_slow_request_is_hedged():
+    object_id = '177_385900460001'
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format(object_id)
+    hedge_policy = HedgePolicy(delay=0.01, max_ratio=1, burst=1)
+    client = AsyncRosreestrAPIClient(hedge_policy=hedge_policy)
+    client._http_client._session = session = FakeAiohttpSession({url: [
+        (200, rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE, 10),
+        (200, rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)]})
+
+    obj = asyncio.run(asyncio.wait_for(client.get_object(object_id), timeout=5))
+
+    assert rosreestr_client_fixtures.OBJECT_BY_ID == obj
+    assert len(session.requested_urls) == 2
+    assert hedge_policy.stats.hedges == hedge_policy.stats.wins == 1
+
+
+def test_get_objects():
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('50:4:0:35646')
+    client, session = _make_client(
+        AsyncRosreestrAPIClient, {url: (200, rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)})
+
+    async def collect():
+        return [result async for result in client.get_objects(
+            ['50:04:0000000:35646', '50:4:0:35646', '50:4:0:1'])]
+
+    results = asyncio.run(collect())
+
+    assert [obj_id for obj_id, _ in results] == ['50:4:0:35646', '50:4:0:1']
+    assert results[0][1] == rosreestr_client_fixtures.OBJECT_BY_ID
+    assert isinstance(results[1][1], KeyError)
+    assert session.requested_urls.count(url) == 1
+
+
+def test_get_macro_regions_to_regions():
+    routes = {
+        RosreestrAPIClient.MACRO_REGIONS_URL: (
+            200, rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE),
+        RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_1): (
+            200, rosreestr_client_fixtures.MACRO_REGION_TO_REGION_1_RESPONSE),
+        RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_2): (
+            200, rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE),
+    }
+    client, _ = _make_client(AsyncRosreestrAPIClient, routes)
+
+    regions = asyncio.run(client.get_macro_regions_to_regions())
+
+    assert rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS == regions
+
+
+@pytest.mark.parametrize('failed_url', [
+    RosreestrAPIClient.MACRO_REGIONS_URL,
+    RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_2),
+])
+def test_stale_snapshot_is_used_when_download_fails(tmp_path, failed_url):
+    routes = {
+        RosreestrAPIClient.MACRO_REGIONS_URL: (
+            200, rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE),
+        RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_1): (
+            200, rosreestr_client_fixtures.MACRO_REGION_TO_REGION_1_RESPONSE),
+        failed_url: aiohttp.ClientConnectionError('Connection refused'),
+    }
+    snapshot = RegionsSnapshot(str(tmp_path / 'regions.json'), ttl=-1)
+    snapshot.save(
+        rosreestr_client_fixtures.MACRO_REGIONS, rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS)
+    client, _ = _make_client(AsyncRosreestrAPIClient, routes, regions_snapshot=snapshot)
+
+    regions = asyncio.run(client.get_macro_regions_to_regions())
+
+    assert rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS == regions
+    assert rosreestr_client_fixtures.MACRO_REGIONS == client.macro_regions
+
+
+def test_download_error_is_raised_without_snapshot():
+    routes = {RosreestrAPIClient.MACRO_REGIONS_URL: aiohttp.ClientConnectionError()}
+    client, _ = _make_client(AsyncRosreestrAPIClient, routes)
+
+    with pytest.raises(requests.ConnectionError):
+        asyncio.run(client.get_macro_regions())
+
+
+def test_get_objects_by_address_with_names():
+    address = AddressWrapper(
+        macro_region_name='Севастополь', region_name='Вишневое',
+        street_name='Ленина', house_number='1')
+    url = RosreestrAPIClient.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+        macro_region_id=rosreestr_client_fixtures.MACRO_REGION_ID_2,
+        region_id=39200000000200, street_name='Ленина', house_number='1',
+        house_building='', house_structure='', apartment='')
+    routes = {
+        RosreestrAPIClient.MACRO_REGIONS_URL: (
+            200, rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE),
+        RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_1): (
+            200, rosreestr_client_fixtures.MACRO_REGION_TO_REGION_1_RESPONSE),
+        RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_2): (
+            200, rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE),
+        requests.Request('GET', url).prepare().url: (
+            200, rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE),
+    }
+    client, _ = _make_client(AsyncRosreestrAPIClient, routes)
+
+    objects = asyncio.run(client.get_objects_by_address(address))
+
+    assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == objects
+
+
+def test_get_objects_by_address_with_lazy_regions():
+    address = AddressWrapper(
+        macro_region_name='Севастополь', region_name='Вишневое',
+        street_name='Ленина', house_number='1')
+    url = RosreestrAPIClient.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+        macro_region_id=rosreestr_client_fixtures.MACRO_REGION_ID_2,
+        region_id=39200000000200, street_name='Ленина', house_number='1',
+        house_building='', house_structure='', apartment='')
+    routes = {
+        RosreestrAPIClient.MACRO_REGIONS_URL: (
+            200, rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE),
+        RosreestrAPIClient.REGIONS_URL.format(rosreestr_client_fixtures.MACRO_REGION_ID_2): (
+            200, rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE),
+        requests.Request('GET', url).prepare().url: (
+            200, rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE),
+    }
+    client = AsyncRosreestrAPIClient(lazy_regions=True)
+    client._http_client._session = session = FakeAiohttpSession(routes)
+
+    objects = asyncio.run(client.get_objects_by_address(address))
+
+    assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == objects
+    assert len(session.requested_urls) == 3
+
+
+def test_iter_objects_by_address():
+    address = AddressWrapper(
+        macro_region_id='145000000000', region_id='145296000000',
+        street_name='Ленина', house_number='1')
+    url = RosreestrAPIClient.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+        macro_region_id='145000000000', region_id='145296000000', street_name='Ленина',
+        house_number='1', house_building='', house_structure='', apartment='')
+    client, _ = _make_client(
+        AsyncRosreestrAPIClient,
+        {requests.Request('GET', url).prepare().url: (
+            200, rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE)})
+
+    async def collect():
+        return [obj async for obj in client.iter_objects_by_address(address, chunk_size=16)]
+
+    assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == asyncio.run(collect())
+
+
+def test_get_objects_by_addresses():
+    address = {'macro_region_id': '145000000000', 'region_id': '145296000000',
+               'street_name': 'Ленина', 'house_number': '1'}
+    url = RosreestrAPIClient.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+        macro_region_id='145000000000', region_id='145296000000', street_name='Ленина',
+        house_number='1', house_building='', house_structure='', apartment='')
+    client, session = _make_client(
+        AsyncRosreestrAPIClient,
+        {requests.Request('GET', url).prepare().url: (
+            200, rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE)})
+
+    async def collect():
+        return {index: result async for index, _, result in client.get_objects_by_addresses(
+            [address, {'street_name': 'Ленина'}, AddressWrapper(**address)])}
+
+    results = asyncio.run(collect())
+    assert results[0] == results[2] == rosreestr_client_fixtures.OBJECTS_BY_ADDRESS
+    assert isinstance(results[1], TypeError)
+    assert len(session.requested_urls) == 1
+
+
+def test_get_parcel_by_coordinates():
+    search_params = {'lat': 55.542, 'long': 37.483, 'limit': 11, 'tolerance': 2}
+    url = AsyncPKKRosreestrAPIClient.SEARCH_PARCEL_BY_COORDINATES_URL.format(**search_params)
+    client, _ = _make_client(
+        AsyncPKKRosreestrAPIClient,
+        {url: (200, pkk_client_fixtures.PARCEL_BY_COORDINATES_RESPONSE)})
+
+    obj = asyncio.run(client.get_parcel_by_coordinates(**search_params))
+
+    assert pkk_client_fixtures.PARCEL_BY_COORDINATES == obj
+
+
+def test_get_parcels_by_coordinates():
+    url = AsyncPKKRosreestrAPIClient.SEARCH_PARCEL_BY_COORDINATES_URL.format(
+        lat=55.542, long=37.483, limit=11, tolerance=2)
+    client, session = _make_client(
+        AsyncPKKRosreestrAPIClient,
+        {url: (200, pkk_client_fixtures.PARCEL_BY_COORDINATES_RESPONSE)})
+
+    async def collect():
+        return [row async for row in client.get_parcels_by_coordinates(
+            [(55.542001, 37.483), (55.542, 37.483002)], precision=5)]
+
+    rows = sorted(asyncio.run(collect()), key=lambda row: row[0])
+    assert rows == [
+        (0, (55.542, 37.483), pkk_client_fixtures.PARCEL_BY_COORDINATES),
+        (1, (55.542, 37.483), pkk_client_fixtures.PARCEL_BY_COORDINATES)]
+    assert session.requested_urls == [url]
+
+
+def test_close():
+    client, session = _make_client(AsyncPKKRosreestrAPIClient, {})
+
+    asyncio.run(client.close())
+
+    assert session.closed
+
+
+def test_requests_to_local_server(stub_server):
+    address = AddressWrapper(
+        macro_region_name='Севастополь', region_name='Вишневое',
+        street_name='Ленина', house_number='1')
+    client = _make_stub_client(AsyncRosreestrAPIClient, stub_server)
+
+    async def get():
+        async with client:
+            return (
+                await client.get_object('177_385900460001'),
+                await client.get_objects_by_address(address))
+
+    obj, objects = asyncio.run(get())
+
+    assert rosreestr_client_fixtures.OBJECT_BY_ID == obj
+    assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == objects
+    # Cyrillic is sent percent-encoded once, the same way as by the sync client
+    url = client.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+        macro_region_id=rosreestr_client_fixtures.MACRO_REGION_ID_2,
+        region_id=39200000000200, street_name='Ленина', house_number='1',
+        house_building='', house_structure='', apartment='')
+    assert stub_server.paths[-1] == requests.Request('GET', url).prepare().path_url
+    assert '%D0%9B%D0%B5%D0%BD%D0%B8%D0%BD%D0%B0' in stub_server.paths[-1]
+
+
+def test_pkk_requests_to_local_server(stub_server):
+    client = _make_stub_client(AsyncPKKRosreestrAPIClient, stub_server, keep_alive=False)
+
+    async def get():
+        async with client:
+            return await client.get_parcel_by_coordinates(lat=55.5, long=37.5)
+
+    assert pkk_client_fixtures.PARCEL_BY_COORDINATES == asyncio.run(get())
+
+
+def test_untrusted_certificate_is_rejected(stub_server):
+    client = get_stub_client_cls(AsyncRosreestrAPIClient, stub_server.base_url)(
+        user_agent='rosreestr-api')
+
+    async def get():
+        async with client:
+            return await client.get_object('177_385900460001')
+
+    with pytest.raises(requests.ConnectionError):
+        asyncio.run(get())
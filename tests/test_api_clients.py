@@ -2,8 +2,10 @@ from unittest.mock import patch, MagicMock
 
 import pytest
 import httpretty
+import requests
 
 from tests import pkk_client_fixtures, rosreestr_client_fixtures
+from rosreestr_api.clients import rosreestr
 from rosreestr_api.clients.rosreestr import (
     AddressWrapper,
     RosreestrAPIClient,
@@ -75,6 +77,72 @@ class TestRosreestrAPIClient:
 
         assert rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS == api_client.macro_regions_to_regions
 
+    @httpretty.activate
+    def test_get_objects_by_address_with_lazy_regions(self):
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.MACRO_REGIONS_URL, body=rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE,
+            content_type=self.CONTENT_TYPE_JSON)
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.REGIONS_URL.format(
+                rosreestr_client_fixtures.MACRO_REGION_ID_2),
+            body=rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE, content_type=self.CONTENT_TYPE_JSON)
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+                macro_region_id=rosreestr_client_fixtures.MACRO_REGION_ID_2, region_id=39200000000200,
+                street_name='Ленина', house_number='1', house_building='', house_structure='', apartment=''),
+            body=rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE, content_type=self.CONTENT_TYPE_JSON)
+        address = AddressWrapper(
+            macro_region_name='Севастополь', region_name='Вишневое',
+            street_name='Ленина', house_number='1')
+
+        api_client = RosreestrAPIClient(lazy_regions=True)
+        objects = api_client.get_objects_by_address(address)
+
+        assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == objects
+        assert len(httpretty.latest_requests()) == 3
+
+    @httpretty.activate
+    def test_get_objects_by_addresses(self):
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.MACRO_REGIONS_URL, body=rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE,
+            content_type=self.CONTENT_TYPE_JSON)
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.REGIONS_URL.format(
+                rosreestr_client_fixtures.MACRO_REGION_ID_2),
+            body=rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE, content_type=self.CONTENT_TYPE_JSON)
+        for house_number in ('1', '2'):
+            httpretty.register_uri(
+                method=httpretty.GET, uri=self.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+                    macro_region_id=rosreestr_client_fixtures.MACRO_REGION_ID_2, region_id=39200000000200,
+                    street_name='Ленина', house_number=house_number, house_building='', house_structure='',
+                    apartment=''),
+                body=rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE, content_type=self.CONTENT_TYPE_JSON)
+        region = {'macro_region_name': 'Севастополь', 'region_name': 'Вишневое'}
+        addresses = [
+            AddressWrapper(street_name='Ленина', house_number='1', **region),
+            {'street_name': 'Ленина', 'house_number': '2', **region},
+            {'street_name': 'Ленина', 'house_number': '1', 'macro_region_name': 'Севастополь'},
+            AddressWrapper(street_name='Ленина', house_number='1', **region),
+            {'street_name': 'Ленина', 'house_number': '1', 'macro_region_name': 'Севастополь',
+             'region_name': 'Нет такого'},
+            {'street_name': 'Ленина', 'house_number': '2', 'macro_region_name': 'севастополь ',
+             'region_name': ' Вишнёвое'},
+        ]
+
+        api_client = RosreestrAPIClient(lazy_regions=True)
+        with patch.object(
+                api_client, '_resolve_address_ids', wraps=api_client._resolve_address_ids) as resolve:
+            results = {
+                index: result for index, _, result in api_client.get_objects_by_addresses(addresses)}
+
+        assert [results[index] for index in (0, 1, 3, 5)] == [rosreestr_client_fixtures.OBJECTS_BY_ADDRESS] * 4
+        # differently written names of one region are resolved once
+        assert resolve.call_count == 2
+        assert isinstance(results[2], ValueError)
+        assert isinstance(results[4], ValueError)
+        # macro regions, regions and two searches
+        assert len(httpretty.latest_requests()) == 4
+
     @httpretty.activate
     def test_get_region_types(self):
         httpretty.register_uri(
@@ -125,6 +193,24 @@ class TestRosreestrAPIClient:
 
         assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == objects
 
+    @httpretty.activate
+    def test_iter_objects_by_address(self):
+        address = AddressWrapper(
+            macro_region_id='145000000000', region_id='145296000000',
+            street_name='Красного маяка', house_number='22')
+        url = self.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+            macro_region_id='145000000000', region_id='145296000000',
+            street_name='Красного маяка', house_number='22', house_building='',
+            apartment='', house_structure='')
+        httpretty.register_uri(
+            method=httpretty.GET, uri=url, body=rosreestr_client_fixtures.OBJECTS_BY_ADDRESS_RESPONSE,
+            content_type=self.CONTENT_TYPE_JSON)
+
+        api_client = RosreestrAPIClient()
+        objects = api_client.iter_objects_by_address(address, chunk_size=16)
+
+        assert rosreestr_client_fixtures.OBJECTS_BY_ADDRESS == list(objects)
+
     @httpretty.activate
     def test_get_object(self):
         object_id = '177_385900460001'
@@ -138,6 +224,39 @@ class TestRosreestrAPIClient:
 
         assert rosreestr_client_fixtures.OBJECT_BY_ID == obj
 
+    @httpretty.activate
+    def test_get_objects(self):
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.SEARCH_DETAILED_OBJECT_BY_ID.format('50:4:0:35646'),
+            body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE,
+            content_type=self.CONTENT_TYPE_JSON)
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.SEARCH_DETAILED_OBJECT_BY_ID.format('50:4:0:1'),
+            status=500)
+
+        api_client = RosreestrAPIClient()
+        results = list(api_client.get_objects(
+            ['50:04:0000000:35646', '50:4:0:1', '50:4:0:35646'], max_workers=2))
+
+        assert [obj_id for obj_id, _ in results] == ['50:4:0:35646', '50:4:0:1']
+        assert results[0][1] == rosreestr_client_fixtures.OBJECT_BY_ID
+        assert isinstance(results[1][1], requests.HTTPError)
+
+    @httpretty.activate
+    def test_get_objects_uses_max_workers_of_client(self):
+        httpretty.register_uri(
+            method=httpretty.GET, uri=self.SEARCH_DETAILED_OBJECT_BY_ID.format('50:4:0:35646'),
+            body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE,
+            content_type=self.CONTENT_TYPE_JSON)
+
+        api_client = RosreestrAPIClient(max_workers=3)
+        with patch.object(
+                rosreestr, 'map_concurrently', wraps=rosreestr.map_concurrently) as map_mock:
+            list(api_client.get_objects(['50:04:0000000:35646']))
+            list(api_client.get_objects(['50:04:0000000:35646'], max_workers=2))
+
+        assert [call.kwargs['max_workers'] for call in map_mock.call_args_list] == [3, 2]
+
     def test_get_object_strip_cadastral_id(self):
         expected_arg = f'{self.BASE_URL}/fir_object/50:4:0:35646/'
         object_id = '50:04:0000000:35646'
@@ -229,3 +348,42 @@ class TestPKKRosreestrAPIClient:
         obj = api_client.get_building_by_cadastral_id(**search_params)
 
         assert pkk_client_fixtures.BUILDING_BY_CADASTRAL_ID == obj
+
+    @httpretty.activate
+    def test_get_buildings_by_coordinates(self):
+        urls = [
+            self.SEARCH_BUILDING_BY_COORDINATES_URL.format(
+                lat=lat, long=37.59876, limit=1, tolerance=170)
+            for lat in (54.16829, 54.1683)]
+        for url in urls:
+            httpretty.register_uri(
+                method=httpretty.GET, uri=url,
+                body=pkk_client_fixtures.BUILDING_BY_COORDINATES_RESPONSE,
+                content_type=self.CONTENT_TYPE_JSON)
+        points = [(54.168291, 37.59876), (54.1683, 37.59876), (54.168288, 37.598761)]
+
+        api_client = PKKRosreestrAPIClient()
+        rows = api_client.get_buildings_by_coordinates(
+            points, precision=5, max_workers=2, limit=1, tolerance=170)
+
+        assert sorted(rows, key=lambda row: row[0]) == [
+            (0, (54.16829, 37.59876), pkk_client_fixtures.BUILDING_BY_COORDINATES),
+            (1, (54.1683, 37.59876), pkk_client_fixtures.BUILDING_BY_COORDINATES),
+            (2, (54.16829, 37.59876), pkk_client_fixtures.BUILDING_BY_COORDINATES)]
+        assert len(httpretty.latest_requests()) == 2
+
+    @httpretty.activate
+    def test_bulk_lookups_use_max_workers_of_client(self):
+        url = self.SEARCH_PARCEL_BY_COORDINATES_URL.format(
+            lat=54.16829, long=37.59876, limit=11, tolerance=2)
+        httpretty.register_uri(
+            method=httpretty.GET, uri=url,
+            body=pkk_client_fixtures.PARCEL_BY_COORDINATES_RESPONSE,
+            content_type=self.CONTENT_TYPE_JSON)
+
+        api_client = PKKRosreestrAPIClient(max_workers=3)
+        with patch.object(
+                rosreestr, 'map_concurrently', wraps=rosreestr.map_concurrently) as map_mock:
+            list(api_client.get_parcels_by_coordinates([(54.16829, 37.59876)]))
+
+        assert map_mock.call_args.kwargs['max_workers'] == 3
@@ -0,0 +1,37 @@
+import json
+
+from benchmarks import run
+from rosreestr_api.clients.http import get_ssl_context
+
+
+def test_benchmarks_run(tmp_path):
+    output = str(tmp_path / 'results.json')
+    cert_store_stats = get_ssl_context().cert_store_stats()
+
+    run.main([
+        '--requests', '4', '--concurrency', '2', '--workloads', 'fir_object',
+        '--transports', 'requests', 'urllib3',
+        '--directory-repeats', '1', '--error-rate', '0.5', '--no-memory', '--output', output])
+
+    with open(output) as f:
+        report = json.load(f)
+    results = report['results']
+    assert [result['scenario'] for result in results] == [
+        'requests', 'requests', 'requests', 'requests', 'directory_cold', 'directory_warm']
+    assert [(result['transport'], result['keep_alive']) for result in results[:4]] == [
+        ('requests', False), ('requests', True), ('urllib3', False), ('urllib3', True)]
+    assert all(result['requests'] == 4 for result in results[:4])
+    assert report['parameters']['error_rate'] == 0.5
+    # the stub certificate is not trusted by production clients
+    assert get_ssl_context().cert_store_stats() == cert_store_stats
+
+
+def test_measure_counts_every_error():
+    def call(item):
+        if item % 2:
+            raise ValueError(item)
+
+    result = run.measure(call, list(range(1000)), concurrency=16)
+
+    assert result['requests'] == 1000
+    assert result['errors'] == 500
@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock
+
+import httpretty
+import pytest
+import requests
+
+from tests import pkk_client_fixtures, rosreestr_client_fixtures
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.cache import MemoryCache, SQLiteCache
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCache(max_size=2)
+    return SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_size=2)
+
+
+def test_get_or_fetch(cache):
+    fetch = MagicMock(return_value={'objectId': '1'})
+
+    assert cache.get_or_fetch(endpoints.FIR_OBJECT, '1', fetch) == {'objectId': '1'}
+    assert cache.get_or_fetch(endpoints.FIR_OBJECT, '1', fetch) == {'objectId': '1'}
+    assert fetch.call_count == 1
+    assert cache.stats.as_dict() == {'hits': 1, 'misses': 1, 'negative_hits': 0, 'evictions': 0}
+
+
+def test_lru_eviction(cache):
+    cache.set(endpoints.FIR_OBJECT, '1', 'first')
+    cache.set(endpoints.FIR_OBJECT, '2', 'second')
+    cache.get(endpoints.FIR_OBJECT, '1')
+    cache.set(endpoints.FIR_OBJECT, '3', 'third')
+
+    assert cache.get(endpoints.FIR_OBJECT, '1') == (True, 'first')
+    assert cache.get(endpoints.FIR_OBJECT, '2') == (False, None)
+    assert cache.stats.evictions == 1
+
+
+def test_expiration(cache):
+    cache.ttls = {endpoints.FIR_OBJECT: -1}
+    cache.set(endpoints.FIR_OBJECT, '1', 'first')
+    cache.set(endpoints.PKK_PARCEL_BY_CADASTRAL_ID, '1', 'parcel')
+
+    assert cache.get(endpoints.FIR_OBJECT, '1') == (False, None)
+    assert cache.get(endpoints.PKK_PARCEL_BY_CADASTRAL_ID, '1') == (True, 'parcel')
+
+
+def test_negative_results(cache):
+    cache.negative_ttl = -1
+    cache.get_or_fetch(endpoints.FIR_OBJECT, '1', lambda: '')
+
+    assert cache.get(endpoints.FIR_OBJECT, '1') == (False, None)
+
+
+@httpretty.activate
+def test_get_object_caches_not_found_error():
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('50:4:0:1')
+    httpretty.register_uri(method=httpretty.GET, uri=url, status=404)
+    api_client = RosreestrAPIClient(cache=MemoryCache())
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError) as e:
+            api_client.get_object('50:04:0000000:1')
+        assert e.value.response.status_code == 404
+
+    assert len(httpretty.latest_requests()) == 1
+    assert api_client.cache.stats.negative_hits == 1
+
+
+@httpretty.activate
+def test_get_object_uses_normalized_cache_key():
+    httpretty.register_uri(
+        method=httpretty.GET, uri=RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('50:4:0:1'),
+        body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)
+    api_client = RosreestrAPIClient(cache=MemoryCache())
+
+    api_client.get_object('50:04:0000000:1')
+    obj = api_client.get_object('50:4:0:1')
+
+    assert obj == rosreestr_client_fixtures.OBJECT_BY_ID
+    assert len(httpretty.latest_requests()) == 1
+
+
+@httpretty.activate
+def test_get_parcel_by_cadastral_id_is_cached():
+    search_params = {'cadastral_id': '77:17:0000000:11471', 'limit': 11, 'tolerance': 2}
+    httpretty.register_uri(
+        method=httpretty.GET,
+        uri=PKKRosreestrAPIClient.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(**search_params),
+        body=pkk_client_fixtures.PARCEL_BY_CADASTRAL_ID_RESPONSE)
+    api_client = PKKRosreestrAPIClient(cache=MemoryCache())
+
+    api_client.get_parcel_by_cadastral_id(**search_params)
+    obj = api_client.get_parcel_by_cadastral_id(**search_params)
+
+    assert obj == pkk_client_fixtures.PARCEL_BY_CADASTRAL_ID
+    assert len(httpretty.latest_requests()) == 1
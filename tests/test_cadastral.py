@@ -0,0 +1,56 @@
+import pickle
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rosreestr_api.clients.cadastral import CadastralNumber, InvalidCadastralNumber, normalize_many
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+
+
+def test_cadastral_number():
+    cadastral_number = CadastralNumber(' 77:05:0007007:4926 ')
+
+    assert cadastral_number == '77:5:7007:4926'
+    assert CadastralNumber('77:00:0000000:10') == '77:0:0:10'
+    assert (cadastral_number.region, cadastral_number.district, cadastral_number.quarter,
+            cadastral_number.number) == ('77', '5', '7007', '4926')
+    assert cadastral_number.quarter_number == '77:5:7007'
+    assert CadastralNumber(cadastral_number) is cadastral_number
+    assert pickle.loads(pickle.dumps(cadastral_number)) == cadastral_number
+    assert {cadastral_number: 1}['77:5:7007:4926'] == 1
+
+
+@pytest.mark.parametrize('value', [
+    '', '77:05:0007007', '77:05:0007007:4926:1', '77:05:000a007:4926', '777:05:0007007:4926',
+    '77::0007007:4926', None])
+def test_invalid_cadastral_number(value):
+    assert not CadastralNumber.is_valid(value)
+    with pytest.raises(InvalidCadastralNumber):
+        CadastralNumber(value)
+
+
+def test_normalize_many():
+    values = ['77:05:0007007:4926', '77:5:7007:4926', 'invalid', '77:05:0007007:4926']
+
+    cadastral_numbers = list(normalize_many(values, strict=False))
+
+    assert cadastral_numbers == ['77:5:7007:4926', '77:5:7007:4926', None, '77:5:7007:4926']
+    assert cadastral_numbers[0] is cadastral_numbers[1] is cadastral_numbers[3]
+    with pytest.raises(InvalidCadastralNumber):
+        list(normalize_many(values))
+
+
+def test_clients_reject_invalid_cadastral_numbers():
+    mock_http_client = MagicMock()
+
+    with patch('rosreestr_api.clients.rosreestr.RosreestrHTTPClient', mock_http_client):
+        api_client = RosreestrAPIClient()
+        pkk_client = PKKRosreestrAPIClient()
+    with pytest.raises(InvalidCadastralNumber):
+        api_client.get_object('77:05:0007007:49a6')
+    with pytest.raises(InvalidCadastralNumber):
+        pkk_client.get_parcel_by_cadastral_id('77:05')
+    results = list(api_client.get_objects(['77:05:0007007:49a6']))
+
+    assert isinstance(results[0][1], InvalidCadastralNumber)
+    mock_http_client.return_value.get.assert_not_called()
@@ -0,0 +1,94 @@
+import json
+
+import httpretty
+
+from rosreestr_api import cli
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+from tests import pkk_client_fixtures, rosreestr_client_fixtures
+
+
+def _read_records(path):
+    with open(path) as f:
+        return sorted((json.loads(line) for line in f), key=lambda record: record['row'])
+
+
+def test_checkpoint(tmp_path):
+    path = str(tmp_path / 'journal')
+    checkpoint = cli.Checkpoint(path)
+    checkpoint.mark_done(3)
+    checkpoint.mark_done(100)
+    checkpoint.close()
+    with open(path, 'a') as f:
+        # a line torn by a crash
+        f.write('5')
+
+    checkpoint = cli.Checkpoint(path)
+    checkpoint.mark_done(7)
+    checkpoint.close()
+
+    checkpoint = cli.Checkpoint(path)
+    assert [index for index in range(200) if checkpoint.is_done(index)] == [3, 7, 100]
+    assert checkpoint.done_number == 3
+
+
+@httpretty.activate
+def test_objects_are_resumed_from_checkpoint(tmp_path):
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('77:5:7007:4926')
+    httpretty.register_uri(
+        httpretty.GET, url, body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE,
+        content_type='application/json')
+    input_path = tmp_path / 'ids.csv'
+    input_path.write_text('cadastral_id,name\n77:05:0007007:4926,first\n77:05:000a007,second\n')
+    output_path, checkpoint_path = str(tmp_path / 'objects.jsonl'), str(tmp_path / 'journal')
+    argv = ['object', str(input_path), '--output', output_path, '--checkpoint', checkpoint_path]
+
+    assert cli.main(argv) == 0
+    first_record, second_record = _read_records(output_path)
+    assert first_record == {
+        'row': 0, 'input': {'cadastral_id': '77:05:0007007:4926', 'name': 'first'},
+        'result': rosreestr_client_fixtures.OBJECT_BY_ID}
+    assert second_record['error'].startswith('InvalidCadastralNumber')
+
+    assert cli.main(argv) == 0
+    assert len(_read_records(output_path)) == 2
+    assert len(httpretty.latest_requests()) == 1
+
+
+@httpretty.activate
+def test_parcels_from_stdin(tmp_path, monkeypatch, capsys):
+    url = PKKRosreestrAPIClient.SEARCH_PARCEL_BY_COORDINATES_URL.format(
+        lat=55.542, long=37.483, limit=11, tolerance=2)
+    httpretty.register_uri(
+        httpretty.GET, url, body=pkk_client_fixtures.PARCEL_BY_COORDINATES_RESPONSE,
+        content_type='application/json')
+    monkeypatch.setattr('sys.stdin', __import__('io').StringIO(
+        '{"lat": 55.542, "long": 37.483}\n\n{broken\n'))
+
+    assert cli.main(['parcel', '--max-workers', '2']) == 0
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    records.sort(key=lambda record: record['row'])
+    assert records[0]['result'] == pkk_client_fixtures.PARCEL_BY_COORDINATES
+    assert records[1]['input'] is None
+    assert records[1]['error'].startswith('JSONDecodeError')
+
+
+@httpretty.activate
+def test_failed_pkk_rows_are_retried_by_next_run(tmp_path):
+    url = PKKRosreestrAPIClient.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
+        cadastral_id='77:17:0000000:11471', limit=11, tolerance=2)
+    httpretty.register_uri(httpretty.GET, url, body='<html>Service Unavailable</html>', status=503)
+    input_path = tmp_path / 'ids.jsonl'
+    input_path.write_text('"77:17:0000000:11471"\n')
+    output_path, checkpoint_path = str(tmp_path / 'parcels.jsonl'), str(tmp_path / 'journal')
+    argv = ['parcel', str(input_path), '--output', output_path, '--checkpoint', checkpoint_path,
+            '--retries', '1']
+
+    assert cli.main(argv) == 0
+    assert _read_records(output_path)[0]['error'].startswith('HTTPError')
+    checkpoint = cli.Checkpoint(checkpoint_path)
+    assert not checkpoint.is_done(0)
+    checkpoint.close()
+
+    assert cli.main(argv) == 0
+    assert len(httpretty.latest_requests()) == 2
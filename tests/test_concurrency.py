@@ -0,0 +1,29 @@
+import time
+
+from rosreestr_api.clients.concurrency import map_concurrently, unique
+
+
+def _slow_square(number):
+    if number < 0:
+        raise ValueError(number)
+    time.sleep(0.01 * number)
+    return number * number
+
+
+def test_map_concurrently_ordered():
+    results = list(map_concurrently(_slow_square, [3, -1, 1, 2], max_workers=2))
+
+    assert [item for item, _ in results] == [3, -1, 1, 2]
+    assert [results[0][1], results[2][1], results[3][1]] == [9, 1, 4]
+    assert isinstance(results[1][1], ValueError)
+
+
+def test_map_concurrently_unordered():
+    results = list(map_concurrently(_slow_square, [5, 0, 1], max_workers=3, ordered=False))
+
+    assert results[0] == (0, 0)
+    assert sorted(results) == [(0, 0), (1, 1), (5, 25)]
+
+
+def test_unique():
+    assert list(unique(['b', 'a', 'b', 'c', 'a'])) == ['b', 'a', 'c']
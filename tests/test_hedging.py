@@ -0,0 +1,193 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpretty
+import pytest
+
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.hedging import HedgePolicy
+from rosreestr_api.clients.http import RosreestrHTTPClient
+from rosreestr_api.clients.metrics import Metrics
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+from tests import rosreestr_client_fixtures
+
+
+OBJECT_URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('77:5:7007:4926')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.calls.append(time.time())
+            delay = self.server.delays[len(self.server.calls) - 1]
+        time.sleep(delay)
+        body = rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    # callers connect at once, SYNs over the backlog are retried a second later
+    request_queue_size = 64
+
+    def __init__(self, delays):
+        super().__init__(('localhost', 0), Handler)
+        # delays of responses in the order of requests, the last one is used for the rest
+        self.delays = list(delays) + [delays[-1]] * 100
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # responses of aborted requests are written to closed connections
+        pass
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(delays):
+        server = Server(delays)
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f'http://localhost:{server.server_port}/api/online/fir_object/1/'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _register_slow_first_response(url, delay):
+    calls = []
+
+    def callback(request, uri, response_headers):
+        calls.append(time.time())
+        if len(calls) == 1:
+            time.sleep(delay)
+        return [200, response_headers, rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE]
+
+    httpretty.register_uri(httpretty.GET, url, body=callback)
+    return calls
+
+
+def test_delay_is_a_quantile_of_latencies():
+    hedge_policy = HedgePolicy(quantile=0.9, min_samples=10)
+    for _ in range(9):
+        hedge_policy.observe(endpoints.FIR_OBJECT, 0.1)
+
+    assert hedge_policy.get_delay(endpoints.FIR_OBJECT) is None
+    hedge_policy.observe(endpoints.FIR_OBJECT, 0.1)
+    assert hedge_policy.get_delay(endpoints.FIR_OBJECT) == pytest.approx(0.1, rel=0.25)
+
+
+def test_hedges_are_limited_by_budget():
+    hedge_policy = HedgePolicy(max_ratio=0.5, burst=1)
+
+    hedge_policy.add_request()
+    assert not hedge_policy.acquire()
+    hedge_policy.add_request()
+    assert hedge_policy.acquire()
+    hedge_policy.add_request()
+    assert not hedge_policy.acquire()
+    assert hedge_policy.stats.as_dict() == {
+        'requests': 3, 'hedges': 1, 'wins': 0, 'throttled': 2}
+
+
+def test_only_idempotent_endpoints_are_hedged():
+    hedge_policy = HedgePolicy()
+
+    assert hedge_policy.is_hedgeable('GET', endpoints.FIR_OBJECT)
+    assert hedge_policy.is_hedgeable('GET', endpoints.PKK_PARCEL_BY_COORDS)
+    assert not hedge_policy.is_hedgeable('GET', endpoints.ADDRESS)
+    assert not hedge_policy.is_hedgeable('POST', endpoints.FIR_OBJECT)
+
+
+def test_slow_request_is_hedged(start_server):
+    server, url = start_server(delays=[1, 0])
+    metrics = Metrics()
+    hedge_policy = HedgePolicy(delay=0.05, max_ratio=1, burst=1)
+    http_client = RosreestrHTTPClient(
+        keep_alive=True, hedge_policy=hedge_policy, metrics=metrics, user_agent='test')
+
+    start_time = time.time()
+    response = http_client.get(url)
+
+    assert response.json() == rosreestr_client_fixtures.OBJECT_BY_ID
+    assert time.time() - start_time < 0.9
+    assert len(server.calls) == 2
+    assert hedge_policy.stats.requests == 1
+    assert hedge_policy.stats.hedges == hedge_policy.stats.wins == 1
+    # the aborted original request is not counted as a failure
+    assert metrics.snapshot()[endpoints.FIR_OBJECT]['statuses'] == {'200': 1}
+    assert metrics.snapshot()[endpoints.FIR_OBJECT]['hedges'] == 1
+    http_client.close()
+
+
+def test_callers_are_not_limited_by_hedge_threads(start_server):
+    server, url = start_server(delays=[0.2])
+    hedge_policy = HedgePolicy(delay=0.5, max_ratio=1, burst=10, max_threads=2)
+    http_client = RosreestrHTTPClient(
+        keep_alive=True, hedge_policy=hedge_policy, pool_maxsize=16, user_agent='test')
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(executor.map(lambda _: http_client.get(url), range(16)))
+
+    assert [response.status_code for response in responses] == [200] * 16
+    assert time.time() - start_time < 0.45
+    assert len(server.calls) == 16
+    assert hedge_policy.stats.hedges == hedge_policy.stats.throttled == 0
+    http_client.close()
+
+
+def test_delay_starts_when_request_gets_connection(start_server):
+    # callers waiting for a free connection of the pool are not hedged
+    server, url = start_server(delays=[0.1])
+    hedge_policy = HedgePolicy(delay=0.3, max_ratio=1, burst=10)
+    http_client = RosreestrHTTPClient(
+        keep_alive=True, hedge_policy=hedge_policy, pool_maxsize=2, pool_block=True,
+        user_agent='test')
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        responses = list(executor.map(lambda _: http_client.get(url), range(10)))
+
+    assert [response.status_code for response in responses] == [200] * 10
+    assert len(server.calls) == 10
+    assert hedge_policy.stats.hedges == hedge_policy.stats.throttled == 0
+    http_client.close()
+
+
+@httpretty.activate
+def test_fast_request_is_not_hedged():
+    calls = _register_slow_first_response(OBJECT_URL, delay=0)
+    hedge_policy = HedgePolicy(delay=0.5, max_ratio=1, burst=1)
+    api_client = RosreestrAPIClient(hedge_policy=hedge_policy)
+
+    assert api_client.get_object('77:05:0007007:4926') == rosreestr_client_fixtures.OBJECT_BY_ID
+    assert len(calls) == 1
+    assert hedge_policy.stats.requests == 1
+    assert hedge_policy.stats.hedges == 0
+
+
+@httpretty.activate
+def test_requests_are_not_hedged_without_budget():
+    url = PKKRosreestrAPIClient.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
+        cadastral_id='77:17:0000000:11471', limit=11, tolerance=2)
+    calls = _register_slow_first_response(url, delay=0.2)
+    hedge_policy = HedgePolicy(delay=0.01, max_ratio=0.1)
+    api_client = PKKRosreestrAPIClient(hedge_policy=hedge_policy)
+
+    api_client.get_parcel_by_cadastral_id('77:17:0000000:11471')
+
+    assert len(calls) == 1
+    assert hedge_policy.stats.throttled == 1
@@ -0,0 +1,119 @@
+import logging
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import httpretty
+import pytest
+
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.http import (
+    CACERT_PATH,
+    CustomSession,
+    HTTPSAdapter,
+    RosreestrHTTPClient,
+    _get_body_for_logging,
+    get_ssl_context,
+)
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+
+
+OBJECT_URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('1')
+
+
+def test_ssl_context_is_shared():
+    ssl_context = get_ssl_context()
+
+    assert ssl_context is get_ssl_context()
+    assert ssl_context.minimum_version == ssl.TLSVersion.TLSv1_2
+    assert HTTPSAdapter().poolmanager.connection_pool_kw['ssl_context'] is ssl_context
+
+
+def test_cacert_is_not_loaded_for_every_connection():
+    conn = MagicMock()
+
+    HTTPSAdapter().cert_verify(conn, 'https://pkk.rosreestr.ru/api', CACERT_PATH, None)
+
+    assert conn.cert_reqs == 'CERT_REQUIRED'
+    assert conn.ca_certs is None
+
+
+def test_session_pool_settings():
+    session = RosreestrHTTPClient(pool_maxsize=32, pool_block=True).session
+    adapter = session.get_adapter('https://pkk.rosreestr.ru/api')
+
+    assert isinstance(session, CustomSession)
+    assert isinstance(adapter, HTTPSAdapter)
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block
+
+
+def test_keep_alive_session_is_shared_between_threads():
+    http_client = RosreestrHTTPClient(keep_alive=True)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = set(executor.map(lambda _: id(http_client.session), range(32)))
+
+    assert len(sessions) == 1
+    http_client.close()
+    assert http_client._session is None
+
+
+@pytest.mark.parametrize('url, endpoint', [
+    (RosreestrAPIClient.MACRO_REGIONS_URL, endpoints.MACRO_REGIONS),
+    (RosreestrAPIClient.REGIONS_URL.format(1), endpoints.REGIONS),
+    (OBJECT_URL, endpoints.FIR_OBJECT),
+    (RosreestrAPIClient.SEARCH_OBJECTS_BY_ADDRESS_URL.format(
+        macro_region_id=1, region_id=2, street_name='Ленина', house_number=1,
+        house_building='', house_structure='', apartment=''), endpoints.ADDRESS),
+    (PKKRosreestrAPIClient.SEARCH_PARCEL_BY_COORDINATES_URL.format(
+        lat=55.542, long=37.483, limit=11, tolerance=2), endpoints.PKK_PARCEL_BY_COORDS),
+    (PKKRosreestrAPIClient.SEARCH_BUILDING_BY_CADASTRAL_ID_URL.format(
+        cadastral_id='71:00:000000:112278', limit=1, tolerance=2),
+     endpoints.PKK_BUILDING_BY_CADASTRAL_ID),
+    ('https://example.com/', endpoints.OTHER),
+])
+def test_get_endpoint(url, endpoint):
+    assert RosreestrHTTPClient()._get_endpoint(url) == endpoint
+
+
+def test_get_body_for_logging():
+    assert _get_body_for_logging(b'{"id": 1}') == ' BODY: {"id": 1}'
+    assert _get_body_for_logging('абвгд'.encode('utf-8'), max_length=5) == ' BODY: аб... (10 in total)'
+    assert _get_body_for_logging(b'\xff') == ''
+    assert _get_body_for_logging(None) == ''
+
+
+@httpretty.activate
+@patch('rosreestr_api.clients.http._get_body_for_logging')
+def test_body_is_not_rendered_when_logging_is_disabled(get_body_mock):
+    httpretty.register_uri(method=httpretty.GET, uri=OBJECT_URL, body='{}')
+
+    with patch.object(logging.root, 'level', logging.WARNING):
+        RosreestrHTTPClient().get(OBJECT_URL)
+
+    get_body_mock.assert_not_called()
+
+
+@httpretty.activate
+def test_logged_body_is_truncated(caplog):
+    httpretty.register_uri(method=httpretty.GET, uri=OBJECT_URL, body='x' * 100)
+
+    with caplog.at_level(logging.DEBUG):
+        RosreestrHTTPClient(log_body_max_length=10).get(OBJECT_URL)
+
+    assert 'BODY: xxxxxxxxxx... (100 in total)' in caplog.text
+
+
+@httpretty.activate
+def test_log_sampling(caplog):
+    httpretty.register_uri(method=httpretty.GET, uri=OBJECT_URL, body='{}')
+    http_client = RosreestrHTTPClient(log_sample_rates={endpoints.FIR_OBJECT: 0})
+
+    with caplog.at_level(logging.DEBUG):
+        http_client.get(OBJECT_URL)
+        httpretty.register_uri(method=httpretty.GET, uri=OBJECT_URL, body='{}', status=500)
+        http_client.get(OBJECT_URL)
+
+    records = [record for record in caplog.records if not record.name.startswith('urllib3')]
+    assert [record.levelno for record in records] == [logging.ERROR]
@@ -0,0 +1,65 @@
+from unittest.mock import patch
+
+import httpretty
+
+from tests import rosreestr_client_fixtures
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.cache import MemoryCache
+from rosreestr_api.clients.metrics import Histogram, Metrics
+from rosreestr_api.clients.retry import RetryPolicy
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+
+
+URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('1')
+
+
+def test_histogram():
+    histogram = Histogram([1, 2, 4])
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.as_dict() == {
+        'count': 5, 'sum': 16.5, 'buckets': {'1': 1, '2': 3, '4': 4, '+Inf': 5}}
+    assert histogram.get_quantile(0.5) == 1.75
+    assert histogram.get_quantile(0.99) == 4
+    assert Histogram([1]).get_quantile(0.5) is None
+
+
+def test_metrics_to_prometheus():
+    metrics = Metrics(buckets=[1])
+    metrics.observe_request(endpoints.FIR_OBJECT, 0.5, status_code=200, bytes_received=10)
+    metrics.observe_request(endpoints.FIR_OBJECT, 2)
+
+    assert metrics.to_prometheus().splitlines()[2:9] == [
+        'rosreestr_requests_total{endpoint="fir_object",status="200"} 1',
+        'rosreestr_requests_total{endpoint="fir_object",status="error"} 1',
+        '# HELP rosreestr_request_duration_seconds Duration of HTTP requests.',
+        '# TYPE rosreestr_request_duration_seconds histogram',
+        'rosreestr_request_duration_seconds_bucket{endpoint="fir_object",le="1"} 1',
+        'rosreestr_request_duration_seconds_bucket{endpoint="fir_object",le="+Inf"} 2',
+        'rosreestr_request_duration_seconds_sum{endpoint="fir_object"} 2.5']
+    assert 'rosreestr_bytes_received_total{endpoint="fir_object"} 10' in metrics.to_prometheus()
+
+
+@httpretty.activate
+@patch('rosreestr_api.clients.http.time.sleep')
+def test_client_metrics(sleep_mock):
+    httpretty.register_uri(
+        method=httpretty.GET, uri=URL,
+        responses=[
+            httpretty.Response(body='', status=502),
+            httpretty.Response(body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE, status=200)])
+    metrics = Metrics()
+    api_client = RosreestrAPIClient(
+        cache=MemoryCache(metrics=metrics), retry_policy=RetryPolicy(), metrics=metrics)
+
+    api_client.get_object('1')
+    api_client.get_object('1')
+
+    snapshot = metrics.snapshot()[endpoints.FIR_OBJECT]
+    assert snapshot['statuses'] == {'502': 1, '200': 1}
+    assert snapshot['latency']['count'] == 2
+    assert snapshot['bytes_received'] == len(rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)
+    assert snapshot['retries'] == 1
+    assert snapshot['cache_hits'] == 1
+    assert snapshot['cache_misses'] == 1
@@ -0,0 +1,67 @@
+import pickle
+
+import httpretty
+import pytest
+
+from tests import pkk_client_fixtures, rosreestr_client_fixtures
+from rosreestr_api.clients.models import FirObject, PkkBuilding, PkkParcel
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+
+
+def test_fir_object():
+    fir_object = FirObject.from_raw(rosreestr_client_fixtures.OBJECT_BY_ID)
+
+    assert fir_object.object_id == '177_385900460001'
+    assert fir_object.cadastral_id == '77:05:0007007:4926'
+    assert fir_object.address == 'г.Москва, ул.Красного Маяка, д.22, корп.2, кв.187'
+    assert fir_object.object_address['apartment'] == '187'
+    assert fir_object.premises_data['areaValue'] == 76.7
+    assert fir_object.parcel_data is None
+    assert fir_object.raw == rosreestr_client_fixtures.OBJECT_BY_ID
+    with pytest.raises(AttributeError):
+        fir_object.unknown_field = 1
+
+
+def test_lazy_fields_dont_keep_decoded_payload():
+    fir_object = FirObject.from_raw(rosreestr_client_fixtures.OBJECT_BY_ID)
+
+    assert fir_object.old_numbers == rosreestr_client_fixtures.OBJECT_BY_ID['oldNumbers']
+    assert getattr(fir_object, '_raw', None) is None
+    assert fir_object.object_data is not fir_object.object_data
+
+
+def test_model_is_pickled():
+    parcel = PkkParcel.from_raw(pkk_client_fixtures.PARCEL_BY_COORDINATES['features'][0])
+
+    unpickled_parcel = pickle.loads(pickle.dumps(parcel))
+
+    assert unpickled_parcel == parcel
+    assert unpickled_parcel.cadastral_id == '77:17:0000000:11471'
+    assert unpickled_parcel.center == (4172677.635874182, 7467970.62866414)
+
+
+@httpretty.activate
+def test_get_object_model():
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('177_385900460001')
+    httpretty.register_uri(
+        method=httpretty.GET, uri=url, body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)
+
+    fir_object = RosreestrAPIClient().get_object('177_385900460001', model=True)
+
+    assert fir_object == FirObject.from_raw(rosreestr_client_fixtures.OBJECT_BY_ID)
+
+
+@httpretty.activate
+def test_get_building_model():
+    url = PKKRosreestrAPIClient.SEARCH_BUILDING_BY_CADASTRAL_ID_URL.format(
+        cadastral_id='71:0:0:112278', limit=11, tolerance=2)
+    httpretty.register_uri(
+        method=httpretty.GET, uri=url, body=pkk_client_fixtures.BUILDING_BY_CADASTRAL_ID_RESPONSE)
+
+    buildings = PKKRosreestrAPIClient().get_building_by_cadastral_id('71:0:0:112278', model=True)
+
+    assert [building.cadastral_id for building in buildings] == ['71:00:000000:112278']
+    assert isinstance(buildings[0], PkkBuilding)
+    assert buildings[0].extent == (
+        4184226.322656533, 7199935.937776311, 4190910.7296789056, 7205638.943976473)
+    assert buildings[0].floors is None
@@ -0,0 +1,74 @@
+import httpretty
+
+from tests import rosreestr_client_fixtures
+from rosreestr_api.clients.ratelimit import RateLimiter, TokenBucket
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1]
+    clock.now = 2
+    assert bucket.reserve() == 0
+
+
+def test_rate_limiter_uses_bucket_per_host():
+    clock = FakeClock()
+    rate_limiter = RateLimiter(
+        rate=1, rates={'pkk.rosreestr.ru': 10}, clock=clock, sleep=clock.sleep)
+
+    rate_limiter.acquire('https://rosreestr.gov.ru/api/online/macro_regions/')
+    rate_limiter.acquire('https://rosreestr.gov.ru/api/online/fir_object/1/')
+    rate_limiter.acquire('https://pkk.rosreestr.ru/api/features/1')
+
+    assert clock.now == 1
+    assert rate_limiter.get_rate('https://pkk.rosreestr.ru/') == 10
+
+
+def test_adaptive_rate_limiter():
+    clock = FakeClock()
+    url = 'https://pkk.rosreestr.ru/api/features/1'
+    rate_limiter = RateLimiter(
+        rate=4, adaptive=True, min_rate=1, max_rate=4.5, increase=0.25, decrease=0.5,
+        max_latency=2, clock=clock, sleep=clock.sleep)
+
+    rate_limiter.update(url, status_code=200, duration=0.1)
+    assert rate_limiter.get_rate(url) == 4.25
+    rate_limiter.update(url, status_code=503)
+    assert rate_limiter.get_rate(url) == 2.125
+    rate_limiter.update(url, status_code=429)
+    assert rate_limiter.get_rate(url) == 2.125
+    clock.now = 1
+    rate_limiter.update(url, status_code=200, duration=3)
+    assert rate_limiter.get_rate(url) == 1.0625
+    clock.now = 2
+    rate_limiter.update(url, error=ConnectionError())
+    assert rate_limiter.get_rate(url) == 1
+
+
+@httpretty.activate
+def test_clients_share_rate_limiter():
+    url = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('1')
+    httpretty.register_uri(
+        method=httpretty.GET, uri=url, body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)
+    clock = FakeClock()
+    rate_limiter = RateLimiter(rate=1, clock=clock, sleep=clock.sleep)
+
+    RosreestrAPIClient(rate_limiter=rate_limiter).get_object('1')
+    RosreestrAPIClient(rate_limiter=rate_limiter).get_object('1')
+
+    assert clock.now == 1
@@ -0,0 +1,100 @@
+import httpretty
+
+from tests import rosreestr_client_fixtures
+from rosreestr_api.clients.regions import RegionNamesIndex, RegionsSnapshot
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+
+
+def test_save_and_load_snapshot(tmp_path):
+    snapshot = RegionsSnapshot(str(tmp_path / 'regions.json'))
+
+    snapshot.save(
+        rosreestr_client_fixtures.MACRO_REGIONS, rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS)
+
+    assert not snapshot.is_stale()
+    assert RegionsSnapshot(snapshot.path).load() == (
+        rosreestr_client_fixtures.MACRO_REGIONS, rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS)
+
+
+def test_load_stale_snapshot(tmp_path):
+    snapshot = RegionsSnapshot(str(tmp_path / 'regions.json'), ttl=-1)
+    snapshot.save(
+        rosreestr_client_fixtures.MACRO_REGIONS, rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS)
+
+    assert snapshot.is_stale()
+    assert snapshot.load() is None
+    assert snapshot.load(allow_stale=True) is not None
+
+
+def test_load_missing_snapshot(tmp_path):
+    snapshot = RegionsSnapshot(str(tmp_path / 'regions.json'))
+
+    assert snapshot.is_stale()
+    assert snapshot.load() is None
+
+
+@httpretty.activate
+def test_client_uses_snapshot(tmp_path):
+    httpretty.register_uri(
+        method=httpretty.GET, uri=RosreestrAPIClient.MACRO_REGIONS_URL,
+        body=rosreestr_client_fixtures.MACRO_REGIONS_RESPONSE)
+    for macro_region_id, body in [
+            (rosreestr_client_fixtures.MACRO_REGION_ID_1,
+             rosreestr_client_fixtures.MACRO_REGION_TO_REGION_1_RESPONSE),
+            (rosreestr_client_fixtures.MACRO_REGION_ID_2,
+             rosreestr_client_fixtures.MACRO_REGION_TO_REGION_2_RESPONSE)]:
+        httpretty.register_uri(
+            method=httpretty.GET, uri=RosreestrAPIClient.REGIONS_URL.format(macro_region_id),
+            body=body)
+    snapshot_path = str(tmp_path / 'regions.json')
+
+    RosreestrAPIClient(regions_snapshot=RegionsSnapshot(snapshot_path)).macro_regions_to_regions
+    requests_count = len(httpretty.latest_requests())
+    api_client = RosreestrAPIClient(regions_snapshot=RegionsSnapshot(snapshot_path))
+
+    assert api_client.macro_regions == rosreestr_client_fixtures.MACRO_REGIONS
+    assert api_client.macro_regions_to_regions == rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS
+    assert len(httpretty.latest_requests()) == requests_count
+
+
+@httpretty.activate
+def test_client_uses_stale_snapshot_when_download_fails(tmp_path):
+    httpretty.register_uri(
+        method=httpretty.GET, uri=RosreestrAPIClient.MACRO_REGIONS_URL, status=502, body='')
+    snapshot = RegionsSnapshot(str(tmp_path / 'regions.json'), ttl=-1)
+    snapshot.save(
+        rosreestr_client_fixtures.MACRO_REGIONS, rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS)
+
+    api_client = RosreestrAPIClient(regions_snapshot=snapshot)
+
+    assert api_client.macro_regions_to_regions == rosreestr_client_fixtures.MACRO_REGIONS_TO_REGIONS
+
+
+def test_region_names_index():
+    names_index = RegionNamesIndex([
+        {'id': 1, 'name': 'Московская область'},
+        {'id': 2, 'name': 'Москва'},
+        {'id': 3, 'name': 'Республика Марий Эл'},
+        {'id': 4, 'name': 'Пермский край'},
+        {'id': 5, 'name': 'Орёл'},
+        {'id': 6, 'name': 'Ханты-Мансийский автономный округ'},
+    ])
+
+    assert names_index.get('Московская') == 1
+    assert names_index.get('московская  ОБЛАСТЬ') == 1
+    assert names_index.get('Москва') == 2
+    assert names_index.get('Марий Эл') == 3
+    assert names_index.get('пермский') == 4
+    assert names_index.get('Орел') == 5
+    assert names_index.get('Ханты Мансийский автономный округ') == 6
+    assert names_index.get('Тверская') is None
+
+
+def test_region_names_index_prefers_exact_name():
+    names_index = RegionNamesIndex([
+        {'id': 1, 'name': 'Алтай край'},
+        {'id': 2, 'name': 'Алтай'},
+    ])
+
+    assert names_index.get('Алтай') == 2
+    assert names_index.get('Алтай край') == 1
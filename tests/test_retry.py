@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+import httpretty
+import pytest
+import requests
+
+from tests import rosreestr_client_fixtures
+from rosreestr_api.clients.http import RosreestrHTTPClient
+from rosreestr_api.clients.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('1')
+
+
+def test_retry_policy_delay():
+    retry_policy = RetryPolicy(backoff_factor=1, max_backoff=3, jitter=False)
+    response = requests.Response()
+    response.headers['Retry-After'] = '2'
+
+    assert [retry_policy.get_delay(attempt) for attempt in range(1, 5)] == [1, 2, 3, 3]
+    assert retry_policy.get_delay(1, response=response) == 2
+
+
+def test_retry_policy_should_retry():
+    retry_policy = RetryPolicy(max_attempts=2)
+    response = requests.Response()
+    response.status_code = 503
+
+    assert retry_policy.should_retry('GET', 1, response=response)
+    assert retry_policy.should_retry('GET', 1, error=requests.exceptions.Timeout())
+    assert not retry_policy.should_retry('GET', 2, response=response)
+    assert not retry_policy.should_retry('POST', 1, response=response)
+    assert not retry_policy.should_retry('GET', 1, error=CircuitOpenError())
+    assert not retry_policy.should_retry('GET', 1, error=requests.exceptions.InvalidURL())
+
+
+@httpretty.activate
+@patch('rosreestr_api.clients.http.time.sleep')
+def test_request_is_retried(sleep_mock):
+    httpretty.register_uri(
+        method=httpretty.GET, uri=URL,
+        responses=[
+            httpretty.Response(body='', status=502),
+            httpretty.Response(body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE, status=200)])
+
+    api_client = RosreestrAPIClient(retry_policy=RetryPolicy(max_attempts=3))
+
+    assert api_client.get_object('1') == rosreestr_client_fixtures.OBJECT_BY_ID
+    assert len(httpretty.latest_requests()) == 2
+    assert sleep_mock.call_count == 1
+
+
+@httpretty.activate
+@patch('rosreestr_api.clients.http.time.sleep')
+def test_request_is_not_retried_after_deadline(sleep_mock):
+    httpretty.register_uri(method=httpretty.GET, uri=URL, body='', status=503)
+
+    http_client = RosreestrHTTPClient(retry_policy=RetryPolicy(
+        max_attempts=5, backoff_factor=10, jitter=False, deadline=5))
+
+    assert http_client.get(URL).status_code == 503
+    assert len(httpretty.latest_requests()) == 1
+    sleep_mock.assert_not_called()
+
+
+def test_circuit_breaker():
+    clock = FakeClock()
+    circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=clock)
+
+    circuit_breaker.record(URL, status_code=503)
+    circuit_breaker.before_request(URL)
+    circuit_breaker.record(URL, error=requests.exceptions.Timeout())
+    assert circuit_breaker.get_state(URL) == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request(URL)
+    circuit_breaker.before_request('https://pkk.rosreestr.ru/api/features/1')
+
+    clock.now = 10
+    assert circuit_breaker.get_state(URL) == CircuitBreaker.HALF_OPEN
+    circuit_breaker.before_request(URL)
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request(URL)
+    circuit_breaker.record(URL, status_code=404)
+    assert circuit_breaker.get_state(URL) == CircuitBreaker.CLOSED
+
+
+@httpretty.activate
+def test_circuit_breaker_fails_fast():
+    httpretty.register_uri(method=httpretty.GET, uri=URL, body='', status=503)
+    http_client = RosreestrHTTPClient(circuit_breaker=CircuitBreaker(failure_threshold=1))
+
+    http_client.get(URL)
+    with pytest.raises(CircuitOpenError):
+        http_client.get(URL)
+
+    assert len(httpretty.latest_requests()) == 1
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+from rosreestr_api.clients.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_single_flight():
+    single_flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def func():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {'id': 1}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(single_flight.do, 'key', func)
+        started.wait()
+        followers = [executor.submit(single_flight.do, 'key', func) for _ in range(3)]
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert single_flight.coalesced == 3
+    assert single_flight.do('key', lambda: 2) == 2
+
+
+def test_single_flight_shares_exception():
+    single_flight = SingleFlight()
+    started = threading.Event()
+
+    def func():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError('error')
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, 'key', func)
+        started.wait()
+        follower = executor.submit(single_flight.do, 'key', func)
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_async_single_flight():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        return await asyncio.gather(*[single_flight.do('key', func) for _ in range(3)])
+
+    assert asyncio.run(run()) == [1, 1, 1]
+    assert single_flight.coalesced == 2
+
+
+def test_async_single_flight_leader_cancellation():
+    single_flight = AsyncSingleFlight()
+
+    async def func():
+        await asyncio.sleep(0.1)
+        return 1
+
+    async def run():
+        leader = asyncio.ensure_future(
+            asyncio.wait_for(single_flight.do('key', func), timeout=0.01))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(single_flight.do('key', func))
+        with pytest.raises(asyncio.TimeoutError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == 1
+    assert single_flight.coalesced == 1
+
+
+def test_concurrent_get_object_is_requested_once():
+    def get(url):
+        time.sleep(0.2)
+        return MagicMock(status_code=200, json=MagicMock(return_value={'objectId': '1'}))
+
+    mock_http_client = MagicMock()
+    mock_http_client.return_value.get.side_effect = get
+    with patch('rosreestr_api.clients.rosreestr.RosreestrHTTPClient', mock_http_client):
+        api_client = RosreestrAPIClient()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            api_client.get_object, ['50:04:0000000:35646', '50:4:0:35646'] * 2))
+
+    assert results == [{'objectId': '1'}] * 4
+    assert mock_http_client.return_value.get.call_count == 1
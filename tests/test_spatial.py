@@ -0,0 +1,112 @@
+import copy
+import time
+
+import httpretty
+import pytest
+
+from rosreestr_api.clients import endpoints
+from rosreestr_api.clients.metrics import Metrics
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient
+from rosreestr_api.clients.spatial import SpatialCache, to_web_mercator
+from tests import pkk_client_fixtures
+
+
+PARCEL = pkk_client_fixtures.PARCEL_BY_COORDINATES['features'][0]
+# inside the extent of PARCEL
+LAT, LONG = 55.542, 37.483
+
+
+def _get_feature(feature_id, xmin, ymin, xmax, ymax):
+    feature = copy.deepcopy(PARCEL)
+    feature['attrs']['id'] = feature_id
+    feature['extent'] = {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
+    return feature
+
+
+def test_to_web_mercator():
+    x, y = to_web_mercator(55.54298983547087, 37.48380096009489)
+
+    assert x == pytest.approx(PARCEL['center']['x'])
+    assert y == pytest.approx(PARCEL['center']['y'])
+
+
+def test_get_features_covering_point():
+    spatial_cache = SpatialCache(metrics=Metrics())
+    x, y = to_web_mercator(LAT, LONG)
+    small = _get_feature('small', x - 10, y - 10, x + 10, y + 10)
+    big = _get_feature('big', x - 100, y - 100, x + 100, y + 100)
+    other = _get_feature('other', x + 50, y + 50, x + 100, y + 100)
+    spatial_cache.add(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, [big, other, small])
+
+    features = spatial_cache.get(
+        PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, LAT, LONG,
+        endpoint=endpoints.PKK_PARCEL_BY_COORDS)
+
+    assert features == [small, big]
+    assert spatial_cache.get(PKKRosreestrAPIClient.BUILDING_OBJECT_TYPE, LAT, LONG) is None
+    assert spatial_cache.stats.hits == 1
+    assert spatial_cache.stats.misses == 1
+    assert spatial_cache.metrics.snapshot()[endpoints.PKK_PARCEL_BY_COORDS]['cache_hits'] == 1
+
+
+def test_tolerance_widens_extents():
+    spatial_cache = SpatialCache()
+    x, y = to_web_mercator(LAT, LONG)
+    # the feature ends 1m to the west of the point, in the neighbouring cell
+    feature = _get_feature('near', x - 300, y - 10, x - 1, y + 10)
+    spatial_cache.add(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, [feature])
+
+    assert spatial_cache.get(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, LAT, LONG) is None
+    assert spatial_cache.get(
+        PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, LAT, LONG, tolerance=2) == [feature]
+
+
+def test_large_features_are_found():
+    spatial_cache = SpatialCache(cell_size=1)
+    spatial_cache.add(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, [PARCEL])
+
+    assert spatial_cache.get(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, LAT, LONG) == [PARCEL]
+    assert not spatial_cache._grid
+
+
+def test_expiration_and_eviction():
+    spatial_cache = SpatialCache(ttl=0.01, max_size=1)
+    x, y = to_web_mercator(LAT, LONG)
+    spatial_cache.add(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, [
+        _get_feature('1', x - 10, y - 10, x + 10, y + 10),
+        _get_feature('2', x - 20, y - 20, x + 20, y + 20)])
+
+    assert len(spatial_cache) == 1
+    assert spatial_cache.stats.evictions == 1
+    time.sleep(0.02)
+    assert spatial_cache.get(PKKRosreestrAPIClient.PARCEL_OBJECT_TYPE, LAT, LONG) is None
+    assert len(spatial_cache) == 0
+    assert not spatial_cache._grid
+
+
+@httpretty.activate
+def test_coordinate_lookups_are_answered_from_fetched_features():
+    url = PKKRosreestrAPIClient.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
+        cadastral_id='77:17:0000000:11471', limit=11, tolerance=2)
+    httpretty.register_uri(
+        httpretty.GET, url, body=pkk_client_fixtures.PARCEL_BY_CADASTRAL_ID_RESPONSE,
+        content_type='application/json')
+    building_url = PKKRosreestrAPIClient.SEARCH_BUILDING_BY_COORDINATES_URL.format(
+        lat=LAT, long=LONG, limit=11, tolerance=2)
+    httpretty.register_uri(
+        httpretty.GET, building_url, body=pkk_client_fixtures.BUILDING_BY_COORDINATES_RESPONSE,
+        content_type='application/json')
+    api_client = PKKRosreestrAPIClient(spatial_cache=SpatialCache())
+
+    api_client.get_parcel_by_cadastral_id('77:17:0000000:11471')
+    parcels = api_client.get_parcel_by_coordinates(lat=LAT, long=LONG, model=True)
+    # the extent of the parcel ends about 50m of EPSG:3857 to the south of the point
+    far_parcels = api_client.get_parcel_by_coordinates(
+        lat=55.5455, long=37.4837, tolerance=60, model=True)
+
+    assert len(httpretty.latest_requests()) == 1
+    assert [parcel.cadastral_id for parcel in parcels] == ['77:17:0000000:11471']
+    assert [parcel.cadastral_id for parcel in far_parcels] == ['77:17:0000000:11471']
+    # parcels don't answer building lookups
+    api_client.get_building_by_coordinates(lat=LAT, long=LONG)
+    assert len(httpretty.latest_requests()) == 2
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from rosreestr_api.clients.streaming import JSONArrayParser, iter_json_array
+
+
+def _split(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1000])
+def test_iter_json_array(chunk_size):
+    items = [{'objectId': '1', 'addressNotes': 'г. Севастополь, ул. Ленина, д. 1'},
+             12345, 'строка', [1, [2]], None, True, -0.5e3]
+    body = (' \n' + json.dumps(items, ensure_ascii=False, indent=2) + '\n').encode('utf-8')
+
+    assert list(iter_json_array(_split(body, chunk_size))) == items
+
+
+@pytest.mark.parametrize('body, expected_items', [
+    (b'', []),
+    (b'[]', []),
+    (b' [ ] ', []),
+    (b'null', []),
+    (b'{}', []),
+    (b'{"objectId": "1"}', [{'objectId': '1'}]),
+])
+def test_iter_json_array_with_edge_cases(body, expected_items):
+    assert list(iter_json_array(_split(body, 1))) == expected_items
+
+
+@pytest.mark.parametrize('body', [b'[1 2]', b'[1,]', b'[{"a": 1}', b'[{"a": }]'])
+def test_iter_json_array_with_invalid_json(body):
+    with pytest.raises(ValueError):
+        list(iter_json_array([body]))
+
+
+def test_parser_returns_complete_items():
+    parser = JSONArrayParser()
+
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{'a': 1}]
+    assert parser.feed(b': 2}, 1') == [{'b': 2}]
+    assert parser.feed(b'0]') == [10]
+    assert parser.close() == []
@@ -0,0 +1,121 @@
+import json
+
+import httpretty
+import pytest
+
+from rosreestr_api.clients import sync
+from rosreestr_api.clients.rosreestr import PKKRosreestrAPIClient, RosreestrAPIClient
+from rosreestr_api.clients.sync import FingerprintStore, sync_objects, sync_parcels
+from tests import pkk_client_fixtures, rosreestr_client_fixtures
+
+
+OBJECT_URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('77:5:7007:4926')
+
+
+def _get_statuses(changes):
+    return [(change.id, change.status) for change in changes]
+
+
+def test_fingerprint_doesnt_depend_on_key_order():
+    fingerprint = sync.get_fingerprint({'a': 1, 'b': [1, 2]})
+
+    assert fingerprint == sync.get_fingerprint({'b': [1, 2], 'a': 1})
+    assert sync.get_fingerprint({'a': 1}) != sync.get_fingerprint({'a': 2})
+
+
+@httpretty.activate
+def test_sync_objects(tmp_path):
+    changed_object = dict(rosreestr_client_fixtures.OBJECT_BY_ID, objectId='changed')
+    httpretty.register_uri(httpretty.GET, OBJECT_URL, responses=[
+        httpretty.Response(rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE),
+        httpretty.Response(rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE),
+        httpretty.Response(json.dumps(changed_object)),
+        httpretty.Response('', status=404),
+    ])
+    store = FingerprintStore(str(tmp_path / 'fingerprints.sqlite3'))
+    api_client = RosreestrAPIClient()
+    obj_ids = ['77:05:0007007:4926', '77:5:7007:4926', '77:05:000a007']
+
+    first_changes = list(sync_objects(api_client, obj_ids, store))
+    assert sorted(_get_statuses(first_changes)) == [
+        ('77:05:000a007', sync.ERROR), ('77:5:7007:4926', sync.NEW)]
+    assert [change.body for change in first_changes if change.status == sync.NEW] == [
+        rosreestr_client_fixtures.OBJECT_BY_ID]
+    assert list(sync_objects(api_client, obj_ids[:1], store)) == []
+    changes = list(sync_objects(api_client, obj_ids[:1], store))
+    assert _get_statuses(changes) == [('77:5:7007:4926', sync.CHANGED)]
+    assert changes[0].body == changed_object
+    assert _get_statuses(sync_objects(api_client, obj_ids[:1], store)) == [
+        ('77:5:7007:4926', sync.DELETED)]
+    assert len(store) == 0
+
+
+@httpretty.activate
+def test_conditional_requests(tmp_path):
+    httpretty.register_uri(httpretty.GET, OBJECT_URL, responses=[
+        httpretty.Response(
+            rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE, adding_headers={'ETag': '"v1"'}),
+        httpretty.Response('', status=304),
+    ])
+    store = FingerprintStore(str(tmp_path / 'fingerprints.sqlite3'))
+    api_client = RosreestrAPIClient()
+
+    assert _get_statuses(sync_objects(api_client, ['77:5:7007:4926'], store)) == [
+        ('77:5:7007:4926', sync.NEW)]
+    assert list(sync_objects(api_client, ['77:5:7007:4926'], store)) == []
+    assert httpretty.last_request().headers['If-None-Match'] == '"v1"'
+
+
+@httpretty.activate
+def test_sync_parcels(tmp_path):
+    url = PKKRosreestrAPIClient.SEARCH_PARCEL_BY_CADASTRAL_ID_URL.format(
+        cadastral_id='77:17:0:11471', limit=11, tolerance=2)
+    httpretty.register_uri(httpretty.GET, url, responses=[
+        httpretty.Response(pkk_client_fixtures.PARCEL_BY_CADASTRAL_ID_RESPONSE),
+        httpretty.Response(json.dumps({'features': [], 'total': 0})),
+    ])
+    store = FingerprintStore(str(tmp_path / 'fingerprints.sqlite3'))
+    pkk_client = PKKRosreestrAPIClient()
+
+    assert _get_statuses(sync_parcels(pkk_client, ['77:17:0000000:11471'], store)) == [
+        ('77:17:0:11471', sync.NEW)]
+    assert _get_statuses(sync_parcels(pkk_client, ['77:17:0000000:11471'], store)) == [
+        ('77:17:0:11471', sync.DELETED)]
+
+
+@httpretty.activate
+def test_change_is_reported_again_if_consumer_stops(tmp_path):
+    httpretty.register_uri(
+        httpretty.GET, OBJECT_URL, body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE)
+    store = FingerprintStore(str(tmp_path / 'fingerprints.sqlite3'))
+    api_client = RosreestrAPIClient()
+
+    with pytest.raises(RuntimeError):
+        for _ in sync_objects(api_client, ['77:5:7007:4926'], store):
+            raise RuntimeError('The change was not handled')
+    assert len(store) == 0
+    changes = sync_objects(api_client, ['77:5:7007:4926'], store)
+    assert _get_statuses([next(changes)]) == [('77:5:7007:4926', sync.NEW)]
+    changes.close()
+    assert len(store) == 0
+    assert _get_statuses(sync_objects(api_client, ['77:5:7007:4926'], store)) == [
+        ('77:5:7007:4926', sync.NEW)]
+    assert len(store) == 1
+
+
+@httpretty.activate
+def test_get_object_if_changed():
+    httpretty.register_uri(httpretty.GET, OBJECT_URL, responses=[
+        httpretty.Response(
+            rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE, adding_headers={'ETag': '"v1"'}),
+        httpretty.Response('', status=304),
+    ])
+    api_client = RosreestrAPIClient()
+
+    response, body = api_client.get_object_if_changed('77:05:0007007:4926')
+    assert body == rosreestr_client_fixtures.OBJECT_BY_ID
+    assert 'If-None-Match' not in httpretty.last_request().headers
+    response, body = api_client.get_object_if_changed(
+        '77:05:0007007:4926', etag=response.headers['ETag'])
+    assert (response.status_code, body) == (304, None)
+    assert httpretty.last_request().headers['If-None-Match'] == '"v1"'
@@ -0,0 +1,107 @@
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from rosreestr_api.clients import tracing
+from rosreestr_api.clients.http import BaseHTTPClient
+from rosreestr_api.clients.tracing import (
+    JSONLinesExporter, OpenTelemetryExporter, Span, Tracer)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"features": []}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def opentelemetry_trace(monkeypatch):
+    trace = types.ModuleType('opentelemetry.trace')
+    trace.get_tracer = lambda name: object()
+    monkeypatch.setitem(sys.modules, 'opentelemetry.trace', trace)
+    return trace
+
+
+@pytest.fixture
+def server_url():
+    server = HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://localhost:{server.server_port}/api/features/1?text=1'
+    server.shutdown()
+    server.server_close()
+
+
+def test_span():
+    span = Span('HTTP GET', 10)
+    span.add_phase(tracing.TTFB, 11, 12.5)
+    span.add_phase(tracing.DNS, 10, 10.25)
+    span.end_time = 13
+
+    assert span.duration == 3
+    assert span.get_durations() == {tracing.DNS: 0.25, tracing.TTFB: 1.5}
+
+
+@pytest.mark.parametrize('transport', BaseHTTPClient.TRANSPORTS)
+def test_request_phases_are_exported(server_url, tmp_path, transport):
+    path = str(tmp_path / 'spans.jsonl')
+    tracer = Tracer(exporter=JSONLinesExporter(path))
+    http_client = BaseHTTPClient(keep_alive=True, tracer=tracer, transport=transport)
+
+    http_client.get(server_url)
+    http_client.get(server_url)
+    http_client.close()
+    tracer.close()
+
+    with open(path) as f:
+        first_span, second_span = [json.loads(line) for line in f]
+    assert first_span['attributes']['host'] == 'localhost'
+    assert first_span['attributes']['attempt'] == 1
+    assert first_span['attributes']['status_code'] == 200
+    assert not first_span['attributes']['connection_reused']
+    assert set(first_span['phases']) == {
+        tracing.DNS, tracing.CONNECT, tracing.TTFB, tracing.DOWNLOAD}
+    assert second_span['attributes']['connection_reused']
+    assert set(second_span['phases']) == {tracing.TTFB, tracing.DOWNLOAD}
+
+
+def test_untraced_client_uses_default_connections(server_url):
+    http_client = BaseHTTPClient(keep_alive=True)
+
+    assert http_client.get(server_url).status_code == 200
+    adapter = http_client.session.get_adapter(server_url)
+    assert tracing._TracedHTTPConnectionPool not in adapter.poolmanager.pool_classes_by_scheme.values()
+
+
+def test_path_is_used_with_opentelemetry(opentelemetry_trace, tmp_path):
+    tracer = Tracer(path=str(tmp_path / 'spans.jsonl'))
+
+    assert isinstance(tracer.exporter, JSONLinesExporter)
+    tracer.close()
+
+
+def test_spans_go_to_opentelemetry_without_path(opentelemetry_trace):
+    assert isinstance(Tracer().exporter, OpenTelemetryExporter)
+
+
+def test_path_is_required_without_opentelemetry(monkeypatch, tmp_path):
+    # an import of a module set to None in sys.modules raises ImportError
+    monkeypatch.setitem(sys.modules, 'opentelemetry.trace', None)
+
+    with pytest.raises(ValueError):
+        Tracer()
+    tracer = Tracer(path=str(tmp_path / 'spans.jsonl'))
+    assert isinstance(tracer.exporter, JSONLinesExporter)
+    tracer.close()
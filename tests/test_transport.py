@@ -0,0 +1,87 @@
+import json
+import socket
+
+import httpretty
+import pytest
+import requests
+
+from rosreestr_api.clients.http import CustomUrllib3Transport, RosreestrHTTPClient
+from rosreestr_api.clients.retry import RetryPolicy
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+from rosreestr_api.clients.transport import Urllib3Transport
+from tests import rosreestr_client_fixtures
+
+
+OBJECT_URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('77:5:7007:4926')
+
+
+def test_unknown_transport():
+    with pytest.raises(ValueError):
+        RosreestrHTTPClient(transport='curl')
+
+
+@httpretty.activate
+def test_get_object_with_urllib3_transport():
+    httpretty.register_uri(
+        httpretty.GET, OBJECT_URL, body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE,
+        content_type='application/json')
+    api_client = RosreestrAPIClient(transport='urllib3')
+
+    assert isinstance(api_client._http_client.session, CustomUrllib3Transport)
+    assert api_client.get_object('77:05:0007007:4926') == rosreestr_client_fixtures.OBJECT_BY_ID
+    request = httpretty.last_request()
+    assert request.headers['User-Agent'] == api_client._http_client.default_headers['User-Agent']
+    assert request.headers['Accept-Encoding']
+
+
+def test_default_headers_are_merged_once():
+    transport = Urllib3Transport()
+    default_headers = {'User-Agent': 'test'}
+
+    request = transport.prepare('GET', OBJECT_URL, default_headers)
+    other_request = transport.prepare('GET', OBJECT_URL, default_headers)
+    request_with_headers = transport.prepare(
+        'GET', OBJECT_URL, default_headers, headers={'If-None-Match': '"1"'})
+
+    assert request.headers is other_request.headers
+    assert request.headers['User-Agent'] == 'test'
+    assert request_with_headers.headers['If-None-Match'] == '"1"'
+    assert 'If-None-Match' not in request.headers
+
+
+@httpretty.activate
+def test_request_with_body_and_redirect():
+    url = 'https://example.com/objects/'
+    httpretty.register_uri(
+        httpretty.POST, url, status=303, location='https://example.com/objects/1/')
+    httpretty.register_uri(httpretty.GET, url + '1/', body='{"id": 1}')
+    http_client = RosreestrHTTPClient(transport='urllib3')
+
+    response = http_client.post(url, json={'name': 'Ленина'})
+
+    assert response.json() == {'id': 1}
+    assert response.request.method == 'GET'
+    assert [r.status_code for r in response.history] == [303]
+    assert json.loads(httpretty.latest_requests()[0].body) == {'name': 'Ленина'}
+
+
+@httpretty.activate
+def test_non_ascii_url_is_quoted():
+    url = 'https://example.com/street/Ленина/'
+    httpretty.register_uri(httpretty.GET, requests.utils.requote_uri(url), body='[]')
+
+    response = RosreestrHTTPClient(transport='urllib3').get(url)
+
+    assert response.json() == []
+    assert httpretty.last_request().path == '/street/%D0%9B%D0%B5%D0%BD%D0%B8%D0%BD%D0%B0/'
+
+
+def test_errors_are_requests_exceptions():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    http_client = RosreestrHTTPClient(
+        transport='urllib3', retry_policy=RetryPolicy(max_attempts=2, backoff_factor=0))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_client.get(f'http://127.0.0.1:{port}/')
@@ -0,0 +1,85 @@
+import httpretty
+import pytest
+
+from rosreestr_api.clients.http import RosreestrHTTPClient
+from rosreestr_api.clients.rosreestr import RosreestrAPIClient
+from rosreestr_api.clients.useragent import UserAgentPool
+from tests import rosreestr_client_fixtures
+
+
+OBJECT_URL = RosreestrAPIClient.SEARCH_DETAILED_OBJECT_BY_ID.format('77:5:7007:4926')
+
+
+def _register_object():
+    httpretty.register_uri(
+        httpretty.GET, OBJECT_URL, body=rosreestr_client_fixtures.OBJECT_BY_ID_RESPONSE,
+        content_type='application/json')
+
+
+def _get_user_agents():
+    return [request.headers['User-Agent'] for request in httpretty.latest_requests()]
+
+
+def test_pool_is_loaded_on_first_use():
+    user_agent_pool = UserAgentPool(size=5)
+    RosreestrAPIClient(user_agent_pool=user_agent_pool)
+
+    assert user_agent_pool._user_agents is None
+    assert 0 < len(user_agent_pool.user_agents) <= 5
+    assert user_agent_pool.get_random() in user_agent_pool.user_agents
+
+
+def test_unknown_user_agent_rotation():
+    with pytest.raises(ValueError):
+        RosreestrHTTPClient(user_agent_rotation='day')
+
+
+@httpretty.activate
+def test_pinned_user_agent():
+    _register_object()
+    user_agent_pool = UserAgentPool()
+    api_client = RosreestrAPIClient(user_agent='rosreestr-api', user_agent_pool=user_agent_pool)
+
+    api_client.get_object('77:05:0007007:4926')
+
+    assert _get_user_agents() == ['rosreestr-api']
+    assert user_agent_pool._user_agents is None
+
+
+@httpretty.activate
+def test_user_agent_is_rotated_per_session():
+    _register_object()
+    api_client = RosreestrAPIClient(keep_alive=True, user_agent_pool=UserAgentPool(['a', 'b']))
+
+    for _ in range(10):
+        api_client.get_object('77:05:0007007:4926')
+    assert len(set(_get_user_agents())) == 1
+    for _ in range(30):
+        api_client.close()
+        api_client.get_object('77:05:0007007:4926')
+
+    assert set(_get_user_agents()) == {'a', 'b'}
+
+
+@httpretty.activate
+def test_user_agent_is_rotated_per_session_without_keep_alive():
+    # every request has its own session
+    _register_object()
+    api_client = RosreestrAPIClient(user_agent_pool=UserAgentPool(['a', 'b']))
+
+    for _ in range(30):
+        api_client.get_object('77:05:0007007:4926')
+
+    assert set(_get_user_agents()) == {'a', 'b'}
+
+
+@httpretty.activate
+def test_user_agent_is_rotated_per_request():
+    _register_object()
+    api_client = RosreestrAPIClient(
+        user_agent_pool=UserAgentPool(['a', 'b']), user_agent_rotation='request')
+
+    for _ in range(30):
+        api_client.get_object('77:05:0007007:4926')
+
+    assert set(_get_user_agents()) == {'a', 'b'}